@@ -6,13 +6,17 @@ Usage:
     python manage.py make-superuser <email>
     python manage.py revoke-superuser <email>
     python manage.py list-superusers
+    python manage.py gc-photos [batch_size]
+    python manage.py export-family <family_id> [csv|ndjson] [dataset|all] [output_path]
+    python manage.py backfill-kid-stats [start_day] [end_day]
+    python manage.py archive-history [retention_days] [batch_size]
 """
 import sys
 from src import create_app
 from src.models.main import Parent, db
 
 
-app = create_app()
+app = create_app(start_scheduler=False)
 
 
 def make_superuser(email: str) -> None:
@@ -47,10 +51,107 @@ def list_superusers() -> None:
             print(f"  {p.name} <{p.email}>  (id={p.id})")
 
 
+def gc_photos(batch_size: str = "500") -> None:
+    from src.utils.photo_store import gc_orphan_photos
+
+    with app.app_context():
+        deleted, freed = gc_orphan_photos(batch_size=max(1, int(batch_size)))
+        print(f"OK: removed {deleted} orphaned photo(s), freed {freed / (1024 * 1024):.2f} MB ({freed} bytes).")
+
+
+def export_family(family_id: str, export_format: str = "ndjson", dataset: str = "all", output_path: str = "-") -> None:
+    from src.models.main import Family
+    from src.utils import family_export
+
+    if export_format not in family_export.EXPORT_FORMATS:
+        print(f"ERROR: format must be one of {', '.join(family_export.EXPORT_FORMATS)}")
+        sys.exit(1)
+    if dataset != "all" and dataset not in family_export.EXPORT_DATASETS:
+        print(f"ERROR: dataset must be 'all' or one of {', '.join(family_export.EXPORT_DATASETS)}")
+        sys.exit(1)
+
+    with app.app_context():
+        family = db.session.get(Family, int(family_id))
+        if not family:
+            print(f"ERROR: No family found with id {family_id}")
+            sys.exit(1)
+
+        datasets = family_export.EXPORT_DATASETS if dataset == "all" else (dataset,)
+        out = sys.stdout if output_path == "-" else open(output_path, "w", newline="", encoding="utf-8")
+        try:
+            if export_format == "ndjson":
+                for chunk in family_export.iter_ndjson(datasets, family.id):
+                    out.write(chunk)
+            else:
+                # CSV holds one dataset per table; several datasets are separated by a blank line.
+                for index, name in enumerate(datasets):
+                    if index:
+                        out.write("\n")
+                    for chunk in family_export.iter_csv(name, family.id):
+                        out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if out is not sys.stdout:
+            print(f"OK: exported {dataset} for family {family.id} to {output_path}.", file=sys.stderr)
+
+
+def backfill_kid_stats(start_day: str = "", end_day: str = "") -> None:
+    from datetime import date
+    from src.utils.kid_stats import rebuild_kid_daily_stats
+
+    with app.app_context():
+        written = rebuild_kid_daily_stats(
+            start=date.fromisoformat(start_day) if start_day else None,
+            end=date.fromisoformat(end_day) if end_day else None,
+        )
+        print(f"OK: rebuilt {written} kid daily stat row(s).")
+
+
+def archive_history(retention_days: str = "", batch_size: str = "1000") -> None:
+    from src.utils.archive import archive_after_days, run_archival
+
+    with app.app_context():
+        days = int(retention_days) if retention_days else archive_after_days()
+        submissions, transactions = run_archival(retention_days=days, batch_size=max(1, int(batch_size)))
+        print(f"OK: archived {submissions} chore submission(s) and {transactions} coin transaction(s) older than {days} days.")
+
+
+def snapshot_admin_metrics() -> None:
+    from src.utils.admin_metrics import take_snapshot
+
+    with app.app_context():
+        snapshot = take_snapshot()
+        print(f"OK: stored admin metrics for {snapshot.day.isoformat()} ({snapshot.total_families} active families).")
+
+
+def dispatch_email(batch_size: str = "1000") -> None:
+    from src.utils.email import dispatch_outbox
+
+    with app.app_context():
+        sent, retried, dead = dispatch_outbox(batch_size=max(1, int(batch_size)))
+        print(f"OK: sent {sent} email(s); {retried} will be retried, {dead} dead-lettered.")
+
+
+def process_stripe_events() -> None:
+    from src.utils.stripe_events import process_stripe_events as process
+
+    with app.app_context():
+        processed, failed = process()
+        print(f"OK: applied {processed} Stripe event(s); {failed} failed.")
+
+
 COMMANDS = {
     "make-superuser": (make_superuser, "<email>"),
     "revoke-superuser": (revoke_superuser, "<email>"),
     "list-superusers": (list_superusers, ""),
+    "gc-photos": (gc_photos, "[batch_size]"),
+    "export-family": (export_family, "<family_id> [csv|ndjson] [dataset|all] [output_path]"),
+    "backfill-kid-stats": (backfill_kid_stats, "[start_day] [end_day]"),
+    "archive-history": (archive_history, "[retention_days] [batch_size]"),
+    "snapshot-admin-metrics": (snapshot_admin_metrics, ""),
+    "dispatch-email": (dispatch_email, "[batch_size]"),
+    "process-stripe-events": (process_stripe_events, ""),
 }
 
 if __name__ == "__main__":
@@ -68,5 +169,14 @@ if __name__ == "__main__":
             print(f"ERROR: '{cmd}' requires an email argument.")
             sys.exit(1)
         fn(sys.argv[2])
+    elif cmd in ("gc-photos", "dispatch-email") and len(sys.argv) >= 3:
+        fn(sys.argv[2])
+    elif cmd in ("archive-history", "backfill-kid-stats"):
+        fn(*sys.argv[2:4])
+    elif cmd == "export-family":
+        if len(sys.argv) < 3:
+            print(f"ERROR: '{cmd}' requires a family id.")
+            sys.exit(1)
+        fn(*sys.argv[2:6])
     else:
         fn()
@@ -1,4 +1,4 @@
-from flask import Flask, render_template
+from flask import Flask, current_app, render_template
 from sqlalchemy import inspect, text
 from dotenv import load_dotenv
 import os
@@ -16,6 +16,164 @@ def _normalized_database_url() -> str:
 	return raw_url
 
 
+# Seeds StoreSessionParticipant running totals from existing turn rows.
+_BACKFILL_PARTICIPANT_TOTALS_SQL = """
+	UPDATE store_session_participants SET
+		elapsed_seconds = (
+			SELECT COALESCE(SUM(t.elapsed_seconds), 0) FROM store_session_turns t
+			WHERE t.participant_id = store_session_participants.id AND t.ended_at IS NOT NULL
+		),
+		coins_charged = (
+			SELECT COALESCE(SUM(t.coins_charged), 0) FROM store_session_turns t
+			WHERE t.participant_id = store_session_participants.id
+		)
+"""
+
+
+# Seeds StoreRedemption vote counters from existing vote rows.
+_BACKFILL_REDEMPTION_VOTE_COUNTS_SQL = """
+	UPDATE store_redemptions SET
+		yes_vote_count = (
+			SELECT COUNT(*) FROM store_redemption_votes v
+			WHERE v.redemption_id = store_redemptions.id AND v.vote = 'yes'
+		),
+		no_vote_count = (
+			SELECT COUNT(*) FROM store_redemption_votes v
+			WHERE v.redemption_id = store_redemptions.id AND v.vote = 'no'
+		)
+"""
+
+
+# Numbers the claim slots held by existing claimed/submitted/approved chore
+# submissions, per chore, reset version and day, in claim order.
+_BACKFILL_CHORE_CLAIM_SLOTS_SQL = """
+	UPDATE chore_submissions SET
+		claim_day = DATE(claimed_at),
+		claim_slot = CASE WHEN status IN ('claimed', 'submitted', 'approved') THEN (
+			SELECT COUNT(*) FROM chore_submissions earlier
+			WHERE earlier.chore_id = chore_submissions.chore_id
+			  AND earlier.reset_version = chore_submissions.reset_version
+			  AND DATE(earlier.claimed_at) = DATE(chore_submissions.claimed_at)
+			  AND earlier.status IN ('claimed', 'submitted', 'approved')
+			  AND earlier.id <= chore_submissions.id
+		) END
+"""
+
+
+# Copies each task's single-claim flag onto its existing claims.
+_BACKFILL_TASK_CLAIM_EXCLUSIVE_SQL = """
+	UPDATE task_claims SET is_exclusive = COALESCE(
+		(SELECT NOT t.allow_multiple_claims FROM tasks t WHERE t.id = task_claims.task_id),
+		FALSE
+	)
+"""
+
+
+# Carries unseen rewards/fines (previously flashed from coin_transactions at
+# kid login) into the new notification inbox, once, when the table is created.
+# Workers that start together can all see the table as new, so the seed is
+# claimed through a marker app_settings row (see _seed_kid_notifications).
+_SEED_KID_NOTIFICATIONS_MARKER = "KID_NOTIFICATIONS_SEEDED"
+_SEED_KID_NOTIFICATIONS_SQL = """
+	INSERT INTO kid_notifications (kid_id, family_id, kind, message, level, created_at)
+	SELECT
+		kid_id,
+		family_id,
+		CASE WHEN amount > 0 THEN 'coins_added' ELSE 'fine' END,
+		SUBSTR(
+			CASE WHEN amount > 0
+				THEN '🏆 You earned ' || CAST(amount AS VARCHAR) || ' coins! '
+				ELSE '⚠️ You lost ' || CAST(-amount AS VARCHAR) || ' coins. '
+			END || COALESCE(reason, ''),
+			1, 255
+		),
+		CASE WHEN amount > 0 THEN 'success' ELSE 'error' END,
+		created_at
+	FROM coin_transactions
+	WHERE seen_by_kid = FALSE AND kind IN ('fine', 'manual_add') AND amount <> 0
+	ORDER BY id
+"""
+
+
+# Claims that predate the arbitration indexes may already break them.  Before
+# an index is built its duplicates are resolved: the earliest holder keeps the
+# claim, later active ones are rejected, and extra approved (already paid)
+# claims are merely taken out of the index.
+_DUPLICATE_CLAIM_NOTE = "Closed automatically: duplicate claim"
+_RESOLVE_DUPLICATES_SQL = {
+	"uq_task_claims_kid_active": [f"""
+		UPDATE task_claims SET status = 'rejected', resolved_at = CURRENT_TIMESTAMP,
+			resolution_note = '{_DUPLICATE_CLAIM_NOTE}'
+		WHERE status IN ('claimed', 'submitted') AND EXISTS (
+			SELECT 1 FROM task_claims keep
+			WHERE keep.task_id = task_claims.task_id AND keep.kid_id = task_claims.kid_id
+			  AND keep.status IN ('claimed', 'submitted') AND keep.id < task_claims.id
+		)
+	"""],
+	"uq_task_claims_exclusive_holder": [
+		"""
+		UPDATE task_claims SET is_exclusive = FALSE
+		WHERE is_exclusive AND status = 'approved' AND EXISTS (
+			SELECT 1 FROM task_claims keep
+			WHERE keep.task_id = task_claims.task_id AND keep.is_exclusive
+			  AND keep.status = 'approved' AND keep.id < task_claims.id
+		)
+		""",
+		f"""
+		UPDATE task_claims SET status = 'rejected', resolved_at = CURRENT_TIMESTAMP,
+			resolution_note = '{_DUPLICATE_CLAIM_NOTE}'
+		WHERE is_exclusive AND status IN ('claimed', 'submitted') AND EXISTS (
+			SELECT 1 FROM task_claims keep
+			WHERE keep.task_id = task_claims.task_id AND keep.is_exclusive
+			  AND keep.status IN ('claimed', 'submitted', 'approved')
+			  AND (keep.status = 'approved' OR keep.id < task_claims.id)
+		)
+		""",
+	],
+	"uq_chore_submissions_kid_claim_day": ["""
+		UPDATE chore_submissions SET claim_slot = NULL
+		WHERE claim_slot IS NOT NULL AND EXISTS (
+			SELECT 1 FROM chore_submissions keep
+			WHERE keep.chore_id = chore_submissions.chore_id
+			  AND keep.reset_version = chore_submissions.reset_version
+			  AND keep.claim_day = chore_submissions.claim_day
+			  AND keep.kid_id = chore_submissions.kid_id
+			  AND keep.claim_slot IS NOT NULL AND keep.id < chore_submissions.id
+		)
+	"""],
+}
+
+
+def _ensure_indexes() -> None:
+	"""Create indexes declared on models whose tables predate them.
+
+	create_all() only builds indexes together with a new table, so indexes added
+	to an existing model later would otherwise never reach older databases.
+	Unique indexes enforce invariants the app relies on, so failing to build
+	one aborts startup instead of leaving the invariant silently unenforced.
+	"""
+	inspector = inspect(db.engine)
+	table_names = set(inspector.get_table_names())
+	for table in db.metadata.sorted_tables:
+		if table.name not in table_names or not table.indexes:
+			continue
+		existing = {index["name"] for index in inspector.get_indexes(table.name)}
+		for index in table.indexes:
+			if index.name in existing:
+				continue
+			try:
+				with db.engine.begin() as connection:
+					for statement in _RESOLVE_DUPLICATES_SQL.get(index.name, ()):
+						resolved = connection.execute(text(statement)).rowcount
+						if resolved:
+							current_app.logger.warning("Resolved %s duplicate row(s) before creating %s", resolved, index.name)
+					index.create(bind=connection)
+			except Exception as exc:
+				if index.unique:
+					raise RuntimeError(f"Could not create unique index {index.name}") from exc
+				current_app.logger.warning("Could not create index %s", index.name, exc_info=True)
+
+
 def _apply_sqlite_schema_fixes() -> None:
 	inspector = inspect(db.engine)
 	table_names = set(inspector.get_table_names())
@@ -66,6 +224,9 @@ def _apply_sqlite_schema_fixes() -> None:
 		if "subscription_status" not in family_columns:
 			with db.engine.begin() as connection:
 				connection.execute(text("ALTER TABLE families ADD COLUMN subscription_status VARCHAR(30)"))
+		if "store_catalog_version" not in family_columns:
+			with db.engine.begin() as connection:
+				connection.execute(text("ALTER TABLE families ADD COLUMN store_catalog_version INTEGER NOT NULL DEFAULT 0"))
 
 	if "kids" in table_names:
 		kid_columns = {column["name"] for column in inspector.get_columns("kids")}
@@ -146,6 +307,52 @@ def _apply_sqlite_schema_fixes() -> None:
 			with db.engine.begin() as connection:
 				connection.execute(text("ALTER TABLE store_timed_sessions ADD COLUMN participant_kid_id INTEGER"))
 
+	if "store_session_participants" in table_names:
+		ssp_columns = {column["name"] for column in inspector.get_columns("store_session_participants")}
+		if "elapsed_seconds" not in ssp_columns or "coins_charged" not in ssp_columns:
+			with db.engine.begin() as connection:
+				if "elapsed_seconds" not in ssp_columns:
+					connection.execute(text("ALTER TABLE store_session_participants ADD COLUMN elapsed_seconds INTEGER NOT NULL DEFAULT 0"))
+				if "coins_charged" not in ssp_columns:
+					connection.execute(text("ALTER TABLE store_session_participants ADD COLUMN coins_charged INTEGER NOT NULL DEFAULT 0"))
+				connection.execute(text(_BACKFILL_PARTICIPANT_TOTALS_SQL))
+
+	if "store_redemptions" in table_names:
+		sr_columns = {column["name"] for column in inspector.get_columns("store_redemptions")}
+		if "yes_vote_count" not in sr_columns or "no_vote_count" not in sr_columns:
+			with db.engine.begin() as connection:
+				if "yes_vote_count" not in sr_columns:
+					connection.execute(text("ALTER TABLE store_redemptions ADD COLUMN yes_vote_count INTEGER NOT NULL DEFAULT 0"))
+				if "no_vote_count" not in sr_columns:
+					connection.execute(text("ALTER TABLE store_redemptions ADD COLUMN no_vote_count INTEGER NOT NULL DEFAULT 0"))
+				connection.execute(text(_BACKFILL_REDEMPTION_VOTE_COUNTS_SQL))
+
+	if "chore_submissions" in table_names:
+		cs_columns = {column["name"] for column in inspector.get_columns("chore_submissions")}
+		if "claim_day" not in cs_columns or "claim_slot" not in cs_columns:
+			with db.engine.begin() as connection:
+				if "claim_day" not in cs_columns:
+					connection.execute(text("ALTER TABLE chore_submissions ADD COLUMN claim_day DATE"))
+				if "claim_slot" not in cs_columns:
+					connection.execute(text("ALTER TABLE chore_submissions ADD COLUMN claim_slot INTEGER"))
+				connection.execute(text(_BACKFILL_CHORE_CLAIM_SLOTS_SQL))
+
+	if "chore_submissions_archive" in table_names:
+		csa_columns = {column["name"] for column in inspector.get_columns("chore_submissions_archive")}
+		if "claim_day" not in csa_columns:
+			with db.engine.begin() as connection:
+				connection.execute(text("ALTER TABLE chore_submissions_archive ADD COLUMN claim_day DATE"))
+		if "claim_slot" not in csa_columns:
+			with db.engine.begin() as connection:
+				connection.execute(text("ALTER TABLE chore_submissions_archive ADD COLUMN claim_slot INTEGER"))
+
+	if "task_claims" in table_names:
+		tc_columns = {column["name"] for column in inspector.get_columns("task_claims")}
+		if "is_exclusive" not in tc_columns:
+			with db.engine.begin() as connection:
+				connection.execute(text("ALTER TABLE task_claims ADD COLUMN is_exclusive BOOLEAN NOT NULL DEFAULT 0"))
+				connection.execute(text(_BACKFILL_TASK_CLAIM_EXCLUSIVE_SQL))
+
 	if "store_items" in table_names:
 		si2_columns = {column["name"] for column in inspector.get_columns("store_items")}
 		if "sort_order" not in si2_columns:
@@ -219,8 +426,41 @@ def _apply_postgres_schema_fixes() -> None:
 				"_apply_postgres_schema_fixes: skipped table %r: %s", table, exc
 			)
 
-
-def create_app() -> Flask:
+	# Columns added after the initial pgloader migration (create_all never alters
+	# existing tables).  Each entry: (table, column, column DDL, optional backfill SQL).
+	_pg_column_patches = [
+		("families", "store_catalog_version", "INTEGER NOT NULL DEFAULT 0", None),
+		("store_session_participants", "elapsed_seconds", "INTEGER NOT NULL DEFAULT 0", _BACKFILL_PARTICIPANT_TOTALS_SQL),
+		("store_session_participants", "coins_charged", "INTEGER NOT NULL DEFAULT 0", _BACKFILL_PARTICIPANT_TOTALS_SQL),
+		("store_redemptions", "yes_vote_count", "INTEGER NOT NULL DEFAULT 0", _BACKFILL_REDEMPTION_VOTE_COUNTS_SQL),
+		("store_redemptions", "no_vote_count", "INTEGER NOT NULL DEFAULT 0", _BACKFILL_REDEMPTION_VOTE_COUNTS_SQL),
+		("chore_submissions", "claim_day", "DATE", _BACKFILL_CHORE_CLAIM_SLOTS_SQL),
+		("chore_submissions", "claim_slot", "INTEGER", _BACKFILL_CHORE_CLAIM_SLOTS_SQL),
+		("chore_submissions_archive", "claim_day", "DATE", None),
+		("chore_submissions_archive", "claim_slot", "INTEGER", None),
+		("task_claims", "is_exclusive", "BOOLEAN NOT NULL DEFAULT FALSE", _BACKFILL_TASK_CLAIM_EXCLUSIVE_SQL),
+	]
+	pending_backfills = []
+	for table, col_name, col_sql, backfill_sql in _pg_column_patches:
+		if table not in table_names:
+			continue
+		if col_name in {c["name"] for c in inspector.get_columns(table)}:
+			continue
+		with db.engine.begin() as conn:
+			conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS {col_name} {col_sql}'))
+		if backfill_sql and backfill_sql not in pending_backfills:
+			pending_backfills.append(backfill_sql)
+	for backfill_sql in pending_backfills:
+		with db.engine.begin() as conn:
+			conn.execute(text(backfill_sql))
+
+
+def create_app(start_scheduler: bool = True) -> Flask:
+	"""Build the app.
+
+	CLI commands and tests pass start_scheduler=False, so only the web
+	process runs the background jobs.
+	"""
 	app = Flask(__name__)
 	app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
 	app.config["SQLALCHEMY_DATABASE_URI"] = _normalized_database_url()
@@ -251,9 +491,11 @@ def create_app() -> Flask:
 
 	# ── CSRF protection ──────────────────────────────────────────────────────
 	from flask_wtf.csrf import CSRFProtect
-	csrf = CSRFProtect(app)  # noqa: F841
-	# Note: if you add a Stripe webhook route, decorate it with @csrf.exempt
-	# since Stripe POSTs don't carry a session cookie or CSRF token.
+	csrf = CSRFProtect(app)
+	# Stripe POSTs don't carry a session cookie or CSRF token; the webhook
+	# authenticates them by signature instead.
+	from src.controllers.routes import stripe_webhook
+	csrf.exempt(stripe_webhook)
 
 	# ── Rate limiter ─────────────────────────────────────────────────────────
 	from flask_limiter import Limiter
@@ -266,13 +508,21 @@ def create_app() -> Flask:
 	app.jinja_env.globals["feature_can_access"] = _fca
 	app.jinja_env.globals["get_feature_tier"] = _gft
 	app.jinja_env.globals["FEATURES"] = _FEATURES
+	from src.utils.notifications import unread_count as _kid_unread_count
+	app.jinja_env.globals["kid_unread_notifications"] = _kid_unread_count
 
 	with app.app_context():
+		inbox_is_new = not inspect(db.engine).has_table("kid_notifications")
 		db.create_all()
 		if db.engine.dialect.name == "sqlite":
 			_apply_sqlite_schema_fixes()
 		elif db.engine.dialect.name == "postgresql":
 			_apply_postgres_schema_fixes()
+		_ensure_indexes()
+		from src.utils.admin_search import ensure_search_indexes
+		ensure_search_indexes()
+		if inbox_is_new and inspect(db.engine).has_table("coin_transactions"):
+			_seed_kid_notifications()
 		_seed_dev_admin()
 		# Load admin-managed env-var overrides from DB into os.environ
 		from src.utils.settings import load_app_settings
@@ -282,7 +532,7 @@ def create_app() -> Flask:
 		load_features_from_db()
 
 	# ── Background scheduler ─────────────────────────────────────────────────
-	if not app.debug or os.environ.get("SCHEDULER_ENABLED"):
+	if start_scheduler and (not app.debug or os.environ.get("SCHEDULER_ENABLED")):
 		_start_scheduler(app)
 
 	# ── Error handlers ───────────────────────────────────────────────────────
@@ -305,6 +555,24 @@ def create_app() -> Flask:
 	return app
 
 
+def _seed_kid_notifications() -> bool:
+	"""Seed the kid inbox from unseen postings unless another worker already has.
+
+	The marker row (NULL value, so it never reaches os.environ) is inserted in
+	the same transaction as the seed; a worker that loses the race hits its
+	primary key and skips.  Returns True if this call ran the seed.
+	"""
+	from sqlalchemy.exc import IntegrityError
+	from src.models.main import AppSetting
+	try:
+		with db.engine.begin() as connection:
+			connection.execute(AppSetting.__table__.insert().values(key=_SEED_KID_NOTIFICATIONS_MARKER, value=None))
+			connection.execute(text(_SEED_KID_NOTIFICATIONS_SQL))
+	except IntegrityError:
+		return False
+	return True
+
+
 def _seed_dev_admin() -> None:
 	"""Create a default superuser for development if one doesn't already exist.
 	Credentials: admin@email.com / admin
@@ -341,16 +609,64 @@ def _start_scheduler(app: "Flask") -> None:
 			_job_expire_trials()
 			_job_trial_reminders()
 			_job_purge_pending_devices()
+			_job_reconcile_coin_balances()
+			_job_archive_history()
+			_job_snapshot_admin_metrics()
+			_job_purge_stripe_events()
+			_job_purge_sent_email()
+
+	def run_email_dispatcher():
+		with app.app_context():
+			_job_dispatch_email()
+
+	def run_stripe_event_processor():
+		with app.app_context():
+			_job_process_stripe_events()
+
+	def run_store_session_ticker():
+		with app.app_context():
+			settled = _job_settle_store_sessions()
+			if settled:
+				app.logger.info("Store session ticker settled %s session(s).", settled)
 
 	scheduler.add_job(run_daily_jobs, "interval", hours=12, id="daily_jobs")
+	dispatch_seconds = max(5, int(os.environ.get("EMAIL_DISPATCH_SECONDS", "15")))
+	scheduler.add_job(
+		run_email_dispatcher,
+		"interval",
+		seconds=dispatch_seconds,
+		id="email_dispatcher",
+		max_instances=1,
+		coalesce=True,
+	)
+	stripe_seconds = max(5, int(os.environ.get("STRIPE_EVENT_TICK_SECONDS", "10")))
+	scheduler.add_job(
+		run_stripe_event_processor,
+		"interval",
+		seconds=stripe_seconds,
+		id="stripe_event_processor",
+		max_instances=1,
+		coalesce=True,
+	)
+	tick_seconds = max(5, int(os.environ.get("STORE_SESSION_TICK_SECONDS", "20")))
+	scheduler.add_job(
+		run_store_session_ticker,
+		"interval",
+		seconds=tick_seconds,
+		id="store_session_ticker",
+		max_instances=1,
+		coalesce=True,
+	)
 	scheduler.start()
+	# GET handlers read settled state instead of billing on every page view.
+	app.extensions["store_session_ticker"] = True
 
 
 def _job_expire_trials() -> None:
 	"""Downgrade families whose trial has ended without a Pro subscription."""
 	from datetime import datetime as _dt
 	from src.models.main import Family, db
-	from src.utils.email import send_email
+	from src.utils.email import queue_email
 	import os
 
 	expired = Family.query.filter(
@@ -361,7 +677,6 @@ def _job_expire_trials() -> None:
 
 	for family in expired:
 		family.subscription_status = None
-		db.session.commit()
 		base_url = os.environ.get("APP_BASE_URL", "https://app.stewardwell.com")
 		for parent in family.parents:
 			html = (
@@ -370,19 +685,21 @@ def _job_expire_trials() -> None:
 				f"Your account is now on the Free plan.</p>"
 				f"<p><a href='{base_url}/billing/upgrade'>Upgrade to Pro</a> to restore unlimited access.</p>"
 			)
-			send_email(
+			# Queued in the same commit as the downgrade.
+			queue_email(
 				to_email=parent.email,
 				to_name=parent.name,
 				subject="Your Stewardwell Pro trial has ended",
 				html_content=html,
 			)
+		db.session.commit()
 
 
 def _job_trial_reminders() -> None:
 	"""Send a reminder email to families with 3 days left on their trial."""
 	from datetime import datetime as _dt, timedelta as _td
 	from src.models.main import Family, db
-	from src.utils.email import send_email
+	from src.utils.email import queue_email
 	import os
 
 	window_start = _dt.utcnow() + _td(days=2, hours=23)
@@ -403,12 +720,14 @@ def _job_trial_reminders() -> None:
 				f"<p>Your Stewardwell Pro trial for <strong>{family.name}</strong> ends in <strong>3 days</strong>.</p>"
 				f"<p><a href='{base_url}/billing/upgrade'>Subscribe to Pro</a> to keep unlimited access.</p>"
 			)
-			send_email(
+			queue_email(
 				to_email=parent.email,
 				to_name=parent.name,
 				subject="Your Stewardwell Pro trial ends in 3 days",
 				html_content=html,
 			)
+	# One commit for the whole run; the dispatcher sends them in batches.
+	db.session.commit()
 
 
 def _job_purge_pending_devices() -> None:
@@ -421,3 +740,124 @@ def _job_purge_pending_devices() -> None:
 		PendingDeviceRegistration.expires_at < cutoff
 	).delete()
 	db.session.commit()
+
+
+def _job_reconcile_coin_balances() -> None:
+	"""Check Kid.coin_balance against balance checkpoints plus newer ledger rows."""
+	from flask import current_app
+	from src.utils.ledger import reconcile_balances
+
+	checked, drifted = reconcile_balances()
+	if drifted:
+		current_app.logger.warning("Coin reconciliation: %s of %s kid(s) drifted from the ledger.", drifted, checked)
+
+
+def _job_archive_history() -> None:
+	"""Move finished chore submissions and coin transactions past the retention horizon to the archive tables."""
+	from flask import current_app
+	from src.utils.archive import run_archival
+
+	submissions, transactions = run_archival()
+	if submissions or transactions:
+		current_app.logger.info("Archived %s chore submission(s) and %s coin transaction(s).", submissions, transactions)
+
+
+def _job_snapshot_admin_metrics() -> None:
+	"""Store today's admin dashboard counters in admin_metrics_snapshot."""
+	from src.utils.admin_metrics import take_snapshot
+
+	take_snapshot()
+
+
+def _job_dispatch_email() -> None:
+	"""Deliver due email_outbox rows."""
+	from flask import current_app
+	from src.utils.email import dispatch_outbox
+
+	sent, retried, dead = dispatch_outbox()
+	if retried or dead:
+		current_app.logger.warning("Email outbox: %s sent, %s retrying, %s dead-lettered.", sent, retried, dead)
+
+
+def _job_purge_sent_email() -> None:
+	"""Drop sent email_outbox rows past their retention."""
+	from src.utils.email import purge_sent_email
+
+	purge_sent_email()
+
+
+def _job_process_stripe_events() -> None:
+	"""Apply pending Stripe webhook events."""
+	from src.utils.stripe_events import process_stripe_events
+
+	process_stripe_events()
+
+
+def _job_purge_stripe_events() -> None:
+	"""Drop processed Stripe events past the redelivery window."""
+	from src.utils.stripe_events import purge_processed_events
+
+	purge_processed_events()
+
+
+def _job_settle_store_sessions(batch_size: int = 100) -> int:
+	"""Bill due minutes, end broke turns and expire countdowns for active timed sessions.
+
+	Walks active sessions in id order, one batch per commit, so a single tick
+	never holds a long transaction.  Returns the number of sessions whose state
+	changed.
+	"""
+	from datetime import datetime as _dt
+	from sqlalchemy.orm import selectinload
+	from src.models.main import StoreSessionParticipant, StoreTimedSession, db
+	from src.controllers.routes import (
+		_charge_shared_store_session,
+		_claim_store_session_end,
+		_close_store_session_turn,
+		_notify_session_ended,
+		_publish_store_session_event,
+		_sync_active_store_session_billing,
+	)
+
+	settled = 0
+	last_id = 0
+	while True:
+		batch = (
+			StoreTimedSession.query
+			.filter(StoreTimedSession.status == "active", StoreTimedSession.id > last_id)
+			.options(
+				selectinload(StoreTimedSession.store_item),
+				# current_turn is queried per session; its participant and kid then come from the identity map.
+				selectinload(StoreTimedSession.participants).selectinload(StoreSessionParticipant.kid),
+			)
+			.order_by(StoreTimedSession.id.asc())
+			.limit(batch_size)
+			.all()
+		)
+		if not batch:
+			break
+		last_id = batch[-1].id
+
+		changed = []
+		for timed_session in batch:
+			billed = _sync_active_store_session_billing(timed_session)
+			if timed_session.timing_mode == "countdown" and timed_session.remaining_seconds == 0:
+				ended_at = timed_session.countdown_ends_at
+				current_turn = timed_session.current_turn
+				if not _claim_store_session_end(timed_session, "completed", ended_at):
+					# The kid ended it or a parent cancelled it since the batch was read.
+					continue
+				if current_turn:
+					_close_store_session_turn(current_turn, min(ended_at, _dt.utcnow()))
+				_charge_shared_store_session(timed_session)
+				_notify_session_ended(timed_session, "Time's up! The session has ended.")
+				changed.append((timed_session, "ended"))
+			elif billed:
+				changed.append((timed_session, "billing"))
+		db.session.commit()
+
+		for timed_session, event_type in changed:
+			_publish_store_session_event(timed_session, event_type)
+		settled += len(changed)
+
+	return settled
@@ -15,6 +15,8 @@ from flask import (
 )
 
 from src.models.main import AppSetting, Family, Kid, Parent, PromoCode, PromoRedemption, TrustedDevice, db
+from src.utils.admin_metrics import latest_snapshot, snapshot_history, take_snapshot
+from src.utils.admin_search import search_families, search_parents
 from src.utils.limits import FEATURES, FEATURE_LABELS, _runtime_features, save_feature_tier
 from src.utils.settings import EMAIL_SETTING_DEFS, PAYMENT_SETTING_DEFS, save_app_setting
 
@@ -85,46 +87,57 @@ def admin_logout():
 @admin_bp.get("/")
 @admin_required
 def admin_dashboard():
-    total_families = Family.query.filter_by(is_active=True).count()
-    pro_families = Family.query.filter_by(plan="pro", is_active=True).count()
-    trialing_families = Family.query.filter(
-        Family.trial_ends_at > datetime.utcnow(), Family.is_active == True
-    ).count()
-    total_parents = Parent.query.count()
-    now = datetime.utcnow()
-    new_this_week = Family.query.filter(
-        Family.created_at >= now - timedelta(days=7),
-        Family.is_active == True,
-    ).count()
-    new_this_month = Family.query.filter(
-        Family.created_at >= now - timedelta(days=30),
-        Family.is_active == True,
-    ).count()
-    past_due = Family.query.filter_by(subscription_status="past_due").count()
+    # Counters come from the daily snapshot the scheduler writes; only a
+    # fresh install without one computes it inline.
+    snapshot = latest_snapshot() or take_snapshot()
+    history = snapshot_history()
+
+    def series(title, values, suffix=""):
+        points = [(row.day, value) for row, value in zip(history, values)]
+        peak = max([value for _, value in points if value is not None], default=0)
+        return {"title": title, "points": points, "peak": peak or 1, "suffix": suffix}
+
+    charts = [
+        series("Active families", [row.total_families for row in history]),
+        series("Pro subscribers", [row.pro_families for row in history]),
+        series(
+            "Trial conversion",
+            [round(row.trial_conversion_rate * 100) if row.trial_conversion_rate is not None else None for row in history],
+            suffix="%",
+        ),
+        series("Past due", [row.past_due for row in history]),
+    ]
 
     return render_template(
         "admin/dashboard.html",
-        total_families=total_families,
-        pro_families=pro_families,
-        trialing_families=trialing_families,
-        total_parents=total_parents,
-        new_this_week=new_this_week,
-        new_this_month=new_this_month,
-        past_due=past_due,
+        snapshot=snapshot,
+        total_families=snapshot.total_families,
+        pro_families=snapshot.pro_families,
+        trialing_families=snapshot.trialing_families,
+        total_parents=snapshot.total_parents,
+        new_this_week=snapshot.new_this_week,
+        new_this_month=snapshot.new_this_month,
+        past_due=snapshot.past_due,
+        charts=charts,
     )
 
 
+@admin_bp.post("/metrics/refresh")
+@admin_required
+def admin_refresh_metrics():
+    take_snapshot()
+    flash("Dashboard metrics refreshed.", "success")
+    return redirect(url_for("admin.admin_dashboard"))
+
+
 # ── Families ──────────────────────────────────────────────────────────────────
 
 @admin_bp.get("/families")
 @admin_required
 def admin_families():
     q = request.args.get("q", "").strip()
-    query = Family.query
-    if q:
-        query = query.filter(Family.name.ilike(f"%{q}%"))
-    families = query.order_by(Family.created_at.desc()).limit(200).all()
-    return render_template("admin/families.html", families=families, q=q)
+    families, next_cursor = search_families(q, after=request.args.get("after"))
+    return render_template("admin/families.html", families=families, q=q, next_cursor=next_cursor)
 
 
 @admin_bp.get("/families/<int:family_id>")
@@ -222,13 +235,8 @@ def stop_impersonating():
 @admin_required
 def admin_parents():
     q = request.args.get("q", "").strip()
-    query = Parent.query
-    if q:
-        query = query.filter(
-            (Parent.email.ilike(f"%{q}%")) | (Parent.name.ilike(f"%{q}%"))
-        )
-    parents = query.order_by(Parent.created_at.desc()).limit(200).all()
-    return render_template("admin/parents.html", parents=parents, q=q)
+    parents, next_cursor = search_parents(q, after=request.args.get("after"))
+    return render_template("admin/parents.html", parents=parents, q=q, next_cursor=next_cursor)
 
 
 @admin_bp.post("/parents/<int:parent_id>/deactivate")
@@ -470,21 +478,26 @@ def admin_email_settings_save():
 @admin_bp.post("/email-settings/test")
 @admin_required
 def admin_email_settings_test():
-    from src.utils.email import send_email
+    from src.utils.email import EmailAuthError, deliver_email
     parent = Parent.query.get(session["parent_id"])
-    ok = send_email(
-        to_email=parent.email,
-        to_name=parent.name,
-        subject="Stewardwell — test email",
-        html_content=(
-            "<p>Hi " + parent.name + ",</p>"
-            "<p>This is a test email sent from the Stewardwell admin panel to confirm "
-            "your Brevo configuration is working correctly.</p>"
-            "<p>If you received this, everything is set up!</p>"
-        ),
-    )
+    # Sent directly rather than through the outbox, so the result reflects
+    # the configuration as it is now.
+    try:
+        ok, _, error = deliver_email(
+            to_email=parent.email,
+            to_name=parent.name,
+            subject="Stewardwell — test email",
+            html_content=(
+                "<p>Hi " + parent.name + ",</p>"
+                "<p>This is a test email sent from the Stewardwell admin panel to confirm "
+                "your Brevo configuration is working correctly.</p>"
+                "<p>If you received this, everything is set up!</p>"
+            ),
+        )
+    except EmailAuthError as exc:
+        ok, error = False, str(exc)
     if ok:
         flash(f"Test email sent to {parent.email}. Check your inbox.", "success")
     else:
-        flash("Failed to send test email — check your API key and sender address.", "error")
+        flash(f"Failed to send test email — check your API key and sender address. ({error})", "error")
     return redirect(url_for("admin.admin_email_settings"))
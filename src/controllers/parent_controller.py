@@ -1,6 +1,8 @@
+from datetime import datetime, timedelta
 from functools import wraps
 
 from flask import Blueprint, jsonify, make_response, request, session
+from sqlalchemy import and_, or_
 
 from src.models.main import (
     CoinTransaction,
@@ -12,6 +14,7 @@ from src.models.main import (
     generate_family_code,
 )
 
+from src.utils import archive, ledger
 
 parent_bp = Blueprint("parent", __name__, url_prefix="/api/parent")
 
@@ -36,24 +39,23 @@ def _record_coin_transaction(
     ref_id: int | None = None,
     parent_id: int | None = None,
 ) -> CoinTransaction:
-    """Mutate kid.coin_balance by *amount* and append a CoinTransaction row.
+    """Post *amount* to the kid through the coin ledger and return the CoinTransaction.
 
     The caller is responsible for calling db.session.commit().
-    Amount should be negative for debits (e.g. fines, purchases).
+    Amount should be negative for debits (e.g. fines, purchases); like fines,
+    these postings are not floor-checked.
     """
-    kid.coin_balance += amount
-    tx = CoinTransaction(
-        kid_id=kid.id,
+    return ledger.post(
+        kid,
+        amount,
+        kind,
         family_id=family_id,
-        amount=amount,
-        kind=kind,
         reason=reason,
         ref_type=ref_type,
         ref_id=ref_id,
-        created_by_parent_id=parent_id,
+        parent_id=parent_id,
+        floor=None,
     )
-    db.session.add(tx)
-    return tx
 
 
 def _find_family_by_code(raw_code: str) -> Family | None:
@@ -321,27 +323,92 @@ def fine_kid(kid_id: int):
 # Transaction Log
 # ---------------------------------------------------------------------------
 
+TRANSACTIONS_PAGE_SIZE = 100
+TRANSACTIONS_MAX_PAGE_SIZE = 500
+
+
+def _encode_transactions_cursor(tx: CoinTransaction) -> str:
+    return f"{tx.created_at.isoformat()}_{tx.id}"
+
+
+def _decode_transactions_cursor(raw: str):
+    created_at_raw, _, id_raw = raw.rpartition("_")
+    return datetime.fromisoformat(created_at_raw), int(id_raw)
+
+
+def _parse_date_arg(raw: str | None, end_of_day: bool = False):
+    if not raw:
+        return None
+    value = datetime.fromisoformat(raw)
+    if end_of_day and len(raw) == 10:
+        value += timedelta(days=1)
+    return value
+
+
 @parent_bp.get("/transactions")
 @parent_login_required
 def list_transactions():
-    """Return all coin transactions for the parent's family, newest first."""
-    from datetime import datetime
+    """Return one page of the family's coin transactions, newest first.
 
+    Query args: kid_id, kind, since/until (ISO dates; until is inclusive),
+    limit (default 100, max 500) and cursor (the next_cursor of the previous
+    page).  Pages are keyset-paginated on (created_at, id) and include
+    archived transactions.
+    """
     family_id = session["family_id"]
-    query = CoinTransaction.query.filter_by(family_id=family_id)
+    # Hot and archived rows together (src/utils/archive.py).
+    transactions = archive.coin_transactions_union()
+    query = (
+        db.session.query(transactions, Kid.display_name)
+        .outerjoin(Kid, Kid.id == transactions.kid_id)
+        .filter(transactions.family_id == family_id)
+    )
 
     kid_id_raw = request.args.get("kid_id")
     if kid_id_raw:
         try:
-            query = query.filter_by(kid_id=int(kid_id_raw))
+            query = query.filter(transactions.kid_id == int(kid_id_raw))
         except ValueError:
             pass
 
     kind_filter = request.args.get("kind")
     if kind_filter:
-        query = query.filter_by(kind=kind_filter)
+        query = query.filter(transactions.kind == kind_filter)
 
-    transactions = query.order_by(CoinTransaction.created_at.desc()).all()
+    try:
+        since = _parse_date_arg(request.args.get("since"))
+        until = _parse_date_arg(request.args.get("until"), end_of_day=True)
+    except ValueError:
+        return jsonify({"success": False, "message": "since/until must be ISO dates."}), 400
+    if since:
+        query = query.filter(transactions.created_at >= since)
+    if until:
+        query = query.filter(transactions.created_at < until)
+
+    cursor_raw = request.args.get("cursor")
+    if cursor_raw:
+        try:
+            cursor_created_at, cursor_id = _decode_transactions_cursor(cursor_raw)
+        except ValueError:
+            return jsonify({"success": False, "message": "Invalid cursor."}), 400
+        query = query.filter(or_(
+            transactions.created_at < cursor_created_at,
+            and_(transactions.created_at == cursor_created_at, transactions.id < cursor_id),
+        ))
+
+    try:
+        limit = int(request.args.get("limit", TRANSACTIONS_PAGE_SIZE))
+    except ValueError:
+        limit = TRANSACTIONS_PAGE_SIZE
+    limit = max(1, min(limit, TRANSACTIONS_MAX_PAGE_SIZE))
+
+    rows = (
+        query.order_by(transactions.created_at.desc(), transactions.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     return jsonify({
         "success": True,
@@ -349,7 +416,7 @@ def list_transactions():
             {
                 "id": tx.id,
                 "kid_id": tx.kid_id,
-                "kid_name": tx.kid.display_name if tx.kid else None,
+                "kid_name": kid_name,
                 "amount": tx.amount,
                 "kind": tx.kind,
                 "reason": tx.reason,
@@ -359,6 +426,44 @@ def list_transactions():
                 "created_at": tx.created_at.isoformat(),
                 "approved_at": tx.approved_at.isoformat() if tx.approved_at else None,
             }
-            for tx in transactions
+            for tx, kid_name in rows
         ],
+        "next_cursor": _encode_transactions_cursor(rows[-1][0]) if has_more else None,
+    })
+
+
+STATS_PERIODS = {"week": 12, "month": 12}
+STATS_MAX_BUCKETS = 104
+
+
+@parent_bp.get("/stats")
+@parent_login_required
+def kid_activity_stats():
+    """Weekly or monthly activity totals for charts, read from kid_daily_stats.
+
+    Query args: period (week|month, default week), buckets (default 12) and
+    optional kid_id.
+    """
+    from src.utils.kid_stats import chart_series
+
+    family_id = session["family_id"]
+    period = request.args.get("period", "week")
+    if period not in STATS_PERIODS:
+        return jsonify({"success": False, "message": "period must be 'week' or 'month'."}), 400
+
+    try:
+        buckets = int(request.args.get("buckets", STATS_PERIODS[period]))
+        kid_id = int(request.args["kid_id"]) if request.args.get("kid_id") else None
+    except ValueError:
+        return jsonify({"success": False, "message": "buckets and kid_id must be integers."}), 400
+    buckets = max(1, min(buckets, STATS_MAX_BUCKETS))
+
+    if kid_id and not Kid.query.filter_by(id=kid_id, family_id=family_id).first():
+        return jsonify({"success": False, "message": "Kid not found."}), 404
+
+    return jsonify({
+        "success": True,
+        "period": period,
+        "kid_id": kid_id,
+        "series": chart_series(family_id, period, buckets, kid_id=kid_id),
     })
@@ -1,10 +1,13 @@
 import os
-import secrets
+import queue
 import time
 from datetime import date, datetime, timedelta
 from functools import wraps
 
-from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, send_from_directory, session, url_for
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, joinedload, selectinload
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, redirect, render_template, request, send_from_directory, session, stream_with_context, url_for
 from werkzeug.utils import secure_filename
 
 import math
@@ -31,7 +34,7 @@ from src.models.main import (
 	ChoreCategory,
 	ChoreScheduleSlot,
 	ChoreSubmission,
-	CoinTransaction,
+	ChoreSubmissionArchive,
 	Family,
 	GuardianJoinRequest,
 	Kid,
@@ -47,7 +50,6 @@ from src.models.main import (
 	StoreTimedSession,
 	Task,
 	TaskClaim,
-	Donation,
 	PromoCode,
 	PromoRedemption,
 	TrustedDevice,
@@ -55,7 +57,12 @@ from src.models.main import (
 	generate_family_code,
 )
 from src.utils.email import send_email
-from src.utils.limits import can_add, limit_reached_message, feature_can_access, get_feature_tier, FEATURE_LABELS
+from src.utils.photo_store import link_photo, release_photo_refs, resolve_photo, store_photo
+from src.utils import archive, family_export, notifications, session_events, stripe_events
+from src.utils.kid_stats import record_activity
+from src.utils.store_catalog import bump_catalog_version, get_catalog
+from src.utils import ledger
+from src.utils.limits import can_add, get_limit, limit_reached_message, feature_can_access, get_feature_tier, FEATURE_LABELS
 from src.controllers.parent_controller import _record_coin_transaction
 
 
@@ -222,6 +229,34 @@ def _active_store_sessions_by_item(family_id: int) -> dict[int, StoreTimedSessio
 	return {active_session.store_item_id: active_session for active_session in active_sessions}
 
 
+def _reserve_store_item_stock(item: StoreItem) -> bool:
+	"""Take one unit of stock with a single conditional UPDATE; False when sold out.
+
+	Unlimited items (stock_qty = -1) always succeed.  Concurrent buyers can no
+	longer both pass a Python-side check and oversell the last unit.  The
+	cached catalog is only invalidated when this sells the item out.
+	"""
+	taken = StoreItem.query.filter(
+		StoreItem.id == item.id,
+		StoreItem.stock_qty > 0,
+	).update({StoreItem.stock_qty: StoreItem.stock_qty - 1}, synchronize_session=False)
+	db.session.refresh(item, ["stock_qty"])
+	if taken and item.stock_qty == 0:
+		bump_catalog_version(item.family_id)
+	return bool(taken) or item.stock_qty < 0
+
+
+def _release_store_item_stock(item: StoreItem) -> None:
+	"""Give back one unit taken by _reserve_store_item_stock (no-op for unlimited items)."""
+	released = StoreItem.query.filter(
+		StoreItem.id == item.id,
+		StoreItem.stock_qty >= 0,
+	).update({StoreItem.stock_qty: StoreItem.stock_qty + 1}, synchronize_session=False)
+	db.session.refresh(item, ["stock_qty"])
+	if released and item.stock_qty == 1:
+		bump_catalog_version(item.family_id)
+
+
 def _family_parent_password_valid(family_id: int, password: str) -> bool:
 	if not password:
 		return False
@@ -234,6 +269,30 @@ def _close_store_session_turn(turn: StoreSessionTurn, ended_at: datetime | None
 
 	turn.ended_at = ended_at or datetime.utcnow()
 	turn.elapsed_seconds = max(0, int((turn.ended_at - turn.started_at).total_seconds()))
+	if turn.participant:
+		# Relative UPDATE: the ticker and request handlers may close turns of the same participant concurrently.
+		StoreSessionParticipant.query.filter(StoreSessionParticipant.id == turn.participant_id).update(
+			{StoreSessionParticipant.elapsed_seconds: StoreSessionParticipant.elapsed_seconds + turn.elapsed_seconds},
+			synchronize_session=False,
+		)
+		db.session.refresh(turn.participant, ["elapsed_seconds"])
+		record_activity([(turn.participant.kid_id, turn.family_id, turn.ended_at, {"session_seconds": turn.elapsed_seconds})])
+
+
+def _claim_store_session_end(timed_session: StoreTimedSession, status: str, ended_at: datetime) -> bool:
+	"""Move an active session to *status* with one conditional UPDATE.
+
+	Ending a session races between the kid's end button, a parent's cancel and
+	the background ticker; only the caller whose UPDATE still finds the row
+	active may close turns, charge or refund.  Returns False when another one
+	already ended it.
+	"""
+	claimed = StoreTimedSession.query.filter(
+		StoreTimedSession.id == timed_session.id,
+		StoreTimedSession.status == "active",
+	).update({StoreTimedSession.status: status, StoreTimedSession.ended_at: ended_at}, synchronize_session=False)
+	db.session.refresh(timed_session, ["status", "ended_at"])
+	return bool(claimed)
 
 
 def _turn_minute_rate(turn: StoreSessionTurn) -> int:
@@ -266,27 +325,65 @@ def _turn_paid_minutes(turn: StoreSessionTurn) -> int:
 	return turn.coins_charged // rate
 
 
-def _charge_next_turn_minute(turn: StoreSessionTurn) -> bool:
+class _TurnBillingConflict(Exception):
+	"""Another request billed the turn (or spent the kid's coins) first."""
+
+
+def _charge_turn_minutes(turn: StoreSessionTurn, minutes: int) -> int | None:
+	"""Charge up to `minutes` per-minute slices in one balance update and one ledger row.
+
+	Returns the number of minutes actually paid for (fewer when the kid cannot
+	afford them all), or None when a concurrent request changed the turn or
+	balance first — the caller should simply retry on its next sync.
+	"""
 	rate = _turn_minute_rate(turn)
-	if rate <= 0:
-		return True
+	if rate <= 0 or minutes <= 0:
+		return 0
 
 	kid = turn.participant.kid if turn.participant else None
-	if not kid or kid.coin_balance < rate:
-		return False
+	if not kid:
+		return 0
 
-	kid.coin_balance -= rate
-	turn.coins_charged += rate
-	db.session.add(CoinTransaction(
-		kid_id=kid.id,
-		family_id=turn.family_id,
-		amount=-rate,
-		kind="timed_session",
-		reason="Timed session charge (per minute)",
-		ref_type="store_session_turn",
-		ref_id=turn.id,
-	))
-	return True
+	# The loaded balance may be stale (the ticker reads kids in batches), and a
+	# low one would cut the turn short; the ledger's floor check still guards
+	# against a spend that lands after this read.
+	db.session.refresh(kid, ["coin_balance"])
+	affordable = min(minutes, max(0, kid.coin_balance) // rate)
+	if affordable <= 0:
+		return 0
+
+	amount = affordable * rate
+	participant = turn.participant
+	seen_coins_charged = turn.coins_charged or 0
+	try:
+		with db.session.begin_nested():
+			claimed = StoreSessionTurn.query.filter(
+				StoreSessionTurn.id == turn.id,
+				StoreSessionTurn.ended_at.is_(None),
+				StoreSessionTurn.coins_charged == seen_coins_charged,
+			).update({StoreSessionTurn.coins_charged: StoreSessionTurn.coins_charged + amount}, synchronize_session=False)
+			if not claimed:
+				raise _TurnBillingConflict()
+			StoreSessionParticipant.query.filter(
+				StoreSessionParticipant.id == participant.id,
+			).update({StoreSessionParticipant.coins_charged: StoreSessionParticipant.coins_charged + amount}, synchronize_session=False)
+			ledger.post(
+				kid,
+				-amount,
+				"timed_session",
+				family_id=turn.family_id,
+				reason="Timed session charge (per minute)" if affordable == 1 else f"Timed session charge ({affordable} minutes)",
+				ref_type="store_session_turn",
+				ref_id=turn.id,
+			)
+	except (_TurnBillingConflict, ledger.InsufficientCoinsError):
+		db.session.refresh(kid, ["coin_balance"])
+		db.session.refresh(turn, ["coins_charged"])
+		return None
+
+	db.session.refresh(turn, ["coins_charged"])
+	db.session.refresh(participant, ["coins_charged"])
+	return affordable
 
 
 def _charge_turn_start(turn: StoreSessionTurn) -> bool:
@@ -295,20 +392,27 @@ def _charge_turn_start(turn: StoreSessionTurn) -> bool:
 		return True
 
 	kid = turn.participant.kid if turn.participant else None
-	if not kid or kid.coin_balance < cost:
+	if not kid:
 		return False
 
-	kid.coin_balance -= cost
+	try:
+		ledger.post(
+			kid,
+			-cost,
+			"timed_session",
+			family_id=turn.family_id,
+			reason="Timed session charge (start cost)",
+			ref_type="store_session_turn",
+			ref_id=turn.id,
+		)
+	except ledger.InsufficientCoinsError:
+		return False
 	turn.coins_charged += cost
-	db.session.add(CoinTransaction(
-		kid_id=kid.id,
-		family_id=turn.family_id,
-		amount=-cost,
-		kind="timed_session",
-		reason="Timed session charge (start cost)",
-		ref_type="store_session_turn",
-		ref_id=turn.id,
-	))
+	StoreSessionParticipant.query.filter(StoreSessionParticipant.id == turn.participant_id).update(
+		{StoreSessionParticipant.coins_charged: StoreSessionParticipant.coins_charged + cost},
+		synchronize_session=False,
+	)
+	db.session.refresh(turn.participant, ["coins_charged"])
 	return True
 
 
@@ -326,33 +430,49 @@ def _sync_active_store_session_billing(timed_session: StoreTimedSession) -> bool
 		return False
 
 	now = datetime.utcnow()
-	changed = False
+	ends_at = timed_session.countdown_ends_at
+	expired = bool(ends_at and now >= ends_at)
+	if expired:
+		now = ends_at
 	elapsed_seconds = max(0, int((now - turn.started_at).total_seconds()))
-	minutes_needed = (elapsed_seconds // 60) + 1
+	# An expired countdown is billed only up to its end: no new minute starts there.
+	minutes_needed = -(-elapsed_seconds // 60) if expired else (elapsed_seconds // 60) + 1
+	paid_minutes = _turn_paid_minutes(turn)
+	minutes_due = minutes_needed - paid_minutes
+	if minutes_due <= 0:
+		return False
 
-	while _turn_paid_minutes(turn) < minutes_needed:
-		if not _charge_next_turn_minute(turn):
-			paid_seconds = _turn_paid_minutes(turn) * 60
-			turn.ended_at = turn.started_at + timedelta(seconds=paid_seconds)
-			if turn.ended_at > now:
-				turn.ended_at = now
-			turn.elapsed_seconds = max(0, int((turn.ended_at - turn.started_at).total_seconds()))
-			return True
-		changed = True
+	charged_minutes = _charge_turn_minutes(turn, minutes_due)
+	if charged_minutes is None:
+		return False
 
-	return changed
+	if charged_minutes < minutes_due:
+		# Out of coins: the turn ends exactly where the last paid minute runs out.
+		paid_seconds = (paid_minutes + charged_minutes) * 60
+		_close_store_session_turn(turn, min(turn.started_at + timedelta(seconds=paid_seconds), now))
+	return True
+
+
+def _store_session_ticker_running() -> bool:
+	"""True when the background ticker settles sessions, so GET handlers can skip billing."""
+	return bool(current_app.extensions.get("store_session_ticker"))
 
 
 def _participant_elapsed_seconds(timed_session: StoreTimedSession) -> dict[int, int]:
+	current_turn = timed_session.current_turn
 	elapsed_by_participant = {}
-	for turn in timed_session.turns or []:
-		elapsed_seconds = turn.elapsed_seconds
-		if turn.ended_at is None:
-			elapsed_seconds = turn.live_elapsed_seconds
-		elapsed_by_participant[turn.participant_id] = elapsed_by_participant.get(turn.participant_id, 0) + elapsed_seconds
+	for participant in timed_session.participants or []:
+		elapsed_seconds = participant.elapsed_seconds or 0
+		if current_turn and current_turn.participant_id == participant.id:
+			elapsed_seconds += current_turn.live_elapsed_seconds
+		elapsed_by_participant[participant.id] = elapsed_seconds
 	return elapsed_by_participant
 
 
+def _participant_charged_coins(timed_session: StoreTimedSession) -> dict[int, int]:
+	return {participant.id: participant.coins_charged or 0 for participant in timed_session.participants or []}
+
+
 def _charge_shared_store_session(timed_session: StoreTimedSession) -> list[dict]:
 	item = timed_session.store_item
 	if not item:
@@ -361,18 +481,12 @@ def _charge_shared_store_session(timed_session: StoreTimedSession) -> list[dict]
 	charge_summary = []
 	total_charged = 0
 	seconds_by_participant = _participant_elapsed_seconds(timed_session)
-	participant_by_id = {participant.id: participant for participant in timed_session.participants or []}
-	coins_by_participant = {}
-	for turn in timed_session.turns or []:
-		coins_by_participant[turn.participant_id] = coins_by_participant.get(turn.participant_id, 0) + (turn.coins_charged or 0)
-
-	for participant_id, elapsed_seconds in seconds_by_participant.items():
-		participant = participant_by_id.get(participant_id)
-		if not participant:
+	for participant in timed_session.participants or []:
+		elapsed_seconds = seconds_by_participant.get(participant.id, 0)
+		coins_due = participant.coins_charged or 0
+		if not elapsed_seconds and not coins_due:
 			continue
 
-		coins_due = coins_by_participant.get(participant_id, 0)
-
 		total_charged += coins_due
 		charge_summary.append(
 			{
@@ -387,13 +501,117 @@ def _charge_shared_store_session(timed_session: StoreTimedSession) -> list[dict]
 	return charge_summary
 
 
+def _notify_session_ended(timed_session: StoreTimedSession, message: str, skip_kid_id: int | None = None) -> None:
+	"""Drop a session-ended item in the inbox of every kid who took part."""
+	item_name = timed_session.store_item.name if timed_session.store_item else "Session"
+	for participant in timed_session.participants or []:
+		if not participant.kid_id or participant.kid_id == skip_kid_id:
+			continue
+		coins = participant.coins_charged or 0
+		notifications.notify(
+			participant.kid_id,
+			timed_session.family_id,
+			"session_ended",
+			f"⏱️ {item_name}: {message}" + (f" You spent {coins} coin{'s' if coins != 1 else ''}." if coins else ""),
+			ref_type="store_timed_session",
+			ref_id=timed_session.id,
+		)
+
+
+def _store_session_state(timed_session: StoreTimedSession) -> dict:
+	"""Serializable snapshot of a timed session, shared by the status endpoint and the SSE stream."""
+	item = timed_session.store_item
+	current_turn = timed_session.current_turn
+	elapsed_by_participant = _participant_elapsed_seconds(timed_session)
+	charged_by_participant = _participant_charged_coins(timed_session)
+	current_turn_paid_seconds = (_turn_paid_minutes(current_turn) * 60) if current_turn else 0
+	return {
+		"session_id": timed_session.id,
+		"store_item_id": timed_session.store_item_id,
+		"status": timed_session.status,
+		"started_by_kid_id": timed_session.started_by_kid_id,
+		"started_by_kid_name": timed_session.started_by_kid.display_name if timed_session.started_by_kid else None,
+		"timing_mode": timed_session.timing_mode,
+		"elapsed_seconds": timed_session.elapsed_seconds,
+		"current_turn_id": current_turn.id if current_turn else None,
+		"current_participant_id": current_turn.participant_id if current_turn else None,
+		"current_participant_name": current_turn.participant.display_name if current_turn and current_turn.participant else None,
+		"current_turn_elapsed_seconds": current_turn.live_elapsed_seconds if current_turn else 0,
+		"current_turn_paid_seconds": current_turn_paid_seconds,
+		"participant_elapsed_seconds": elapsed_by_participant,
+		"participant_charged_coins": charged_by_participant,
+		"planned_duration_minutes": timed_session.planned_duration_minutes,
+		"remaining_seconds": timed_session.remaining_seconds,
+		"total_coins_charged": timed_session.total_coins_charged,
+		"session_rate_type": item.session_rate_type if item else None,
+		"session_coin_per_minute": item.session_coin_per_minute if item else 0,
+	}
+
+
+def _publish_store_session_event(timed_session: StoreTimedSession, event_type: str) -> None:
+	"""Push the committed session state to every open store stream for the family."""
+	if not timed_session or not session_events.subscriber_count(timed_session.family_id):
+		return
+	payload = _store_session_state(timed_session)
+	payload["type"] = event_type
+	session_events.publish(timed_session.family_id, payload)
+
+
 def _vote_summary_for_redemptions(redemptions: list[StoreRedemption]) -> dict[int, dict[str, int]]:
-	summary = {}
-	for redemption in redemptions:
-		yes_votes = sum(1 for vote in redemption.votes if vote.vote == "yes")
-		no_votes = sum(1 for vote in redemption.votes if vote.vote == "no")
-		summary[redemption.id] = {"yes": yes_votes, "no": no_votes}
-	return summary
+	"""Read the denormalised vote counters; no vote rows are loaded."""
+	return {
+		redemption.id: {"yes": redemption.yes_vote_count or 0, "no": redemption.no_vote_count or 0}
+		for redemption in redemptions
+	}
+
+
+def _vote_count_column(vote_value: str):
+	return StoreRedemption.yes_vote_count if vote_value == "yes" else StoreRedemption.no_vote_count
+
+
+def _cast_redemption_vote(redemption_id: int, kid_id: int, vote_value: str) -> bool:
+	"""Record the kid's yes/no vote and move the tallies; False when that vote already stood.
+
+	The tallies follow the row the write actually changed (a new vote, or a
+	conditional UPDATE away from the other option), so a double tap or two
+	concurrent changes by the same kid are counted once.
+	"""
+	previous_value = None
+	try:
+		with db.session.begin_nested():
+			db.session.add(StoreRedemptionVote(redemption_id=redemption_id, kid_id=kid_id, vote=vote_value))
+	except IntegrityError:
+		changed = StoreRedemptionVote.query.filter(
+			StoreRedemptionVote.redemption_id == redemption_id,
+			StoreRedemptionVote.kid_id == kid_id,
+			StoreRedemptionVote.vote != vote_value,
+		).update({StoreRedemptionVote.vote: vote_value}, synchronize_session=False)
+		if not changed:
+			return False
+		# Votes are yes or no, so the row held the other option.
+		previous_value = "no" if vote_value == "yes" else "yes"
+
+	counter_updates = {_vote_count_column(vote_value): _vote_count_column(vote_value) + 1}
+	if previous_value:
+		counter_updates[_vote_count_column(previous_value)] = _vote_count_column(previous_value) - 1
+	StoreRedemption.query.filter(StoreRedemption.id == redemption_id).update(counter_updates, synchronize_session=False)
+	return True
+
+
+def _notify_redemption_kids(redemption: StoreRedemption, kind: str, message: str, level: str) -> None:
+	"""Inbox item for the requesting kid and every kid splitting the purchase."""
+	kid_ids = {redemption.requested_by_kid_id}
+	kid_ids.update(participant.kid_id for participant in redemption.participants or [] if participant.kid_id)
+	for kid_id in kid_ids:
+		notifications.notify(
+			kid_id,
+			redemption.family_id,
+			kind,
+			message,
+			level=level,
+			ref_type="store_redemption",
+			ref_id=redemption.id,
+		)
 
 
 def _redirect_to_next_or_default(next_path: str | None, default_endpoint: str, **default_kwargs):
@@ -590,7 +808,8 @@ def _parse_chore_form_data(form_data, family_id: int) -> dict | None:
 ALLOWED_CHORE_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
 
 
-def _save_chore_photo(file_storage, family_id: int, kid_id: int, photo_type: str) -> str | None:
+def _chore_photo_extension(file_storage) -> str | None:
+	"""The upload's allowed image extension, or None (with a flash) when it is not a photo."""
 	if not file_storage or not file_storage.filename:
 		return None
 
@@ -599,15 +818,14 @@ def _save_chore_photo(file_storage, family_id: int, kid_id: int, photo_type: str
 	if extension not in ALLOWED_CHORE_IMAGE_EXTENSIONS:
 		flash("Photos must be JPG, PNG, or WEBP.", "error")
 		return None
+	return extension
 
-	upload_root = os.path.join(current_app.instance_path, "uploads", "chore_photos")
-	os.makedirs(upload_root, exist_ok=True)
-
-	generated = f"family{family_id}_kid{kid_id}_{photo_type}_{secrets.token_hex(8)}{extension}"
-	absolute_path = os.path.join(upload_root, generated)
-	file_storage.save(absolute_path)
 
-	return os.path.join("chore_photos", generated)
+def _save_chore_photo(file_storage) -> str | None:
+	extension = _chore_photo_extension(file_storage)
+	if not extension:
+		return None
+	return store_photo(file_storage, extension)
 
 
 def _active_chore_submission_for_chore(chore: Chore) -> ChoreSubmission | None:
@@ -626,11 +844,56 @@ def _claimed_slots_for_today(chore: Chore) -> int:
 	return ChoreSubmission.query.filter(
 		ChoreSubmission.chore_id == chore.id,
 		ChoreSubmission.reset_version == chore.daily_reset_version,
-		db.func.date(ChoreSubmission.claimed_at) == db.cast(date.today(), db.Date),
-		ChoreSubmission.status.in_(["claimed", "submitted", "approved"]),
+		ChoreSubmission.claim_day == date.today(),
+		ChoreSubmission.claim_slot.isnot(None),
 	).count()
 
 
+def _insert_chore_claim(submission: ChoreSubmission, chore: Chore) -> str:
+	"""Insert *submission* into a free claim slot of today's chore.
+
+	Returns "claimed", "duplicate" when the kid already holds a slot today
+	(e.g. a double tap), or "full" when no slot is left.  The unique slot
+	indexes on ChoreSubmission make the INSERT the arbiter: when a concurrent
+	claim takes the same slot first, this one moves on to the next free slot
+	instead of over-claiming.
+	"""
+	submission.claim_day = date.today()
+	taken = {
+		slot
+		for (slot,) in db.session.query(ChoreSubmission.claim_slot).filter(
+			ChoreSubmission.chore_id == chore.id,
+			ChoreSubmission.reset_version == submission.reset_version,
+			ChoreSubmission.claim_day == submission.claim_day,
+			ChoreSubmission.claim_slot.isnot(None),
+		)
+	}
+	for slot in range(1, chore.max_concurrent_claims + 1):
+		if slot in taken:
+			continue
+		submission.claim_slot = slot
+		try:
+			with db.session.begin_nested():
+				db.session.add(submission)
+		except IntegrityError:
+			# Lost this slot to another claim, or this kid already holds one today.
+			if _kid_holds_chore_claim_slot(submission):
+				return "duplicate"
+			continue
+		return "claimed"
+	return "full"
+
+
+def _kid_holds_chore_claim_slot(submission: ChoreSubmission) -> bool:
+	return db.session.query(ChoreSubmission.id).filter(
+		ChoreSubmission.chore_id == submission.chore_id,
+		ChoreSubmission.reset_version == submission.reset_version,
+		ChoreSubmission.claim_day == submission.claim_day,
+		ChoreSubmission.kid_id == submission.kid_id,
+		ChoreSubmission.claim_slot.isnot(None),
+	).first() is not None
+
+
 def _remaining_claim_slots_for_today(chore: Chore) -> int:
 	return max(0, chore.max_concurrent_claims - _claimed_slots_for_today(chore))
 
@@ -656,6 +919,7 @@ def _recalculate_chore_split_rewards(chore: Chore, reset_version: int, claimed_d
 	point_base = chore.point_value // count
 	point_remainder = chore.point_value % count
 
+	coin_legs = []
 	for index, approved_submission in enumerate(approved_submissions):
 		target_coin_award = coin_base + (1 if index < coin_remainder else 0)
 		target_point_award = point_base + (1 if index < point_remainder else 0)
@@ -664,43 +928,44 @@ def _recalculate_chore_split_rewards(chore: Chore, reset_version: int, claimed_d
 		point_delta = target_point_award - (approved_submission.awarded_point_amount or 0)
 
 		if coin_delta:
-			approved_submission.kid.coin_balance += coin_delta
 			approved_submission.awarded_coin_amount = target_coin_award
-			from datetime import datetime as _dt
-			db.session.add(CoinTransaction(
-				kid_id=approved_submission.kid.id,
-				family_id=approved_submission.family_id,
+			coin_legs.append(ledger.LedgerLeg(
+				kid=approved_submission.kid,
 				amount=coin_delta,
 				kind="chore_reward",
+				family_id=approved_submission.family_id,
 				reason=f"Chore approved: {approved_submission.chore.name}",
 				ref_type="chore_submission",
 				ref_id=approved_submission.id,
-				created_by_parent_id=approved_submission.resolved_by_parent_id,
-				created_at=approved_submission.submitted_at or _dt.utcnow(),
-				approved_at=_dt.utcnow(),
+				parent_id=approved_submission.resolved_by_parent_id,
+				created_at=approved_submission.submitted_at,
+				approved_at=datetime.utcnow(),
 			))
 
 		if point_delta:
 			approved_submission.family.family_points_balance += point_delta
 			approved_submission.awarded_point_amount = target_point_award
 
+	# Re-splitting can claw coins back from earlier approvals, so no floor check.
+	ledger.post_many(coin_legs, floor=None)
+
 
 def _apply_chore_award(submission: ChoreSubmission, target_coin_award: int, target_point_award: int) -> None:
 	coin_delta = target_coin_award - (submission.awarded_coin_amount or 0)
 	point_delta = target_point_award - (submission.awarded_point_amount or 0)
 
 	if coin_delta:
-		submission.kid.coin_balance += coin_delta
-		db.session.add(CoinTransaction(
-			kid_id=submission.kid.id,
+		ledger.post(
+			submission.kid,
+			coin_delta,
+			"chore_reward",
 			family_id=submission.family_id,
-			amount=coin_delta,
-			kind="chore_reward",
 			reason=f"Chore approved: {submission.chore.name}",
 			ref_type="chore_submission",
 			ref_id=submission.id,
-			created_by_parent_id=submission.resolved_by_parent_id,
-		))
+			parent_id=submission.resolved_by_parent_id,
+			floor=None,
+		)
 
 	if point_delta:
 		submission.family.family_points_balance += point_delta
@@ -1153,96 +1418,12 @@ def stripe_webhook():
 		current_app.logger.warning("Stripe webhook bad signature: %s", exc)
 		return jsonify({"error": "invalid signature"}), 400
 
-	obj = event["data"]["object"]
-	family_id = None
-
-	# Try to resolve family from metadata or subscription
-	if event["type"] == "checkout.session.completed":
-		family_id = obj.get("metadata", {}).get("family_id")
-		if family_id:
-			family = Family.query.get(int(family_id))
-			if family:
-				sub = stripe.Subscription.retrieve(obj["subscription"])
-				family.plan = "pro"
-				family.stripe_subscription_id = sub.id
-				family.subscription_status = sub.status
-				db.session.commit()
-
-	elif event["type"] == "invoice.payment_succeeded":
-		sub_id = obj.get("subscription")
-		if sub_id:
-			family = Family.query.filter_by(stripe_subscription_id=sub_id).first()
-			if family:
-				family.subscription_status = "active"
-				db.session.commit()
-
-	elif event["type"] == "invoice.payment_failed":
-		sub_id = obj.get("subscription")
-		if sub_id:
-			family = Family.query.filter_by(stripe_subscription_id=sub_id).first()
-			if family:
-				family.subscription_status = "past_due"
-				db.session.commit()
-				# Send dunning email to all parents
-				_send_payment_failed_email(family)
-
-	elif event["type"] == "payment_intent.succeeded":
-		# Log one-time donation from Stripe Payment Link
-		pi_id = obj.get("id")
-		if pi_id and not Donation.query.filter_by(stripe_payment_intent_id=pi_id).first():
-			billing = obj.get("charges", {}).get("data", [{}])
-			charge = billing[0] if billing else {}
-			billing_details = charge.get("billing_details") or obj.get("payment_method_options", {})
-			donor_email = (charge.get("billing_details") or {}).get("email") or obj.get("receipt_email")
-			donor_name  = (charge.get("billing_details") or {}).get("name")
-			donation = Donation(
-				stripe_payment_intent_id=pi_id,
-				amount_cents=obj.get("amount_received", obj.get("amount", 0)),
-				currency=obj.get("currency", "usd"),
-				donor_email=donor_email,
-				donor_name=donor_name,
-			)
-			db.session.add(donation)
-			db.session.commit()
-			current_app.logger.info("Donation logged: %s %s", pi_id, donation.amount_display)
-
-	elif event["type"] == "customer.subscription.deleted":
-		sub_id = obj.get("id")
-		if sub_id:
-			family = Family.query.filter_by(stripe_subscription_id=sub_id).first()
-			if family:
-				family.plan = "free"
-				family.subscription_status = "canceled"
-				family.stripe_subscription_id = None
-				db.session.commit()
-
+	# Store and acknowledge; src/utils/stripe_events.py applies it in the background.
+	# A redelivered event id is already stored and is acknowledged as-is.
+	stripe_events.record_event(payload)
 	return jsonify({"received": True}), 200
 
 
-def _send_payment_failed_email(family: "Family") -> None:
-	base_url = os.environ.get("APP_BASE_URL", "https://app.stewardwell.com")
-	for parent in family.parents:
-		html = f"""
-		<p>Hi {parent.name},</p>
-		<p>We were unable to process your Stewardwell Pro payment. Your account has been
-		flagged as <strong>past due</strong>. Please update your payment method to keep your Pro access.</p>
-		<p style="text-align:center;margin:24px 0;">
-			<a href="{base_url}/billing/portal"
-			   style="background:#e53e3e;color:#fff;padding:12px 28px;border-radius:8px;
-			          text-decoration:none;font-weight:700;font-size:15px;">
-				Update Payment Method
-			</a>
-		</p>
-		<p style="color:#888;font-size:12px;">If you have questions, reply to this email.</p>
-		"""
-		send_email(
-			to_email=parent.email,
-			to_name=parent.name,
-			subject="Action required: Stewardwell payment failed",
-			html_content=html,
-		)
-
-
 def _run_daily_chore_reset(family: "Family") -> None:
 	"""Lazy daily reset: bumps daily_reset_version on all active scheduled chores
 	and archives prior-day approved submissions. Runs at most once per family per
@@ -1573,6 +1754,7 @@ def parent_reset_chore_day(chore_id: int):
 
 	for submission in active_submissions:
 		submission.status = "rejected"
+		submission.claim_slot = None
 		submission.resolved_at = datetime.utcnow()
 		submission.resolved_by_parent_id = parent.id
 		submission.resolution_note = "Reset by parent"
@@ -1595,6 +1777,10 @@ def parent_delete_chore(chore_id: int):
 		flash("Chore not found.", "error")
 		return redirect(url_for("public.parent_chores"))
 	name = chore.name
+	release_photo_refs(
+		"chore_submission",
+		[submission.id for submission in chore.submissions] + [submission.id for submission in chore.archived_submissions],
+	)
 	db.session.delete(chore)
 	db.session.commit()
 	flash(f'"{name}" deleted.', "success")
@@ -1604,7 +1790,7 @@ def parent_delete_chore(chore_id: int):
 @public_bp.get("/parent/chores/submissions/<int:submission_id>/photo/<string:photo_type>")
 @parent_web_login_required
 def parent_view_chore_submission_photo(submission_id: int, photo_type: str):
-	submission = ChoreSubmission.query.get(submission_id)
+	submission = ChoreSubmission.query.get(submission_id) or ChoreSubmissionArchive.query.get(submission_id)
 	if not submission or submission.family_id != session.get("family_id"):
 		abort(404)
 
@@ -1615,9 +1801,10 @@ def parent_view_chore_submission_photo(submission_id: int, photo_type: str):
 	if not photo_path:
 		abort(404)
 
-	filename = os.path.basename(photo_path)
-	directory = os.path.join(current_app.instance_path, "uploads", "chore_photos")
-	return send_from_directory(directory, filename)
+	resolved = resolve_photo(photo_path, "chore_photos")
+	if resolved is None:
+		abort(404)
+	return send_from_directory(*resolved)
 
 
 @public_bp.post("/parent/chores/submissions/<int:submission_id>/decision")
@@ -1659,6 +1846,7 @@ def parent_chore_submission_decision(submission_id: int):
 	if action == "reject":
 		submission.awarded_coin_amount = 0
 		submission.awarded_point_amount = 0
+		submission.claim_slot = None
 
 	if action == "approve":
 		if submission.chore.max_concurrent_claims > 1:
@@ -1676,6 +1864,21 @@ def parent_chore_submission_decision(submission_id: int):
 			target_coin_award = (submission.chore.coin_reward * reward_percent) // 100
 			target_point_award = (submission.chore.point_value * reward_percent) // 100
 			_apply_chore_award(submission, target_coin_award, target_point_award)
+		record_activity([(submission.kid_id, submission.family_id, submission.resolved_at, {"chores_approved": 1})])
+
+	if action == "approve":
+		message = f"✅ '{submission.chore.name}' was approved! +{submission.awarded_coin_amount} coins."
+	else:
+		message = f"'{submission.chore.name}' was not approved. {resolution_note}"
+	notifications.notify(
+		submission.kid_id,
+		submission.family_id,
+		f"chore_{submission.status}",
+		message.strip(),
+		level="success" if action == "approve" else "info",
+		ref_type="chore_submission",
+		ref_id=submission.id,
+	)
 
 	db.session.commit()
 	flash(
@@ -1699,16 +1902,9 @@ def parent_store():
 	if active_tab not in {"kid", "family"}:
 		active_tab = "kid"
 
-	kid_items = (
-		StoreItem.query.filter_by(family_id=family.id, item_scope="kid", is_active=True)
-		.order_by(StoreItem.created_at.desc())
-		.all()
-	)
-	family_items = (
-		StoreItem.query.filter_by(family_id=family.id, item_scope="family", is_active=True)
-		.order_by(StoreItem.created_at.desc())
-		.all()
-	)
+	store_items = get_catalog(family)
+	kid_items = [item for item in store_items if item.item_scope == "kid"]
+	family_items = [item for item in store_items if item.item_scope == "family"]
 	kids = Kid.query.filter_by(family_id=family.id, is_active=True).order_by(Kid.display_name.asc()).all()
 
 	family_redemptions = (
@@ -1870,6 +2066,7 @@ def parent_store_create_item():
 		require_parent_approval=(require_parent_approval if item_scope == "kid" and item_type == "basic" else False),
 	)
 	db.session.add(item)
+	bump_catalog_version(item.family_id)
 	db.session.commit()
 
 	flash(f'Added "{item.name}" to the {item_scope} store.', "success")
@@ -1885,6 +2082,7 @@ def parent_store_toggle_item(item_id: int):
 		return redirect(url_for("public.parent_store"))
 
 	item.is_active = not item.is_active
+	bump_catalog_version(item.family_id)
 	db.session.commit()
 	flash(f'"{item.name}" is now {"active" if item.is_active else "paused"}.', "success")
 	return redirect(url_for("public.parent_store", tab=item.item_scope))
@@ -1975,6 +2173,7 @@ def parent_store_edit_item(item_id: int):
 	item.session_max_participants = session_max_participants
 	item.stock_qty = stock_qty
 	item.require_parent_approval = require_parent_approval if item.item_scope == "kid" and item_type == "basic" else False
+	bump_catalog_version(item.family_id)
 	db.session.commit()
 
 	flash(f'"{item.name}" updated.', "success")
@@ -1992,6 +2191,7 @@ def parent_store_delete_item(item_id: int):
 	item_name = item.name
 	item_scope = item.item_scope
 	db.session.delete(item)
+	bump_catalog_version(item.family_id)
 	db.session.commit()
 
 	flash(f'"{item_name}" deleted.', "success")
@@ -2054,16 +2254,8 @@ def parent_store_add_kid_coins():
 		flash("Kid not found.", "error")
 		return _redirect_to_next_or_default(next_path, "public.parent_store", tab="kid")
 
-	kid.coin_balance += coins
 	tx_reason = reason if reason else "Rewarded by parent"
-	db.session.add(CoinTransaction(
-		kid_id=kid.id,
-		family_id=kid.family_id,
-		amount=coins,
-		kind="manual_add",
-		reason=tx_reason,
-		created_by_parent_id=session.get("parent_id"),
-	))
+	ledger.post(kid, coins, "manual_add", reason=tx_reason, parent_id=session.get("parent_id"))
 	db.session.commit()
 	flash(f"Rewarded {kid.display_name} with {coins} coins.", "success")
 	return _redirect_to_next_or_default(next_path, "public.parent_store", tab="kid")
@@ -2102,15 +2294,7 @@ def parent_store_reward_kid():
 		flash("Kid not found.", "error")
 		return _redirect_to_next_or_default(next_path, "public.parent_dashboard")
 
-	kid.coin_balance += coins
-	db.session.add(CoinTransaction(
-		kid_id=kid.id,
-		family_id=kid.family_id,
-		amount=coins,
-		kind="manual_add",
-		reason=f"Reward: {description}",
-		created_by_parent_id=session.get("parent_id"),
-	))
+	ledger.post(kid, coins, "manual_add", reason=f"Reward: {description}", parent_id=session.get("parent_id"))
 	db.session.commit()
 	flash(f"🏆 Rewarded {kid.display_name} with {coins} coins — {description}!", "success")
 	return _redirect_to_next_or_default(next_path, "public.parent_dashboard")
@@ -2153,15 +2337,13 @@ def parent_store_cash_to_coins():
 		flash("Amount too small to convert to coins.", "error")
 		return _redirect_to_next_or_default(next_path, "public.parent_store", tab="kid")
 
-	kid.coin_balance += coins
-	db.session.add(CoinTransaction(
-		kid_id=kid.id,
-		family_id=kid.family_id,
-		amount=coins,
-		kind="manual_add",
+	ledger.post(
+		kid,
+		coins,
+		"manual_add",
 		reason=f"Cash to coins: ${dollars:.2f} = {coins} coins" + (f" — {description}" if description else ""),
-		created_by_parent_id=session.get("parent_id"),
-	))
+		parent_id=session.get("parent_id"),
+	)
 	db.session.commit()
 	flash(f"Converted ${dollars:.2f} → {coins} coins for {kid.display_name}.", "success")
 	return _redirect_to_next_or_default(next_path, "public.parent_store", tab="kid")
@@ -2194,6 +2376,7 @@ def parent_store_approve_family_redemption(redemption_id: int):
 	redemption.status = "approved"
 	redemption.resolved_at = datetime.utcnow()
 	redemption.resolved_by_parent_id = session["parent_id"]
+	_notify_redemption_kids(redemption, "purchase_approved", f"🎉 Family goal '{item.name}' was approved!", "success")
 	db.session.commit()
 
 	flash(f'Approved "{item.name}" for {redemption.requested_by_kid.display_name}.', "success")
@@ -2221,6 +2404,7 @@ def parent_store_reject_family_redemption(redemption_id: int):
 	redemption.status = "rejected"
 	redemption.resolved_at = datetime.utcnow()
 	redemption.resolved_by_parent_id = session["parent_id"]
+	_notify_redemption_kids(redemption, "purchase_rejected", f"Family goal '{item.name}' was not approved.", "info")
 	db.session.commit()
 
 	flash(f'Rejected "{item.name}" request.', "success")
@@ -2300,44 +2484,49 @@ def parent_store_approve_kid_redemption(redemption_id: int):
 			flash(f"Not enough coins to approve this split purchase: {', '.join(insufficient_kids)}.", "error")
 			return redirect(url_for("public.parent_store", tab="kid"))
 
-		for participant in participants:
-			participant_kid = participant_kids.get(participant.kid_id)
-			if not participant_kid:
-				continue
-			participant_kid.coin_balance -= participant.coin_share
-			db.session.add(CoinTransaction(
-				kid_id=participant_kid.id,
-				family_id=participant_kid.family_id,
+		legs = [
+			ledger.LedgerLeg(
+				kid=participant_kids[participant.kid_id],
 				amount=-participant.coin_share,
 				kind="store_purchase",
 				reason=f"Store split purchase approved: {item.name}",
 				ref_type="store_redemption",
 				ref_id=redemption.id,
-				created_by_parent_id=session.get("parent_id"),
-			))
+				parent_id=session.get("parent_id"),
+			)
+			for participant in participants
+		]
 	else:
 		if not kid or kid.coin_balance < item.kid_coin_cost:
 			flash(f"{kid.display_name if kid else 'Kid'} no longer has enough coins for this purchase.", "error")
 			return redirect(url_for("public.parent_store", tab="kid"))
 
-		kid.coin_balance -= item.kid_coin_cost
-		db.session.add(CoinTransaction(
-			kid_id=kid.id,
-			family_id=kid.family_id,
+		legs = [ledger.LedgerLeg(
+			kid=kid,
 			amount=-item.kid_coin_cost,
 			kind="store_purchase",
 			reason=f"Store purchase approved: {item.name}",
 			ref_type="store_redemption",
 			ref_id=redemption.id,
-			created_by_parent_id=session.get("parent_id"),
-		))
+			parent_id=session.get("parent_id"),
+		)]
+
+	try:
+		ledger.post_many(legs)
+	except ledger.InsufficientCoinsError:
+		db.session.rollback()
+		flash("Not enough coins to approve this purchase any more.", "error")
+		return redirect(url_for("public.parent_store", tab="kid"))
 
-	if item.stock_qty > 0:
-		item.stock_qty -= 1
+	if not _reserve_store_item_stock(item):
+		db.session.rollback()
+		flash(f'"{item.name}" is out of stock. Reject this request or restock first.', "error")
+		return redirect(url_for("public.parent_store", tab="kid"))
 
 	redemption.status = "fulfilled"
 	redemption.resolved_at = datetime.utcnow()
 	redemption.resolved_by_parent_id = session["parent_id"]
+	_notify_redemption_kids(redemption, "purchase_approved", f"🎉 Your purchase of '{item.name}' was approved!", "success")
 	db.session.commit()
 
 	if participants and len(participants) > 1:
@@ -2368,6 +2557,7 @@ def parent_store_reject_kid_redemption(redemption_id: int):
 	redemption.status = "rejected"
 	redemption.resolved_at = datetime.utcnow()
 	redemption.resolved_by_parent_id = session["parent_id"]
+	_notify_redemption_kids(redemption, "purchase_rejected", f"Your purchase request for '{item.name}' was not approved.", "info")
 	db.session.commit()
 
 	flash(f'Rejected purchase request for "{item.name}".', "success")
@@ -2382,28 +2572,44 @@ def parent_cancel_store_session(timed_session_id: int):
 		flash("Session not found.", "error")
 		return redirect(url_for("public.parent_store", tab="kid"))
 
-	if timed_session.status != "active":
+	if timed_session.status != "active" or not _claim_store_session_end(timed_session, "cancelled", datetime.utcnow()):
+		db.session.rollback()
 		flash("Only active sessions can be cancelled.", "info")
 		return redirect(url_for("public.parent_store", tab="kid"))
 
-	timed_session.status = "cancelled"
-	timed_session.ended_at = datetime.utcnow()
 	item = timed_session.store_item
 	refunded_coins = 0
+	refund_legs = []
 	for turn in timed_session.turns or []:
+		# Refund what was actually charged, including minutes billed since the turn was loaded.
+		db.session.refresh(turn, ["coins_charged"])
 		if turn.ended_at is None:
 			_close_store_session_turn(turn, timed_session.ended_at)
 		if turn.coins_charged and turn.participant and turn.participant.charges_coins and turn.participant.kid:
-			turn.participant.kid.coin_balance += turn.coins_charged
+			refund_legs.append(ledger.LedgerLeg(
+				kid=turn.participant.kid,
+				amount=turn.coins_charged,
+				kind="timed_session",
+				family_id=timed_session.family_id,
+				reason=f"Timed session refund (cancelled): {item.name if item else 'item'}",
+				ref_type="store_session_turn",
+				ref_id=turn.id,
+				parent_id=session.get("parent_id"),
+			))
 			refunded_coins += turn.coins_charged
 			turn.coins_charged = 0
+	ledger.post_many(refund_legs)
+	for participant in timed_session.participants or []:
+		participant.coins_charged = 0
 	timed_session.total_coins_charged = 0
+	_notify_session_ended(timed_session, "A parent cancelled the session and refunded your coins.")
 
 	# Restore stock slot
-	if item and item.stock_qty >= 0:
-		item.stock_qty += 1
+	if item:
+		_release_store_item_stock(item)
 
 	db.session.commit()
+	_publish_store_session_event(timed_session, "cancelled")
 	if refunded_coins:
 		flash(f'Session for "{timed_session.store_item.name if timed_session.store_item else "item"}" cancelled and {refunded_coins} coins refunded.', "success")
 	else:
@@ -2426,6 +2632,7 @@ def parent_challenges():
 	challenges = Challenge.query.filter_by(family_id=family.id).order_by(Challenge.sort_order.asc(), Challenge.created_at.asc()).all()
 	pending_submissions = (
 		ChallengeSubmission.query.filter_by(family_id=family.id, status="submitted")
+		.options(joinedload(ChallengeSubmission.kid), joinedload(ChallengeSubmission.challenge))
 		.order_by(ChallengeSubmission.submitted_at.desc())
 		.all()
 	)
@@ -2452,6 +2659,7 @@ def parent_store_reorder_items():
 		item = items_by_id.get(item_id)
 		if item:
 			item.sort_order = position
+	bump_catalog_version(family.id)
 	db.session.commit()
 	return jsonify({"success": True})
 
@@ -2602,6 +2810,7 @@ def parent_delete_challenge(challenge_id: int):
 		flash("Challenge not found.", "error")
 		return redirect(url_for("public.parent_challenges"))
 	title = challenge.title
+	release_photo_refs("challenge_submission", [submission.id for submission in challenge.submissions])
 	db.session.delete(challenge)
 	db.session.commit()
 	flash(f"'{title}' deleted.", "success")
@@ -2643,20 +2852,31 @@ def parent_challenge_submission_decision(submission_id: int):
 		submission.status = "approved"
 		submission.awarded_coin_amount = submission.challenge.coin_reward
 		submission.awarded_point_amount = submission.challenge.point_value
-		kid = submission.kid
-		kid.coin_balance += submission.awarded_coin_amount
 		family.family_points_balance = (family.family_points_balance or 0) + submission.awarded_point_amount
-		tx = CoinTransaction(
-			kid_id=kid.id,
+		ledger.post(
+			submission.kid,
+			submission.awarded_coin_amount,
+			"challenge_reward",
 			family_id=family.id,
-			amount=submission.awarded_coin_amount,
-			kind="challenge_reward",
 			reason=f"Challenge: {submission.challenge.title}",
 			ref_type="challenge_submission",
 			ref_id=submission.id,
-			created_by_parent_id=parent.id,
+			parent_id=parent.id,
 		)
-		db.session.add(tx)
+
+	if submission.status == "approved":
+		message = f"🏅 Challenge '{submission.challenge.title}' approved! +{submission.awarded_coin_amount} coins."
+	else:
+		message = f"Challenge '{submission.challenge.title}' was not approved. {resolution_note}"
+	notifications.notify(
+		submission.kid_id,
+		submission.family_id,
+		f"challenge_{submission.status}",
+		message.strip(),
+		level="success" if submission.status == "approved" else "info",
+		ref_type="challenge_submission",
+		ref_id=submission.id,
+	)
 
 	db.session.commit()
 	flash(
@@ -2674,6 +2894,19 @@ def parent_activities():
 
 
 
+HISTORY_PAGE_SIZE = 50
+HISTORY_DEFAULT_DAYS = 30
+# 0 = all time (still capped by the plan's retention window)
+HISTORY_WINDOW_CHOICES = (7, 30, 90, 365, 0)
+
+
+def _int_arg(name: str, default):
+	try:
+		return int(request.args.get(name, ""))
+	except ValueError:
+		return default
+
+
 @public_bp.get("/parent/history")
 @parent_web_login_required
 @feature_required("history")
@@ -2685,18 +2918,78 @@ def parent_history():
 		return redirect(url_for("public.login"))
 
 	kids = Kid.query.filter_by(family_id=family.id, is_active=True).order_by(Kid.display_name.asc()).all()
+	chores = Chore.query.filter_by(family_id=family.id, is_active=True).order_by(Chore.name.asc()).all()
+
+	active_tab = request.args.get("tab", "purchases")
+	if active_tab not in {"purchases", "chores", "sessions", "transactions"}:
+		active_tab = "purchases"
+
+	window_days = _int_arg("days", HISTORY_DEFAULT_DAYS)
+	if window_days not in HISTORY_WINDOW_CHOICES:
+		window_days = HISTORY_DEFAULT_DAYS
+	window_start = datetime.utcnow() - timedelta(days=window_days) if window_days else None
+
+	# Free-tier retention is part of the WHERE clause, not a template filter.
+	retention_days = get_limit(family, "chore_history_days")
+	chore_window_start = window_start
+	if retention_days is not None:
+		retention_start = datetime.utcnow() - timedelta(days=retention_days)
+		chore_window_start = max(window_start, retention_start) if window_start else retention_start
+
+	filters = {
+		"purchase_kid": _int_arg("purchase_kid", None),
+		"purchase_status": request.args.get("purchase_status") or None,
+		"chore_kid": _int_arg("chore_kid", None),
+		"chore_id": _int_arg("chore_id", None),
+		"chore_status": request.args.get("chore_status") or None,
+	}
 
+	purchase_query = StoreRedemption.query.filter(StoreRedemption.family_id == family.id)
+	if window_start:
+		purchase_query = purchase_query.filter(StoreRedemption.requested_at >= window_start)
+	if filters["purchase_kid"]:
+		purchase_query = purchase_query.filter(StoreRedemption.requested_by_kid_id == filters["purchase_kid"])
+	if filters["purchase_status"]:
+		purchase_query = purchase_query.filter(StoreRedemption.status == filters["purchase_status"])
+	purchase_page = max(1, _int_arg("purchases_page", 1))
 	purchase_history = (
-		StoreRedemption.query.filter_by(family_id=family.id)
-		.order_by(StoreRedemption.requested_at.desc())
+		purchase_query.options(
+			joinedload(StoreRedemption.requested_by_kid),
+			joinedload(StoreRedemption.store_item),
+			selectinload(StoreRedemption.participants).joinedload(StoreRedemptionParticipant.kid),
+		)
+		.order_by(StoreRedemption.requested_at.desc(), StoreRedemption.id.desc())
+		.offset((purchase_page - 1) * HISTORY_PAGE_SIZE)
+		.limit(HISTORY_PAGE_SIZE + 1)
 		.all()
 	)
+	purchases_has_more = len(purchase_history) > HISTORY_PAGE_SIZE
+	purchase_history = purchase_history[:HISTORY_PAGE_SIZE]
+
+	# Hot and archived submissions together (src/utils/archive.py).
+	submissions = archive.chore_submissions_union()
+	chore_query = db.session.query(submissions).filter(submissions.family_id == family.id)
+	if chore_window_start:
+		chore_query = chore_query.filter(submissions.claimed_at >= chore_window_start)
+	if filters["chore_kid"]:
+		chore_query = chore_query.filter(submissions.kid_id == filters["chore_kid"])
+	if filters["chore_id"]:
+		chore_query = chore_query.filter(submissions.chore_id == filters["chore_id"])
+	if filters["chore_status"]:
+		chore_query = chore_query.filter(submissions.status == filters["chore_status"])
+	chore_page = max(1, _int_arg("chores_page", 1))
 	chore_submissions = (
-		ChoreSubmission.query.filter_by(family_id=family.id)
-		.order_by(ChoreSubmission.claimed_at.desc())
+		chore_query.options(
+			joinedload(submissions.kid),
+			joinedload(submissions.chore),
+		)
+		.order_by(submissions.claimed_at.desc(), submissions.id.desc())
+		.offset((chore_page - 1) * HISTORY_PAGE_SIZE)
+		.limit(HISTORY_PAGE_SIZE + 1)
 		.all()
 	)
-	chores = Chore.query.filter_by(family_id=family.id, is_active=True).order_by(Chore.name.asc()).all()
+	chores_has_more = len(chore_submissions) > HISTORY_PAGE_SIZE
+	chore_submissions = chore_submissions[:HISTORY_PAGE_SIZE]
 
 	return render_template(
 		"private/parents/history/index.html",
@@ -2707,9 +3000,56 @@ def parent_history():
 		chore_submissions=chore_submissions,
 		chores=chores,
 		game_sessions=[],
+		active_tab=active_tab,
+		window_days=window_days,
+		window_choices=HISTORY_WINDOW_CHOICES,
+		retention_days=retention_days,
+		filters=filters,
+		purchase_page=purchase_page,
+		purchases_has_more=purchases_has_more,
+		chore_page=chore_page,
+		chores_has_more=chores_has_more,
 	)
 
 
+@public_bp.get("/parent/history/export")
+@parent_web_login_required
+@feature_required("history")
+def parent_history_export():
+	"""Stream the family's history as CSV (one dataset) or NDJSON (any/all datasets)."""
+	parent, family = _load_parent_and_family()
+	if not parent or not family:
+		session.clear()
+		flash("Session expired. Please log in again.", "error")
+		return redirect(url_for("public.login"))
+
+	export_format = (request.args.get("format") or "csv").strip().lower()
+	dataset = (request.args.get("dataset") or "transactions").strip().lower()
+	if export_format not in family_export.EXPORT_FORMATS:
+		flash("Unknown export format.", "error")
+		return redirect(url_for("public.parent_history"))
+	if dataset != "all" and dataset not in family_export.EXPORT_DATASETS:
+		flash("Unknown export dataset.", "error")
+		return redirect(url_for("public.parent_history"))
+	if export_format == "csv" and dataset == "all":
+		flash("CSV exports hold one dataset at a time; choose NDJSON to export everything.", "error")
+		return redirect(url_for("public.parent_history"))
+
+	stamp = datetime.utcnow().strftime("%Y%m%d")
+	if export_format == "csv":
+		body = family_export.iter_csv(dataset, family.id)
+		mimetype = "text/csv"
+	else:
+		datasets = family_export.EXPORT_DATASETS if dataset == "all" else (dataset,)
+		body = family_export.iter_ndjson(datasets, family.id)
+		mimetype = "application/x-ndjson"
+
+	response = Response(stream_with_context(body), mimetype=mimetype)
+	response.headers["Content-Disposition"] = f'attachment; filename="stewardwell-{dataset}-{stamp}.{export_format}"'
+	response.headers["X-Accel-Buffering"] = "no"
+	return response
+
+
 @public_bp.post("/parent/add-kid")
 @parent_web_login_required
 def parent_add_kid():
@@ -3117,24 +3457,40 @@ def kid_login_submit():
 	session["kid_id"] = authenticated_kid.id
 	session["family_id"] = family.id
 
-	# Flash any unseen rewards/fines since last login
-	unseen = CoinTransaction.query.filter_by(
-		kid_id=authenticated_kid.id,
-		seen_by_kid=False,
-	).filter(CoinTransaction.kind.in_(["fine", "manual_add"])).order_by(CoinTransaction.created_at.asc()).all()
-	for txn in unseen:
-		if txn.amount > 0:
-			flash(f"🏆 You earned {txn.amount} coins! {txn.reason or ''}", "success")
-		else:
-			flash(f"⚠️ You lost {abs(txn.amount)} coins. {txn.reason or ''}", "error")
-		txn.seen_by_kid = True
-	if unseen:
-		db.session.commit()
+	# Flash what happened since the last login, then mark it read in one UPDATE.
+	unread = notifications.unread(authenticated_kid.id)
+	for item in unread:
+		flash(item.message, item.level)
+	if unread:
+		notifications.mark_read(authenticated_kid.id, up_to_id=unread[-1].id)
 
 	flash(f"Welcome, {authenticated_kid.display_name}!", "success")
 	return redirect(url_for("public.kid_chores"))
 
 
+@public_bp.get("/kid/notifications")
+@kid_web_login_required
+def kid_notifications():
+	kid, family = _load_kid_and_family()
+
+	if not kid or not family or kid.family_id != family.id:
+		session.clear()
+		flash("Session expired. Please log in again.", "error")
+		return redirect(url_for("public.kid_login"))
+
+	items = notifications.recent(kid.id)
+	unread_ids = {item.id for item in items if item.read_at is None}
+	if unread_ids:
+		notifications.mark_read(kid.id, up_to_id=max(unread_ids))
+	return render_template(
+		"private/kids/notifications/index.html",
+		kid=kid,
+		family=family,
+		items=items,
+		unread_ids=unread_ids,
+	)
+
+
 @public_bp.get("/kid/store")
 @kid_web_login_required
 def kid_store():
@@ -3149,75 +3505,102 @@ def kid_store():
 	if active_tab not in {"kid", "family"}:
 		active_tab = "kid"
 
-	kid_items = (
-		StoreItem.query.filter_by(family_id=family.id, item_scope="kid", is_active=True)
-		.order_by(StoreItem.created_at.desc())
-		.all()
-	)
-	family_items = (
-		StoreItem.query.filter_by(family_id=family.id, item_scope="family", is_active=True)
-		.order_by(StoreItem.created_at.desc())
-		.all()
+	return render_template(
+		"private/kids/store/index.html",
+		kid=kid,
+		family=family,
+		active_tab=active_tab,
+		**_kid_store_view_model(kid, family),
 	)
 
+
+def _kid_store_view_model(kid: Kid, family: Family) -> dict:
+	"""Everything the kid store page renders, loaded in a fixed handful of queries.
+
+	Read-only: session billing is settled by the background ticker (or by the
+	status endpoint when no ticker runs), never by rendering the page.
+	"""
+	store_items = get_catalog(family)
+	kid_items = [item for item in store_items if item.item_scope == "kid"]
+	family_items = [item for item in store_items if item.item_scope == "family"]
+
 	family_redemptions = (
 		StoreRedemption.query.join(StoreItem, StoreRedemption.store_item_id == StoreItem.id)
 		.filter(StoreRedemption.family_id == family.id, StoreItem.item_scope == "family")
+		.options(
+			joinedload(StoreRedemption.store_item),
+			joinedload(StoreRedemption.requested_by_kid),
+		)
 		.order_by(StoreRedemption.requested_at.desc())
 		.limit(30)
 		.all()
 	)
-	vote_lookup = {
-		vote.redemption_id: vote.vote
-		for vote in StoreRedemptionVote.query.filter_by(kid_id=kid.id).all()
-	}
-	vote_summary = _vote_summary_for_redemptions(family_redemptions)
+	vote_lookup = {}
+	if family_redemptions:
+		vote_lookup = dict(
+			db.session.query(StoreRedemptionVote.redemption_id, StoreRedemptionVote.vote)
+			.filter(
+				StoreRedemptionVote.kid_id == kid.id,
+				StoreRedemptionVote.redemption_id.in_([redemption.id for redemption in family_redemptions]),
+			)
+			.all()
+		)
 
-	active_session = _active_store_session_for_kid(kid.id)
 	family_kids = Kid.query.filter_by(family_id=family.id, is_active=True).order_by(Kid.display_name.asc()).all()
-	active_session_by_item_id = _active_store_sessions_by_item(family.id)
-	billing_changed = False
-	for timed_session in active_session_by_item_id.values():
-		billing_changed = _sync_active_store_session_billing(timed_session) or billing_changed
-	if billing_changed:
-		db.session.commit()
-	active_session_elapsed_seconds = {
-		active_session.id: _participant_elapsed_seconds(active_session)
-		for active_session in active_session_by_item_id.values()
-	}
-	active_session_charged_coins = {}
-	for active_store_session in active_session_by_item_id.values():
-		charged_by_participant = {}
-		for turn in active_store_session.turns or []:
-			charged_by_participant[turn.participant_id] = charged_by_participant.get(turn.participant_id, 0) + (turn.coins_charged or 0)
-		active_session_charged_coins[active_store_session.id] = charged_by_participant
+
+	active_sessions = (
+		StoreTimedSession.query.filter_by(family_id=family.id, status="active")
+		.options(
+			selectinload(StoreTimedSession.participants).selectinload(StoreSessionParticipant.kid),
+		)
+		.order_by(StoreTimedSession.started_at.desc())
+		.all()
+	)
+	active_session_by_item_id = {timed_session.store_item_id: timed_session for timed_session in active_sessions}
+	active_session = next(
+		(
+			timed_session for timed_session in active_sessions
+			if kid.id in (timed_session.started_by_kid_id, timed_session.participant_kid_id)
+		),
+		None,
+	) or next(
+		(
+			timed_session for timed_session in active_sessions
+			if any(participant.kid_id == kid.id for participant in timed_session.participants)
+		),
+		None,
+	)
+
 	recent_timed_sessions = (
 		StoreTimedSession.query.filter(
 			StoreTimedSession.family_id == family.id,
 			StoreTimedSession.status.in_(["completed", "cancelled"]),
 		)
+		.options(joinedload(StoreTimedSession.store_item), joinedload(StoreTimedSession.started_by_kid))
 		.order_by(StoreTimedSession.ended_at.desc())
 		.limit(8)
 		.all()
 	)
 
-	return render_template(
-		"private/kids/store/index.html",
-		kid=kid,
-		family=family,
-		family_kids=family_kids,
-		kid_items=kid_items,
-		family_items=family_items,
-		family_redemptions=family_redemptions,
-		vote_lookup=vote_lookup,
-		vote_summary=vote_summary,
-		active_tab=active_tab,
-		active_session=active_session,
-		active_session_by_item_id=active_session_by_item_id,
-		active_session_elapsed_seconds=active_session_elapsed_seconds,
-		active_session_charged_coins=active_session_charged_coins,
-		recent_timed_sessions=recent_timed_sessions,
-	)
+	return {
+		"family_kids": family_kids,
+		"kid_items": kid_items,
+		"family_items": family_items,
+		"family_redemptions": family_redemptions,
+		"vote_lookup": vote_lookup,
+		"vote_summary": _vote_summary_for_redemptions(family_redemptions),
+		"active_session": active_session,
+		"active_session_by_item_id": active_session_by_item_id,
+		"active_session_elapsed_seconds": {
+			timed_session.id: _participant_elapsed_seconds(timed_session)
+			for timed_session in active_sessions
+		},
+		"active_session_charged_coins": {
+			timed_session.id: _participant_charged_coins(timed_session)
+			for timed_session in active_sessions
+		},
+		"recent_timed_sessions": recent_timed_sessions,
+	}
 
 
 @public_bp.get("/kid/chores")
@@ -3321,7 +3704,7 @@ def kid_claim_chore(chore_id: int):
 
 	before_path = None
 	if before_file and before_file.filename:
-		before_path = _save_chore_photo(before_file, kid.family_id, kid.id, "before")
+		before_path = _save_chore_photo(before_file)
 		if not before_path:
 			return redirect(url_for("public.kid_chores"))
 
@@ -3333,7 +3716,16 @@ def kid_claim_chore(chore_id: int):
 		before_photo_path=before_path,
 		status="claimed",
 	)
-	db.session.add(submission)
+	claim_result = _insert_chore_claim(submission, chore)
+	if claim_result != "claimed":
+		# Commit anyway so an uploaded before photo stays visible to photo GC.
+		db.session.commit()
+		if claim_result == "duplicate":
+			flash("You already worked on this chore today.", "error")
+		else:
+			flash("Someone just took the last open slot for this chore today.", "error")
+		return redirect(url_for("public.kid_chores"))
+	link_photo(before_path, "chore_submission", submission.id, "before")
 	db.session.commit()
 
 	flash(f"You claimed '{chore.name}'. Before photo saved — go do it and come back for the final photo.", "success")
@@ -3370,24 +3762,18 @@ def kid_submit_chore(submission_id: int):
 			flash("After photo is required for this chore.", "error")
 			return redirect(url_for("public.kid_chores"))
 
-	if before_file and before_file.filename:
-		before_path = _save_chore_photo(before_file, kid.family_id, kid.id, "before")
-		if not before_path:
+	# Check both uploads before storing either: a blob written for a request
+	# that then returns without committing would have no row for photo GC.
+	for upload in (before_file, after_file):
+		if upload and upload.filename and not _chore_photo_extension(upload):
 			return redirect(url_for("public.kid_chores"))
-		submission.before_photo_path = before_path
 
-	after_path = None
+	if before_file and before_file.filename:
+		submission.before_photo_path = _save_chore_photo(before_file)
+		link_photo(submission.before_photo_path, "chore_submission", submission.id, "before")
 	if after_file and after_file.filename:
-		after_path = _save_chore_photo(after_file, kid.family_id, kid.id, "after")
-	if after_file and after_file.filename and not after_path:
-		return redirect(url_for("public.kid_chores"))
-
-	if after_path:
-		submission.after_photo_path = after_path
-
-	if submission.chore.requires_photo_proof and (not submission.before_photo_path or not submission.after_photo_path):
-		flash("Both before and after photos are required for this chore.", "error")
-		return redirect(url_for("public.kid_chores"))
+		submission.after_photo_path = _save_chore_photo(after_file)
+		link_photo(submission.after_photo_path, "chore_submission", submission.id, "after")
 
 	submission.status = "submitted"
 	submission.submitted_at = datetime.utcnow()
@@ -3399,6 +3785,41 @@ def kid_submit_chore(submission_id: int):
 
 # ── KID CHALLENGES ─────────────────────────────────────────────────────────────
 
+def _latest_challenge_submissions(family_id: int, kid_id: int | None = None) -> list[ChallengeSubmission]:
+	"""Newest ChallengeSubmission per (kid, challenge) in the family.
+
+	Postgres picks the rows with DISTINCT ON; other databases (SQLite) rank
+	each group with ROW_NUMBER().  Either way only one row per pair is read
+	back, walking ix_challenge_submissions_family_kid_challenge_claimed.
+	"""
+	filters = [ChallengeSubmission.family_id == family_id]
+	if kid_id is not None:
+		filters.append(ChallengeSubmission.kid_id == kid_id)
+	newest_first = (ChallengeSubmission.claimed_at.desc(), ChallengeSubmission.id.desc())
+
+	if db.engine.dialect.name == "postgresql":
+		return (
+			ChallengeSubmission.query.filter(*filters)
+			.distinct(ChallengeSubmission.kid_id, ChallengeSubmission.challenge_id)
+			.order_by(ChallengeSubmission.kid_id, ChallengeSubmission.challenge_id, *newest_first)
+			.all()
+		)
+
+	ranked = (
+		db.session.query(
+			ChallengeSubmission,
+			db.func.row_number().over(
+				partition_by=(ChallengeSubmission.kid_id, ChallengeSubmission.challenge_id),
+				order_by=newest_first,
+			).label("rank"),
+		)
+		.filter(*filters)
+		.subquery()
+	)
+	latest = aliased(ChallengeSubmission, ranked)
+	return db.session.query(latest).filter(ranked.c.rank == 1).all()
+
+
 @public_bp.get("/kid/challenges")
 @kid_web_login_required
 def kid_challenges():
@@ -3410,17 +3831,7 @@ def kid_challenges():
 
 	challenges = Challenge.query.filter_by(family_id=family.id, is_active=True).order_by(Challenge.created_at.desc()).all()
 
-	# Find submissions for this kid
-	my_submissions = (
-		ChallengeSubmission.query.filter_by(family_id=family.id, kid_id=kid.id)
-		.order_by(ChallengeSubmission.claimed_at.desc())
-		.all()
-	)
-	# Map challenge_id -> latest submission
-	my_sub_by_challenge = {}
-	for sub in my_submissions:
-		if sub.challenge_id not in my_sub_by_challenge:
-			my_sub_by_challenge[sub.challenge_id] = sub
+	my_sub_by_challenge = {sub.challenge_id: sub for sub in _latest_challenge_submissions(family.id, kid_id=kid.id)}
 
 	return render_template(
 		"private/kids/challenges/index.html",
@@ -3493,12 +3904,8 @@ def kid_submit_challenge(submission_id: int):
 	proof_file = request.files.get("proof_photo")
 	proof_path = None
 	if proof_file and proof_file.filename:
-		upload_folder = os.path.join(current_app.instance_path, "uploads", "challenge_photos")
-		os.makedirs(upload_folder, exist_ok=True)
 		ext = os.path.splitext(secure_filename(proof_file.filename))[1].lower()
-		filename = f"challenge_{submission.id}_{secrets.token_hex(6)}{ext}"
-		proof_file.save(os.path.join(upload_folder, filename))
-		proof_path = filename
+		proof_path = store_photo(proof_file, ext)
 
 	if submission.challenge.requires_proof and not proof_note and not proof_path:
 		flash("This challenge requires a note or photo as proof.", "error")
@@ -3506,6 +3913,7 @@ def kid_submit_challenge(submission_id: int):
 
 	submission.proof_note = proof_note or None
 	submission.proof_photo_path = proof_path
+	link_photo(proof_path, "challenge_submission", submission.id, "proof")
 	submission.status = "submitted"
 	submission.submitted_at = datetime.utcnow()
 	db.session.commit()
@@ -3541,14 +3949,12 @@ def kid_cash_out_coins():
 		return redirect(url_for("public.kid_store", tab="kid"))
 
 	dollars = coins / rate
-	kid.coin_balance -= coins
-	db.session.add(CoinTransaction(
-		kid_id=kid.id,
-		family_id=kid.family_id,
-		amount=-coins,
-		kind="cash_out",
-		reason=f"Cash out: {coins} coins = ${dollars:.2f}",
-	))
+	try:
+		ledger.post(kid, -coins, "cash_out", reason=f"Cash out: {coins} coins = ${dollars:.2f}")
+	except ledger.InsufficientCoinsError:
+		db.session.rollback()
+		flash("You don't have enough coins.", "error")
+		return redirect(url_for("public.kid_store", tab="kid"))
 	db.session.commit()
 	flash(f'Cashed out {coins} coins for ${dollars:.2f}. Ask a parent to pay you out!', "success")
 	return redirect(url_for("public.kid_store", tab="kid"))
@@ -3643,11 +4049,10 @@ def kid_purchase_store_item(item_id: int):
 			flash(f'Requested purchase approval for "{item.name}".', "success")
 		return redirect(url_for("public.kid_store", tab="kid"))
 
-	for participant in participant_kids:
-		participant.coin_balance -= coin_shares.get(participant.id, 0)
-
-	if item.stock_qty > 0:
-		item.stock_qty -= 1
+	if not _reserve_store_item_stock(item):
+		db.session.rollback()
+		flash("This item is out of stock.", "error")
+		return redirect(url_for("public.kid_store", tab="kid"))
 
 	redemption = StoreRedemption(
 		store_item_id=item.id,
@@ -3658,6 +4063,8 @@ def kid_purchase_store_item(item_id: int):
 	)
 	db.session.add(redemption)
 	db.session.flush()
+	tx_reason = f"Store purchase: {item.name}" if len(participant_kids) == 1 else f"Store split purchase: {item.name}"
+	legs = []
 	for participant in participant_kids:
 		share = coin_shares.get(participant.id, 0)
 		db.session.add(StoreRedemptionParticipant(
@@ -3665,16 +4072,20 @@ def kid_purchase_store_item(item_id: int):
 			kid_id=participant.id,
 			coin_share=share,
 		))
-		tx_reason = f"Store purchase: {item.name}" if len(participant_kids) == 1 else f"Store split purchase: {item.name}"
-		db.session.add(CoinTransaction(
-			kid_id=participant.id,
-			family_id=participant.family_id,
+		legs.append(ledger.LedgerLeg(
+			kid=participant,
 			amount=-share,
 			kind="store_purchase",
 			reason=tx_reason,
 			ref_type="store_redemption",
 			ref_id=redemption.id,
 		))
+	try:
+		ledger.post_many(legs)
+	except ledger.InsufficientCoinsError:
+		db.session.rollback()
+		flash("Not enough coins for this purchase any more.", "error")
+		return redirect(url_for("public.kid_store", tab="kid"))
 	db.session.commit()
 
 	if len(participant_kids) > 1:
@@ -3748,13 +4159,7 @@ def kid_vote_family_goal(redemption_id: int):
 		flash("Voting is only available while pending.", "error")
 		return redirect(url_for("public.kid_store", tab="family"))
 
-	vote = StoreRedemptionVote.query.filter_by(redemption_id=redemption.id, kid_id=kid.id).first()
-	if vote is None:
-		vote = StoreRedemptionVote(redemption_id=redemption.id, kid_id=kid.id, vote=vote_value)
-		db.session.add(vote)
-	else:
-		vote.vote = vote_value
-
+	_cast_redemption_vote(redemption.id, kid.id, vote_value)
 	db.session.commit()
 	flash(f"Your vote was recorded: {vote_value.upper()}.", "success")
 	return redirect(url_for("public.kid_store", tab="family"))
@@ -3853,8 +4258,10 @@ def kid_start_store_session():
 		flash("Add at least one player before starting the session.", "error")
 		return redirect(url_for("public.kid_store", tab="kid"))
 
-	if item.stock_qty > 0:
-		item.stock_qty -= 1
+	if not _reserve_store_item_stock(item):
+		db.session.rollback()
+		flash("This session is out of stock.", "error")
+		return redirect(url_for("public.kid_store", tab="kid"))
 
 	timed_session = StoreTimedSession(
 		store_item_id=item.id,
@@ -3928,6 +4335,7 @@ def kid_start_store_session():
 		return redirect(url_for("public.kid_store", tab="kid"))
 
 	db.session.commit()
+	_publish_store_session_event(timed_session, "started")
 
 	flash(f'"{item.name}" session started.', "success")
 	return redirect(url_for("public.kid_store", tab="kid"))
@@ -4000,6 +4408,7 @@ def kid_switch_store_session_turn(timed_session_id: int):
 		return redirect(url_for("public.kid_store", tab="kid"))
 
 	db.session.commit()
+	_publish_store_session_event(timed_session, "turn_switched")
 
 	flash(f"Switched to {next_participant.display_name}.", "success")
 	return redirect(url_for("public.kid_store", tab="kid"))
@@ -4030,15 +4439,21 @@ def kid_end_store_session(timed_session_id: int):
 	_sync_active_store_session_billing(timed_session)
 
 	now = datetime.utcnow()
+	if timed_session.countdown_ends_at:
+		now = min(now, timed_session.countdown_ends_at)
 	current_turn = timed_session.current_turn
+	if not _claim_store_session_end(timed_session, "completed", now):
+		db.session.rollback()
+		flash("This session is already ended.", "info")
+		return redirect(url_for("public.kid_store", tab="kid"))
 	if current_turn:
 		_close_store_session_turn(current_turn, now)
 
-	timed_session.ended_at = now
-	timed_session.status = "completed"
 	charge_summary = _charge_shared_store_session(timed_session)
+	_notify_session_ended(timed_session, f"{kid.display_name} ended the session.", skip_kid_id=kid.id)
 
 	db.session.commit()
+	_publish_store_session_event(timed_session, "ended")
 	charged_parts = [
 		f"{entry['name']}: {entry['coins']} coin{'s' if entry['coins'] != 1 else ''}"
 		for entry in charge_summary
@@ -4060,37 +4475,48 @@ def kid_store_session_status(timed_session_id: int):
 	if not kid or not timed_session or timed_session.family_id != kid.family_id:
 		return jsonify({"error": "Not found"}), 404
 
-	changed = _sync_active_store_session_billing(timed_session)
-	if changed:
+	if not _store_session_ticker_running() and _sync_active_store_session_billing(timed_session):
 		db.session.commit()
+		_publish_store_session_event(timed_session, "billing")
 
-	item = timed_session.store_item
-	current_turn = timed_session.current_turn
-	elapsed_by_participant = _participant_elapsed_seconds(timed_session)
-	charged_by_participant = {}
-	for turn in timed_session.turns or []:
-		charged_by_participant[turn.participant_id] = charged_by_participant.get(turn.participant_id, 0) + (turn.coins_charged or 0)
-	current_turn_paid_seconds = (_turn_paid_minutes(current_turn) * 60) if current_turn else 0
-	return jsonify({
-		"session_id": timed_session.id,
-		"status": timed_session.status,
-		"started_by_kid_id": timed_session.started_by_kid_id,
-		"started_by_kid_name": timed_session.started_by_kid.display_name if timed_session.started_by_kid else None,
-		"timing_mode": timed_session.timing_mode,
-		"elapsed_seconds": timed_session.elapsed_seconds,
-		"current_turn_id": current_turn.id if current_turn else None,
-		"current_participant_id": current_turn.participant_id if current_turn else None,
-		"current_participant_name": current_turn.participant.display_name if current_turn and current_turn.participant else None,
-		"current_turn_elapsed_seconds": current_turn.live_elapsed_seconds if current_turn else 0,
-		"current_turn_paid_seconds": current_turn_paid_seconds,
-		"participant_elapsed_seconds": elapsed_by_participant,
-		"participant_charged_coins": charged_by_participant,
-		"planned_duration_minutes": timed_session.planned_duration_minutes,
-		"remaining_seconds": timed_session.remaining_seconds,
-		"total_coins_charged": timed_session.total_coins_charged,
-		"session_rate_type": item.session_rate_type if item else None,
-		"session_coin_per_minute": item.session_coin_per_minute if item else 0,
-	})
+	return jsonify(_store_session_state(timed_session))
+
+
+# Streams are recycled periodically so a gthread worker never pins a thread to
+# one tablet forever; EventSource reconnects on its own after `retry`.
+SESSION_STREAM_MAX_SECONDS = 300
+SESSION_STREAM_KEEPALIVE_SECONDS = 15
+
+
+@public_bp.get("/kid/store/sessions/stream")
+@kid_web_login_required
+def kid_store_session_stream():
+	family_id = session.get("family_id")
+	if not family_id:
+		return jsonify({"error": "Not found"}), 404
+
+	listener = session_events.subscribe(family_id)
+	if listener is None:
+		# Every stream slot in this worker is taken; the page falls back to polling.
+		return jsonify({"error": "Too many open streams"}), 503
+
+	def generate():
+		yield "retry: 3000\n\n"
+		deadline = time.monotonic() + SESSION_STREAM_MAX_SECONDS
+		while time.monotonic() < deadline:
+			try:
+				event = listener.get(timeout=SESSION_STREAM_KEEPALIVE_SECONDS)
+			except queue.Empty:
+				yield ": keepalive\n\n"
+				continue
+			yield session_events.format_sse(event)
+
+	response = Response(generate(), mimetype="text/event-stream")
+	response.headers["Cache-Control"] = "no-cache"
+	response.headers["X-Accel-Buffering"] = "no"
+	# Runs even if the client goes away before the generator starts.
+	response.call_on_close(lambda: session_events.unsubscribe(family_id, listener))
+	return response
 
 
 @public_bp.post("/kid/logout")
@@ -4532,6 +4958,8 @@ def parent_setup_wizard_submit():
 		db.session.add(family_item)
 		created.append(f'family goal "{family_item_name}"')
 
+	if kid_item_name or family_item_name:
+		bump_catalog_version(family.id)
 	db.session.commit()
 
 	if created:
@@ -4670,6 +5098,8 @@ def parent_getting_started_apply():
 				))
 				added_count += 1
 
+	if category in ("kid_store", "family_store", "all") and added_count:
+		bump_catalog_version(family.id)
 	db.session.commit()
 
 	labels = {
@@ -4694,18 +5124,16 @@ def _save_task_photo(file) -> str | None:
 	"""Save an uploaded task proof photo and return its relative path or None."""
 	if not file or not file.filename:
 		return None
-	upload_folder = os.path.join(current_app.instance_path, "uploads", "task_photos")
-	os.makedirs(upload_folder, exist_ok=True)
 	ext = os.path.splitext(secure_filename(file.filename))[1].lower()
-	filename = f"task_{secrets.token_hex(8)}{ext}"
-	file.save(os.path.join(upload_folder, filename))
-	return filename
+	return store_photo(file, ext)
 
 
 @public_bp.get("/uploads/task_photos/<path:filename>")
 def serve_task_photo(filename):
-	directory = os.path.join(current_app.instance_path, "uploads", "task_photos")
-	return send_from_directory(directory, filename)
+	resolved = resolve_photo(filename, "task_photos")
+	if resolved is None:
+		abort(404)
+	return send_from_directory(*resolved)
 
 
 # ── Parent: task board ─────────────────────────────────────────────────────────
@@ -4887,6 +5315,15 @@ def parent_tasks_claim_approve(claim_id: int):
 		family = Family.query.get(family_id)
 		family.family_points_balance += task.point_reward
 
+	notifications.notify(
+		claim.kid_id,
+		family_id,
+		"task_approved",
+		f"✅ Task '{task.title}' approved! +{task.coin_reward} coins.",
+		level="success",
+		ref_type="task_claim",
+		ref_id=claim.id,
+	)
 	db.session.commit()
 	flash(f"Approved! {kid.display_name} earned {task.coin_reward} coins.", "success")
 	return redirect(url_for("public.parent_tasks"))
@@ -4908,6 +5345,14 @@ def parent_tasks_claim_reject(claim_id: int):
 	claim.resolved_at = datetime.utcnow()
 	claim.resolved_by_parent_id = parent.id
 	claim.resolution_note = note
+	notifications.notify(
+		claim.kid_id,
+		family_id,
+		"task_rejected",
+		f"Task '{claim.task.title}' was not approved. {note or ''}".strip(),
+		ref_type="task_claim",
+		ref_id=claim.id,
+	)
 	db.session.commit()
 	flash("Claim rejected.", "info")
 	return redirect(url_for("public.parent_tasks"))
@@ -4921,32 +5366,12 @@ def kid_tasks():
 	kid = Kid.query.get(session["kid_id"])
 	family_id = session["family_id"]
 
-	# Tasks available to this kid: either open board or assigned to them
-	all_tasks = Task.query.filter_by(family_id=family_id, is_active=True).all()
-
-	my_claims = TaskClaim.query.filter_by(kid_id=kid.id).filter(
-		TaskClaim.status.in_(["claimed", "submitted"])
-	).all()
-	my_claimed_task_ids = {c.task_id for c in my_claims}
-
-	available_tasks = []
-	for task in all_tasks:
-		# Must be assigned to this kid or be open board
-		if task.assigned_to_kid_id and task.assigned_to_kid_id != kid.id:
-			continue
-		# Skip tasks the kid has already claimed/submitted
-		if task.id in my_claimed_task_ids:
-			continue
-		# If not allowing multiple claims, skip if already approved by another kid
-		if not task.allow_multiple_claims:
-			already_approved = any(c.status == "approved" for c in task.claims)
-			if already_approved:
-				continue
-			already_claimed = any(c.status in ("claimed", "submitted") for c in task.claims)
-			if already_claimed:
-				continue
-
-		available_tasks.append(task)
+	my_claims = (
+		TaskClaim.query.options(joinedload(TaskClaim.task))
+		.filter(TaskClaim.kid_id == kid.id, TaskClaim.status.in_(["claimed", "submitted"]))
+		.all()
+	)
+	available_tasks = _available_tasks_for_kid(kid.id, family_id)
 
 	family = Family.query.get(family_id)
 	return render_template(
@@ -4958,6 +5383,34 @@ def kid_tasks():
 	)
 
 
+def _available_tasks_for_kid(kid_id: int, family_id: int) -> list[Task]:
+	"""Active tasks this kid can claim right now, in one query.
+
+	A task is available when it is open or assigned to the kid, the kid holds no
+	active claim on it, and (unless it allows multiple claims) nobody has
+	claimed or completed it.  Both EXISTS checks use TaskClaim.HOLDING_STATUSES
+	so they are answered from the partial holding-claims index.
+	"""
+	holding = TaskClaim.status.in_(TaskClaim.HOLDING_STATUSES)
+	held_by_kid = (
+		db.session.query(TaskClaim.id)
+		.filter(TaskClaim.task_id == Task.id, holding, TaskClaim.kid_id == kid_id, TaskClaim.status != "approved")
+		.exists()
+	)
+	held_by_anyone = db.session.query(TaskClaim.id).filter(TaskClaim.task_id == Task.id, holding).exists()
+	return (
+		Task.query.filter(
+			Task.family_id == family_id,
+			Task.is_active.is_(True),
+			or_(Task.assigned_to_kid_id.is_(None), Task.assigned_to_kid_id == kid_id),
+			~held_by_kid,
+			or_(Task.allow_multiple_claims.is_(True), ~held_by_anyone),
+		)
+		.order_by(Task.sort_order.asc(), Task.created_at.asc())
+		.all()
+	)
+
+
 @public_bp.post("/kid/tasks/<int:task_id>/claim")
 @kid_web_login_required
 def kid_task_claim(task_id: int):
@@ -4981,7 +5434,7 @@ def kid_task_claim(task_id: int):
 	# If single-claim task, verify no other active claims
 	if not task.allow_multiple_claims:
 		other_active = TaskClaim.query.filter_by(task_id=task.id).filter(
-			TaskClaim.status.in_(["claimed", "submitted", "approved"])
+			TaskClaim.status.in_(TaskClaim.HOLDING_STATUSES)
 		).first()
 		if other_active:
 			flash("This task has already been claimed or completed.", "info")
@@ -4992,9 +5445,23 @@ def kid_task_claim(task_id: int):
 		family_id=family_id,
 		kid_id=kid.id,
 		status="claimed",
+		is_exclusive=not task.allow_multiple_claims,
 	)
 	db.session.add(claim)
-	db.session.commit()
+	try:
+		db.session.commit()
+	except IntegrityError:
+		# A concurrent claim won a unique claim index: either this kid's own
+		# second request (a double tap) or another kid's claim.
+		db.session.rollback()
+		own_claim = TaskClaim.query.filter_by(task_id=task.id, kid_id=kid.id).filter(
+			TaskClaim.status.in_(TaskClaim.ACTIVE_STATUSES)
+		).first()
+		if own_claim:
+			flash("You already have an active claim on this task.", "info")
+		else:
+			flash("This task has already been claimed or completed.", "info")
+		return redirect(url_for("public.kid_tasks"))
 	flash(f"You picked up '{task.title}'! Submit it when done.", "success")
 	return redirect(url_for("public.kid_tasks"))
 
@@ -5017,6 +5484,7 @@ def kid_task_submit(claim_id: int):
 		return redirect(url_for("public.kid_tasks"))
 
 	claim.photo_path = photo_path
+	link_photo(photo_path, "task_claim", claim.id)
 	claim.status = "submitted"
 	claim.submitted_at = datetime.utcnow()
 	db.session.commit()
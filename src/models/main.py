@@ -53,10 +53,12 @@ class Family(db.Model):
 	# plan: "free" | "pro"
 	plan = db.Column(db.String(20), nullable=False, default="free")
 	trial_ends_at = db.Column(db.DateTime, nullable=True)
-	stripe_customer_id = db.Column(db.String(120), nullable=True)
-	stripe_subscription_id = db.Column(db.String(120), nullable=True)
+	stripe_customer_id = db.Column(db.String(120), nullable=True, index=True)
+	stripe_subscription_id = db.Column(db.String(120), nullable=True, index=True)
 	# subscription_status: "trialing" | "active" | "past_due" | "canceled" | None
 	subscription_status = db.Column(db.String(30), nullable=True)
+	# Bumped whenever the store catalog changes; keys the cached catalog (src/utils/store_catalog.py).
+	store_catalog_version = db.Column(db.Integer, nullable=False, default=0)
 
 	parents = db.relationship("Parent", back_populates="family", cascade="all, delete-orphan")
 	kids = db.relationship("Kid", back_populates="family", cascade="all, delete-orphan")
@@ -390,12 +392,82 @@ class ChoreSubmission(db.Model):
 	resolved_at = db.Column(db.DateTime)
 	resolved_by_parent_id = db.Column(db.Integer, db.ForeignKey("parents.id"), nullable=True, index=True)
 	resolution_note = db.Column(db.String(255))
+	# Day the claim counts against, and which of the chore's max_concurrent_claims
+	# slots it holds (1-based).  claim_slot is cleared when the claim is rejected,
+	# freeing the slot.
+	claim_day = db.Column(db.Date)
+	claim_slot = db.Column(db.Integer)
 
 	chore = db.relationship("Chore", back_populates="submissions")
 	family = db.relationship("Family", backref=db.backref("chore_submissions", lazy=True, cascade="all, delete-orphan"))
 	kid = db.relationship("Kid", backref=db.backref("chore_submissions", lazy=True, cascade="all, delete-orphan"))
 	resolved_by_parent = db.relationship("Parent", foreign_keys=[resolved_by_parent_id])
 
+	# The claim insert itself arbitrates concurrent claims: each slot of a
+	# chore's day can be held once, and each kid can hold only one of them.
+	__table_args__ = (
+		db.Index(
+			"uq_chore_submissions_claim_slot",
+			"chore_id",
+			"reset_version",
+			"claim_day",
+			"claim_slot",
+			unique=True,
+			postgresql_where=claim_slot.isnot(None),
+			sqlite_where=claim_slot.isnot(None),
+		),
+		db.Index(
+			"uq_chore_submissions_kid_claim_day",
+			"chore_id",
+			"reset_version",
+			"claim_day",
+			"kid_id",
+			unique=True,
+			postgresql_where=claim_slot.isnot(None),
+			sqlite_where=claim_slot.isnot(None),
+		),
+		# Archived rows keep their ids; never hand one out again.
+		{"sqlite_autoincrement": True},
+	)
+
+
+class ChoreSubmissionArchive(db.Model):
+	"""Cold copy of a resolved ChoreSubmission moved out by src/utils/archive.py.
+
+	Same columns and ids as chore_submissions, so history reads can UNION ALL
+	the two tables.
+	"""
+
+	__tablename__ = "chore_submissions_archive"
+
+	id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+	chore_id = db.Column(db.Integer, db.ForeignKey("chores.id"), nullable=False)
+	family_id = db.Column(db.Integer, db.ForeignKey("families.id"), nullable=False)
+	kid_id = db.Column(db.Integer, db.ForeignKey("kids.id"), nullable=False, index=True)
+	status = db.Column(db.String(20), nullable=False)
+	reset_version = db.Column(db.Integer, default=0, nullable=False)
+	awarded_coin_amount = db.Column(db.Integer, default=0, nullable=False)
+	awarded_point_amount = db.Column(db.Integer, default=0, nullable=False)
+	before_photo_path = db.Column(db.String(255))
+	after_photo_path = db.Column(db.String(255))
+	claimed_at = db.Column(db.DateTime, nullable=False)
+	submitted_at = db.Column(db.DateTime)
+	resolved_at = db.Column(db.DateTime)
+	resolved_by_parent_id = db.Column(db.Integer, db.ForeignKey("parents.id"), nullable=True)
+	resolution_note = db.Column(db.String(255))
+	claim_day = db.Column(db.Date)
+	claim_slot = db.Column(db.Integer)
+	archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+	chore = db.relationship("Chore", backref=db.backref("archived_submissions", lazy=True, cascade="all, delete-orphan"))
+	family = db.relationship("Family", backref=db.backref("archived_chore_submissions", lazy=True, cascade="all, delete-orphan"))
+	kid = db.relationship("Kid", backref=db.backref("archived_chore_submissions", lazy=True, cascade="all, delete-orphan"))
+
+	__table_args__ = (
+		db.Index("ix_chore_submissions_archive_family_claimed_id", "family_id", "claimed_at", "id"),
+		db.Index("ix_chore_submissions_archive_chore_id", "chore_id"),
+	)
+
 
 class GuardianJoinRequest(db.Model):
 	"""A request from a guardian to join an existing family."""
@@ -462,6 +534,9 @@ class StoreRedemption(db.Model):
 	resolved_at = db.Column(db.DateTime)
 	resolved_by_parent_id = db.Column(db.Integer, db.ForeignKey("parents.id"), nullable=True)
 	notes = db.Column(db.String(255))
+	# Denormalised family-goal vote tallies, kept in step by kid_vote_family_goal.
+	yes_vote_count = db.Column(db.Integer, nullable=False, default=0)
+	no_vote_count = db.Column(db.Integer, nullable=False, default=0)
 
 	store_item = db.relationship("StoreItem", backref=db.backref("redemptions", lazy=True, cascade="all, delete-orphan"))
 	family = db.relationship("Family", backref=db.backref("store_redemptions", lazy=True, cascade="all, delete-orphan"))
@@ -556,6 +631,13 @@ class StoreTimedSession(db.Model):
 			return min(elapsed, self.planned_duration_minutes * 60)
 		return elapsed
 
+	@property
+	def countdown_ends_at(self) -> datetime | None:
+		"""When a countdown session runs out; None for stopwatch."""
+		if self.timing_mode != "countdown" or not self.planned_duration_minutes:
+			return None
+		return self.started_at + timedelta(minutes=self.planned_duration_minutes)
+
 	@property
 	def remaining_seconds(self) -> int | None:
 		"""Seconds remaining for countdown sessions; None for stopwatch."""
@@ -573,10 +655,18 @@ class StoreTimedSession(db.Model):
 
 	@property
 	def current_turn(self) -> "StoreSessionTurn | None":
-		for turn in reversed(self.turns or []):
-			if turn.ended_at is None:
-				return turn
-		return None
+		"""The running turn.
+
+		Queried on every access (one indexed lookup) rather than read from a
+		cached relationship, which would miss a turn opened or closed earlier
+		in the same session.
+		"""
+		return (
+			StoreSessionTurn.query
+			.filter(StoreSessionTurn.timed_session_id == self.id, StoreSessionTurn.ended_at.is_(None))
+			.order_by(StoreSessionTurn.started_at.desc(), StoreSessionTurn.id.desc())
+			.first()
+		)
 
 
 class StoreSessionParticipant(db.Model):
@@ -592,6 +682,10 @@ class StoreSessionParticipant(db.Model):
 	participant_type = db.Column(db.String(20), nullable=False, default="kid", index=True)
 	guest_name = db.Column(db.String(120))
 	joined_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+	# Running totals maintained as turns close / minutes are charged.
+	# elapsed_seconds covers closed turns only; add the open turn's live time on read.
+	elapsed_seconds = db.Column(db.Integer, nullable=False, default=0)
+	coins_charged = db.Column(db.Integer, nullable=False, default=0)
 
 	timed_session = db.relationship("StoreTimedSession", back_populates="participants")
 	family = db.relationship("Family", backref=db.backref("store_session_participants", lazy=True, cascade="all, delete-orphan"))
@@ -703,6 +797,148 @@ class CoinTransaction(db.Model):
 	family = db.relationship("Family", backref=db.backref("coin_transactions", lazy=True))
 	created_by_parent = db.relationship("Parent", backref=db.backref("coin_transactions_issued", lazy=True))
 
+	__table_args__ = (
+		# Keyset pagination of a family's history: WHERE family_id = ? ORDER BY created_at DESC, id DESC.
+		db.Index("ix_coin_transactions_family_created_id", "family_id", "created_at", "id"),
+		# Reconciliation sums a kid's transactions newer than its last checkpoint.
+		db.Index("ix_coin_transactions_kid_id_id", "kid_id", "id"),
+		# Archived rows keep their ids; never hand one out again.
+		{"sqlite_autoincrement": True},
+	)
+
+
+class CoinTransactionArchive(db.Model):
+	"""Cold copy of a CoinTransaction moved out by src/utils/archive.py.
+
+	On Postgres the table is range-partitioned by month on created_at, which
+	is why created_at is part of the primary key.
+	"""
+
+	__tablename__ = "coin_transactions_archive"
+
+	id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+	kid_id = db.Column(db.Integer, db.ForeignKey("kids.id"), nullable=False)
+	family_id = db.Column(db.Integer, db.ForeignKey("families.id"), nullable=False)
+	amount = db.Column(db.Integer, nullable=False)
+	kind = db.Column(db.String(30), nullable=False)
+	reason = db.Column(db.Text)
+	ref_type = db.Column(db.String(50))
+	ref_id = db.Column(db.Integer)
+	created_by_parent_id = db.Column(db.Integer, db.ForeignKey("parents.id"))
+	created_at = db.Column(db.DateTime, primary_key=True, nullable=False)
+	approved_at = db.Column(db.DateTime, nullable=True)
+	seen_by_kid = db.Column(db.Boolean, nullable=False, default=False)
+	archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+	kid = db.relationship("Kid", backref=db.backref("archived_coin_transactions", lazy=True))
+	family = db.relationship("Family", backref=db.backref("archived_coin_transactions", lazy=True))
+
+	__table_args__ = (
+		db.Index("ix_coin_transactions_archive_family_created_id", "family_id", "created_at", "id"),
+		db.Index("ix_coin_transactions_archive_kid_id_id", "kid_id", "id"),
+		{"postgresql_partition_by": "RANGE (created_at)"},
+	)
+
+
+class KidDailyStat(db.Model):
+	"""Per-kid, per-day activity totals maintained alongside the raw rows (src/utils/kid_stats.py)."""
+
+	__tablename__ = "kid_daily_stats"
+
+	id = db.Column(db.Integer, primary_key=True)
+	kid_id = db.Column(db.Integer, db.ForeignKey("kids.id"), nullable=False)
+	family_id = db.Column(db.Integer, db.ForeignKey("families.id"), nullable=False)
+	day = db.Column(db.Date, nullable=False)
+	coins_earned = db.Column(db.Integer, nullable=False, default=0)
+	coins_spent = db.Column(db.Integer, nullable=False, default=0)
+	chores_approved = db.Column(db.Integer, nullable=False, default=0)
+	session_seconds = db.Column(db.Integer, nullable=False, default=0)
+
+	kid = db.relationship("Kid", backref=db.backref("daily_stats", lazy=True, cascade="all, delete-orphan"))
+
+	__table_args__ = (
+		db.UniqueConstraint("kid_id", "day", name="uq_kid_daily_stats_kid_day"),
+		db.Index("ix_kid_daily_stats_family_day", "family_id", "day"),
+	)
+
+
+class KidNotification(db.Model):
+	"""An inbox item for a kid: coins added, fines, approvals, rejections, ended sessions."""
+
+	__tablename__ = "kid_notifications"
+
+	id = db.Column(db.Integer, primary_key=True)
+	kid_id = db.Column(db.Integer, db.ForeignKey("kids.id"), nullable=False)
+	family_id = db.Column(db.Integer, db.ForeignKey("families.id"), nullable=False, index=True)
+	# coins_added | fine | chore_approved | chore_rejected | task_approved | task_rejected |
+	# challenge_approved | challenge_rejected | purchase_approved | purchase_rejected | session_ended
+	kind = db.Column(db.String(30), nullable=False)
+	message = db.Column(db.String(255), nullable=False)
+	# Flash category used when the item is shown: success | info | error
+	level = db.Column(db.String(10), nullable=False, default="info")
+	ref_type = db.Column(db.String(50))
+	ref_id = db.Column(db.Integer)
+	created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+	read_at = db.Column(db.DateTime, nullable=True)
+
+	kid = db.relationship("Kid", backref=db.backref("notifications", lazy=True, cascade="all, delete-orphan"))
+
+	__table_args__ = (
+		# Recent items for the inbox page.
+		db.Index("ix_kid_notifications_kid_id_id", "kid_id", "id"),
+		# Unread badge and mark-read touch only unread rows.
+		db.Index(
+			"ix_kid_notifications_unread",
+			"kid_id",
+			"id",
+			postgresql_where=read_at.is_(None),
+			sqlite_where=read_at.is_(None),
+		),
+	)
+
+
+class CoinBalanceCheckpoint(db.Model):
+	"""A kid's ledger balance as of a given CoinTransaction id.
+
+	Written by the reconciliation job so verifying Kid.coin_balance only has to
+	sum transactions newer than the latest checkpoint.
+	"""
+
+	__tablename__ = "coin_balance_checkpoints"
+
+	id = db.Column(db.Integer, primary_key=True)
+	kid_id = db.Column(db.Integer, db.ForeignKey("kids.id"), nullable=False)
+	as_of_tx_id = db.Column(db.Integer, nullable=False, default=0)
+	balance = db.Column(db.Integer, nullable=False)
+	# coin_balance minus the ledger-derived balance when the checkpoint was taken; 0 = in sync
+	drift = db.Column(db.Integer, nullable=False, default=0)
+	# Highest CoinTransaction id that existed when this reconciliation run began
+	observed_max_tx_id = db.Column(db.Integer, nullable=False, default=0)
+	created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+	kid = db.relationship("Kid", backref=db.backref("balance_checkpoints", lazy=True, cascade="all, delete-orphan"))
+
+	__table_args__ = (
+		db.Index("ix_coin_balance_checkpoints_kid_id_id", "kid_id", "id"),
+	)
+
+
+class LedgerReconcileRun(db.Model):
+	"""One reconciliation run and the highest CoinTransaction id that existed when it began.
+
+	Later runs take their settle watermark from runs that began at least
+	CHECKPOINT_SETTLE_WINDOW ago (src/utils/ledger.py), so the watermark keeps
+	advancing even when a run writes no checkpoints.
+	"""
+
+	__tablename__ = "ledger_reconcile_runs"
+
+	id = db.Column(db.Integer, primary_key=True)
+	observed_max_tx_id = db.Column(db.Integer, nullable=False, default=0)
+	started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+	kids_checked = db.Column(db.Integer, nullable=False, default=0)
+	kids_drifted = db.Column(db.Integer, nullable=False, default=0)
+
 
 class StoreSessionPreference(db.Model):
 	"""Saves the last timer setup a kid used for a timed item."""
@@ -782,6 +1018,11 @@ class ChallengeSubmission(db.Model):
 	kid = db.relationship("Kid", backref=db.backref("challenge_submissions", lazy=True, cascade="all, delete-orphan"))
 	resolved_by_parent = db.relationship("Parent", foreign_keys=[resolved_by_parent_id])
 
+	__table_args__ = (
+		# Backs the latest-submission-per-(kid, challenge) lookups.
+		db.Index("ix_challenge_submissions_family_kid_challenge_claimed", "family_id", "kid_id", "challenge_id", "claimed_at"),
+	)
+
 
 class Task(db.Model):
 	"""A one-off task on the family task board. Can be assigned to a specific kid
@@ -840,12 +1081,92 @@ class TaskClaim(db.Model):
 	resolved_at = db.Column(db.DateTime)
 	resolved_by_parent_id = db.Column(db.Integer, db.ForeignKey("parents.id"), nullable=True, index=True)
 	resolution_note = db.Column(db.String(255))
+	# Copy of "not task.allow_multiple_claims" at claim time, so the unique
+	# index below can tell single-claim tasks apart.
+	is_exclusive = db.Column(db.Boolean, nullable=False, default=False)
 
 	task = db.relationship("Task", back_populates="claims")
 	family = db.relationship("Family", backref=db.backref("task_claims", lazy=True, cascade="all, delete-orphan"))
 	kid = db.relationship("Kid", backref=db.backref("task_claims", lazy=True, cascade="all, delete-orphan"))
 	resolved_by_parent = db.relationship("Parent", foreign_keys=[resolved_by_parent_id])
 
+	# Claims that take a single-claim task off the board.  Queries that filter on
+	# exactly this IN list can use the partial index below, which stays small no
+	# matter how many rejected claims pile up.
+	HOLDING_STATUSES = ("claimed", "submitted", "approved")
+
+	ACTIVE_STATUSES = ("claimed", "submitted")
+
+	__table_args__ = (
+		db.Index(
+			"ix_task_claims_task_kid_holding",
+			"task_id",
+			"kid_id",
+			postgresql_where=status.in_(HOLDING_STATUSES),
+			sqlite_where=status.in_(HOLDING_STATUSES),
+		),
+		# Claim arbitration: one active claim per kid and task, and a single
+		# holder for a single-claim task.  A losing insert raises IntegrityError.
+		db.Index(
+			"uq_task_claims_kid_active",
+			"task_id",
+			"kid_id",
+			unique=True,
+			postgresql_where=status.in_(ACTIVE_STATUSES),
+			sqlite_where=status.in_(ACTIVE_STATUSES),
+		),
+		db.Index(
+			"uq_task_claims_exclusive_holder",
+			"task_id",
+			unique=True,
+			postgresql_where=db.and_(is_exclusive, status.in_(HOLDING_STATUSES)),
+			sqlite_where=db.and_(is_exclusive, status.in_(HOLDING_STATUSES)),
+		),
+	)
+
+
+# ---------------------------------------------------------------------------
+# Photo blob store
+# ---------------------------------------------------------------------------
+
+class PhotoBlob(db.Model):
+	"""A content-addressed uploaded photo stored once under uploads/blobs/."""
+
+	__tablename__ = "photo_blobs"
+
+	id = db.Column(db.Integer, primary_key=True)
+	sha256 = db.Column(db.String(64), nullable=False, unique=True, index=True)
+	extension = db.Column(db.String(10), nullable=False, default="")
+	size_bytes = db.Column(db.Integer, nullable=False, default=0)
+	created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+	# Bumped whenever an upload resolves to this blob so GC never races a fresh re-upload.
+	last_uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+	refs = db.relationship("PhotoBlobRef", back_populates="blob", cascade="all, delete-orphan")
+
+	@property
+	def relative_path(self) -> str:
+		return f"blobs/{self.sha256[:2]}/{self.sha256}{self.extension}"
+
+
+class PhotoBlobRef(db.Model):
+	"""Links a PhotoBlob to the row/slot that uses it (e.g. chore_submission #5 'after')."""
+
+	__tablename__ = "photo_blob_refs"
+	__table_args__ = (
+		db.UniqueConstraint("ref_type", "ref_id", "slot", name="uq_photo_blob_refs_owner_slot"),
+	)
+
+	id = db.Column(db.Integer, primary_key=True)
+	blob_id = db.Column(db.Integer, db.ForeignKey("photo_blobs.id"), nullable=False, index=True)
+	# chore_submission | task_claim | challenge_submission
+	ref_type = db.Column(db.String(40), nullable=False)
+	ref_id = db.Column(db.Integer, nullable=False)
+	slot = db.Column(db.String(20), nullable=False, default="photo")
+	created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+	blob = db.relationship("PhotoBlob", back_populates="refs")
+
 
 # ---------------------------------------------------------------------------
 # Promo Codes
@@ -959,6 +1280,97 @@ class AppSetting(db.Model):
 		return f"<AppSetting {self.key}>"
 
 
+class AdminMetricsSnapshot(db.Model):
+	"""One row per day of the admin dashboard counters, written by the scheduler (src/utils/admin_metrics.py)."""
+
+	__tablename__ = "admin_metrics_snapshot"
+
+	id = db.Column(db.Integer, primary_key=True)
+	day = db.Column(db.Date, nullable=False, unique=True)
+	taken_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+	total_families = db.Column(db.Integer, nullable=False, default=0)
+	pro_families = db.Column(db.Integer, nullable=False, default=0)
+	trialing_families = db.Column(db.Integer, nullable=False, default=0)
+	# Families whose trial has ended, and how many of those are now on Pro.
+	trials_ended = db.Column(db.Integer, nullable=False, default=0)
+	trials_converted = db.Column(db.Integer, nullable=False, default=0)
+	past_due = db.Column(db.Integer, nullable=False, default=0)
+	new_this_week = db.Column(db.Integer, nullable=False, default=0)
+	new_this_month = db.Column(db.Integer, nullable=False, default=0)
+	total_parents = db.Column(db.Integer, nullable=False, default=0)
+
+	@property
+	def trial_conversion_rate(self) -> float | None:
+		"""Share of ended trials that converted to Pro, or None before any trial has ended."""
+		if not self.trials_ended:
+			return None
+		return self.trials_converted / self.trials_ended
+
+
+class EmailOutbox(db.Model):
+	"""A queued transactional email; delivered by the outbox dispatcher (src/utils/email.py)."""
+
+	__tablename__ = "email_outbox"
+
+	id = db.Column(db.Integer, primary_key=True)
+	to_email = db.Column(db.String(255), nullable=False)
+	to_name = db.Column(db.String(120), nullable=False, default="")
+	subject = db.Column(db.String(255), nullable=False)
+	html_content = db.Column(db.Text, nullable=False)
+	# pending | sent | dead
+	status = db.Column(db.String(20), nullable=False, default="pending")
+	attempts = db.Column(db.Integer, nullable=False, default=0)
+	# When a pending row is next due; a claimed row is pushed out by the lease.
+	next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+	last_error = db.Column(db.String(500))
+	created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+	sent_at = db.Column(db.DateTime)
+
+	__table_args__ = (
+		db.Index(
+			"ix_email_outbox_pending_due",
+			"next_attempt_at",
+			"id",
+			postgresql_where=status == "pending",
+			sqlite_where=status == "pending",
+		),
+	)
+
+
+class StripeEvent(db.Model):
+	"""A received Stripe webhook event, keyed by Stripe's event id so redeliveries are no-ops.
+
+	The webhook only stores the verified payload; src/utils/stripe_events.py
+	applies it in the background.
+	"""
+
+	__tablename__ = "stripe_events"
+
+	event_id = db.Column(db.String(255), primary_key=True)
+	type = db.Column(db.String(100), nullable=False)
+	payload = db.Column(db.Text, nullable=False)
+	# Stripe's own event timestamp; events are applied in this order.
+	stripe_created_at = db.Column(db.DateTime, nullable=False)
+	# pending | processed | failed
+	status = db.Column(db.String(20), nullable=False, default="pending")
+	attempts = db.Column(db.Integer, nullable=False, default=0)
+	next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+	last_error = db.Column(db.String(500))
+	received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+	processed_at = db.Column(db.DateTime)
+
+	__table_args__ = (
+		db.Index(
+			"ix_stripe_events_pending_due",
+			"next_attempt_at",
+			"stripe_created_at",
+			postgresql_where=status == "pending",
+			sqlite_where=status == "pending",
+		),
+		db.Index("ix_stripe_events_status_received", "status", "received_at"),
+	)
+
+
 # ---------------------------------------------------------------------------
 # Donations
 # ---------------------------------------------------------------------------
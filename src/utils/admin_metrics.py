@@ -0,0 +1,104 @@
+"""
+Daily admin dashboard metrics (admin_metrics_snapshot).
+
+compute_metrics() gathers every dashboard counter in one aggregate statement
+over families, using COUNT(*) FILTER (WHERE ...) on Postgres and
+SUM(CASE ...) elsewhere.  The scheduler stores the result once per day with
+take_snapshot(), so the dashboard reads one row instead of counting families
+on every page view, and the stored rows double as the history for its trend
+charts.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+
+HISTORY_DEFAULT_DAYS = 90
+
+METRIC_COLUMNS = (
+    "total_families",
+    "pro_families",
+    "trialing_families",
+    "trials_ended",
+    "trials_converted",
+    "past_due",
+    "new_this_week",
+    "new_this_month",
+    "total_parents",
+)
+
+
+def compute_metrics(now: datetime | None = None) -> dict:
+    """Return {column: count} for METRIC_COLUMNS from a single query."""
+    from sqlalchemy import and_, case, func, select
+    from src.models.main import Family, Parent, db
+
+    now = now or datetime.utcnow()
+    active = Family.is_active.is_(True)
+    trial_ended = and_(Family.trial_ends_at.isnot(None), Family.trial_ends_at <= now)
+    conditions = {
+        "total_families": active,
+        "pro_families": and_(active, Family.plan == "pro"),
+        "trialing_families": and_(active, Family.trial_ends_at > now),
+        "trials_ended": trial_ended,
+        "trials_converted": and_(trial_ended, Family.plan == "pro"),
+        "past_due": Family.subscription_status == "past_due",
+        "new_this_week": and_(active, Family.created_at >= now - timedelta(days=7)),
+        "new_this_month": and_(active, Family.created_at >= now - timedelta(days=30)),
+    }
+
+    if db.engine.dialect.name == "postgresql":
+        def counted(condition):
+            return func.count().filter(condition)
+    else:
+        def counted(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    parents = select(func.count(Parent.id)).scalar_subquery()
+    row = db.session.execute(
+        select(
+            *[counted(condition).label(name) for name, condition in conditions.items()],
+            parents.label("total_parents"),
+        ).select_from(Family)
+    ).one()
+    return {column: int(getattr(row, column) or 0) for column in METRIC_COLUMNS}
+
+
+def take_snapshot(now: datetime | None = None):
+    """Compute the metrics and upsert today's snapshot row; commits.  Returns the row."""
+    from src.models.main import AdminMetricsSnapshot, db
+
+    now = now or datetime.utcnow()
+    values = {"day": now.date(), "taken_at": now, **compute_metrics(now)}
+
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(AdminMetricsSnapshot).values(values)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[AdminMetricsSnapshot.day],
+        set_={column: statement.excluded[column] for column in ("taken_at", *METRIC_COLUMNS)},
+    ))
+    db.session.commit()
+    return latest_snapshot()
+
+
+def latest_snapshot():
+    from src.models.main import AdminMetricsSnapshot
+
+    return AdminMetricsSnapshot.query.order_by(AdminMetricsSnapshot.day.desc()).first()
+
+
+def snapshot_history(days: int = HISTORY_DEFAULT_DAYS) -> list:
+    """Snapshots from the last *days* days, oldest first."""
+    from src.models.main import AdminMetricsSnapshot
+
+    since = date.today() - timedelta(days=days)
+    return (
+        AdminMetricsSnapshot.query
+        .filter(AdminMetricsSnapshot.day > since)
+        .order_by(AdminMetricsSnapshot.day.asc())
+        .all()
+    )
@@ -0,0 +1,244 @@
+"""
+Indexed search for the admin families and parents lists.
+
+Postgres: pg_trgm GIN indexes on families.name, families.family_code_hint,
+parents.name and parents.email serve the ILIKE '%q%' filters, and matches are
+ranked by trigram similarity.
+
+SQLite: families_fts and parents_fts are FTS5 external-content tables kept in
+sync by triggers; every word of the query is prefix-matched and matches are
+ranked by bm25().
+
+Families match on their own name / code hint or on any of their parents'
+names and emails; parents match on name / email or on their family.  Pages
+are keyset-paginated on (score, id), so a deep page costs the same as the
+first.  Without pg_trgm or FTS5 the lists fall back to unranked ILIKE scans.
+"""
+from __future__ import annotations
+
+import re
+
+
+PAGE_SIZE = 50
+# Scores are stored as integers so a cursor round-trips through the URL exactly.
+SCORE_SCALE = 1000
+
+_TRGM_COLUMNS = (
+    ("families", "name"),
+    ("families", "family_code_hint"),
+    ("parents", "name"),
+    ("parents", "email"),
+)
+_FTS_COLUMNS = {
+    "families": ("name", "family_code_hint"),
+    "parents": ("name", "email"),
+}
+
+
+def _fts_ddl(table: str, columns: tuple[str, ...]) -> list[str]:
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    insert_new = f"INSERT INTO {table}_fts(rowid, {names}) VALUES (new.id, {new_values});"
+    delete_old = f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({names}, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {names} ON {table} BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def ensure_search_indexes() -> str | None:
+    """Create the search indexes for this database.
+
+    Returns the backend in use ("trgm", "fts5" or None for plain ILIKE) and
+    records it in app.extensions["admin_search_backend"].
+    """
+    from flask import current_app
+    from sqlalchemy import inspect, text
+    from src.models.main import db
+
+    backend = None
+    try:
+        if db.engine.dialect.name == "postgresql":
+            with db.engine.begin() as connection:
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for table, column in _TRGM_COLUMNS:
+                    connection.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)"
+                    ))
+            backend = "trgm"
+        elif db.engine.dialect.name == "sqlite":
+            existing = set(inspect(db.engine).get_table_names())
+            with db.engine.begin() as connection:
+                for table, columns in _FTS_COLUMNS.items():
+                    for statement in _fts_ddl(table, columns):
+                        connection.execute(text(statement))
+                    if f"{table}_fts" not in existing:
+                        connection.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+            backend = "fts5"
+    except Exception:
+        current_app.logger.warning("Admin search indexes unavailable; using unindexed search.", exc_info=True)
+
+    current_app.extensions["admin_search_backend"] = backend
+    return backend
+
+
+def _backend() -> str | None:
+    from flask import current_app
+
+    return current_app.extensions.get("admin_search_backend")
+
+
+def _like(column, q: str):
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
+
+
+def _fts_match(q: str) -> str | None:
+    """FTS5 query that prefix-matches every word of *q*, or None if it has no words."""
+    terms = re.findall(r"\w+", q)
+    return " ".join(f'"{term}"*' for term in terms) or None
+
+
+def _fts_table(table: str):
+    from sqlalchemy import column, table as table_clause
+
+    return table_clause(f"{table}_fts", column("rowid"))
+
+
+def _fts_score(table: str):
+    """bm25() is negative and smaller for better matches; flip it into an integer score."""
+    from sqlalchemy import Integer, cast, func, literal_column
+
+    return cast(func.bm25(literal_column(f"{table}_fts")) * -SCORE_SCALE, Integer)
+
+
+def _fts_matches(table: str, match: str):
+    from sqlalchemy import literal_column
+
+    return literal_column(f"{table}_fts").op("MATCH")(match)
+
+
+def _best_score(*selects):
+    """Collapse (id, score) selects into one subquery keeping each id's best score."""
+    from sqlalchemy import func, select, union_all
+
+    hits = union_all(*selects).subquery()
+    return select(hits.c.id, func.max(hits.c.score).label("score")).group_by(hits.c.id).subquery()
+
+
+def _family_hits(q: str):
+    """Subquery of (id, score) for families matching *q*, or None when search is unindexed."""
+    from sqlalchemy import Integer, cast, func, or_, select
+    from src.models.main import Family, Parent
+
+    backend = _backend()
+    if backend == "trgm":
+        parent_families = select(Parent.family_id).where(or_(_like(Parent.name, q), _like(Parent.email, q)))
+        score = func.greatest(func.similarity(Family.name, q), func.similarity(Family.family_code_hint, q))
+        return (
+            select(Family.id.label("id"), cast(score * SCORE_SCALE, Integer).label("score"))
+            .where(or_(_like(Family.name, q), _like(Family.family_code_hint, q), Family.id.in_(parent_families)))
+            .subquery()
+        )
+
+    match = _fts_match(q) if backend == "fts5" else None
+    if match is None:
+        return None
+    families_fts = _fts_table("families")
+    parents_fts = _fts_table("parents")
+    return _best_score(
+        select(families_fts.c.rowid.label("id"), _fts_score("families").label("score"))
+        .where(_fts_matches("families", match)),
+        select(Parent.family_id.label("id"), _fts_score("parents").label("score"))
+        .select_from(parents_fts)
+        .join(Parent, Parent.id == parents_fts.c.rowid)
+        .where(_fts_matches("parents", match)),
+    )
+
+
+def _parent_hits(q: str):
+    """Subquery of (id, score) for parents matching *q*, or None when search is unindexed."""
+    from sqlalchemy import Integer, cast, func, or_, select
+    from src.models.main import Family, Parent
+
+    backend = _backend()
+    if backend == "trgm":
+        matching_families = select(Family.id).where(or_(_like(Family.name, q), _like(Family.family_code_hint, q)))
+        score = func.greatest(func.similarity(Parent.name, q), func.similarity(Parent.email, q))
+        return (
+            select(Parent.id.label("id"), cast(score * SCORE_SCALE, Integer).label("score"))
+            .where(or_(_like(Parent.name, q), _like(Parent.email, q), Parent.family_id.in_(matching_families)))
+            .subquery()
+        )
+
+    match = _fts_match(q) if backend == "fts5" else None
+    if match is None:
+        return None
+    families_fts = _fts_table("families")
+    parents_fts = _fts_table("parents")
+    return _best_score(
+        select(parents_fts.c.rowid.label("id"), _fts_score("parents").label("score"))
+        .where(_fts_matches("parents", match)),
+        select(Parent.id.label("id"), _fts_score("families").label("score"))
+        .select_from(families_fts)
+        .join(Parent, Parent.family_id == families_fts.c.rowid)
+        .where(_fts_matches("families", match)),
+    )
+
+
+def _page(query, model, hits, after: str | None, limit: int):
+    """Apply keyset pagination; returns (rows, cursor for the next page or None)."""
+    from sqlalchemy import and_, or_
+
+    if hits is None:
+        # Unranked: newest first, keyed on id alone.
+        if after and after.isdigit():
+            query = query.filter(model.id < int(after))
+        rows = query.order_by(model.id.desc()).limit(limit + 1).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return rows, (str(rows[-1].id) if more else None)
+
+    query = query.join(hits, hits.c.id == model.id).add_columns(hits.c.score)
+    score, _, last_id = (after or "").partition(":")
+    if score.lstrip("-").isdigit() and last_id.isdigit():
+        query = query.filter(or_(
+            hits.c.score < int(score),
+            and_(hits.c.score == int(score), model.id > int(last_id)),
+        ))
+    rows = query.order_by(hits.c.score.desc(), model.id.asc()).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = f"{rows[-1][1]}:{rows[-1][0].id}" if more else None
+    return [row for row, _ in rows], cursor
+
+
+def search_families(q: str = "", after: str | None = None, limit: int = PAGE_SIZE):
+    """One page of families matching *q* (all families when empty).  Returns (families, next_cursor)."""
+    from sqlalchemy import or_
+    from sqlalchemy.orm import selectinload
+    from src.models.main import Family, Parent
+
+    query = Family.query.options(selectinload(Family.parents), selectinload(Family.kids))
+    hits = _family_hits(q) if q else None
+    if q and hits is None:
+        parent_families = Parent.query.with_entities(Parent.family_id).filter(or_(_like(Parent.name, q), _like(Parent.email, q)))
+        query = query.filter(or_(_like(Family.name, q), _like(Family.family_code_hint, q), Family.id.in_(parent_families)))
+    return _page(query, Family, hits, after, limit)
+
+
+def search_parents(q: str = "", after: str | None = None, limit: int = PAGE_SIZE):
+    """One page of parents matching *q* (all parents when empty).  Returns (parents, next_cursor)."""
+    from sqlalchemy import or_
+    from sqlalchemy.orm import joinedload
+    from src.models.main import Family, Parent
+
+    query = Parent.query.options(joinedload(Parent.family))
+    hits = _parent_hits(q) if q else None
+    if q and hits is None:
+        matching_families = Family.query.with_entities(Family.id).filter(or_(_like(Family.name, q), _like(Family.family_code_hint, q)))
+        query = query.filter(or_(_like(Parent.name, q), _like(Parent.email, q), Parent.family_id.in_(matching_families)))
+    return _page(query, Parent, hits, after, limit)
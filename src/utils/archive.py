@@ -0,0 +1,175 @@
+"""
+Hot/cold archival of chore submissions and coin transactions.
+
+The hot tables (chore_submissions, coin_transactions) back every claim
+count and approval queue, yet nearly all of their rows are finished history.
+run_archival() moves rows older than ARCHIVE_AFTER_DAYS (default 365) into
+chore_submissions_archive and coin_transactions_archive, keeping their ids.
+The newest row of each hot table always stays behind, so the table's id
+counter never falls back to an archived id.
+
+Each batch is one INSERT ... SELECT plus one DELETE in its own transaction,
+so a run can be interrupted at any point and simply resumes on the next run.
+
+Only rows that can no longer change are moved:
+  * chore submissions in a final status (approved, archived, rejected);
+  * coin transactions already folded into the kid's latest balance
+    checkpoint, so reconciliation never needs the cold table.
+
+On Postgres coin_transactions_archive is partitioned by month on
+created_at; partitions are created on demand before each batch is copied.
+
+History and export code reads through coin_transactions_union() /
+chore_submissions_union(), which UNION ALL both tiers.
+"""
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, timedelta
+
+
+ARCHIVE_BATCH_SIZE = 1000
+FINAL_CHORE_STATUSES = ("approved", "archived", "rejected")
+
+
+def archive_after_days() -> int:
+    try:
+        return max(1, int(os.environ.get("ARCHIVE_AFTER_DAYS", "365")))
+    except ValueError:
+        return 365
+
+
+def _hot_columns(model) -> list[str]:
+    return [column.key for column in model.__table__.columns]
+
+
+def _union(hot_model, archive_model, name: str):
+    from sqlalchemy import select, union_all
+
+    names = _hot_columns(hot_model)
+    return union_all(
+        select(*[hot_model.__table__.c[column] for column in names]),
+        select(*[archive_model.__table__.c[column] for column in names]),
+    ).subquery(name)
+
+
+def coin_transactions_union():
+    """CoinTransaction mapped over hot + archived rows; use like the model in queries."""
+    from sqlalchemy.orm import aliased
+    from src.models.main import CoinTransaction, CoinTransactionArchive
+
+    return aliased(CoinTransaction, _union(CoinTransaction, CoinTransactionArchive, "coin_transactions_all"))
+
+
+def chore_submissions_union():
+    """ChoreSubmission mapped over hot + archived rows (read-only)."""
+    from sqlalchemy.orm import aliased
+    from src.models.main import ChoreSubmission, ChoreSubmissionArchive
+
+    return aliased(ChoreSubmission, _union(ChoreSubmission, ChoreSubmissionArchive, "chore_submissions_all"))
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + 1, 1, 1) if value.month == 12 else date(value.year, value.month + 1, 1)
+
+
+def ensure_archive_partitions(start: datetime, end: datetime) -> None:
+    """Create the monthly coin_transactions_archive partitions covering [start, end] (Postgres only)."""
+    from sqlalchemy import text
+    from src.models.main import db
+
+    if db.engine.dialect.name != "postgresql":
+        return
+    month = _month_start(start.date())
+    while month <= end.date():
+        following = _next_month(month)
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS coin_transactions_archive_{month:%Y_%m} "
+            f"PARTITION OF coin_transactions_archive "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        ))
+        month = following
+
+
+def _move(hot_model, archive_model, id_query, batch_size: int, before_copy=None) -> int:
+    """Move rows in id batches from the hot to the archive table; returns rows moved.
+
+    The row holding the table's highest id always stays hot.  SQLite tables
+    created before the hot models declared AUTOINCREMENT hand out max(id) + 1,
+    so archiving that row would let a new row reuse an archived id (and
+    inherit its photo refs).
+    """
+    from sqlalchemy import delete, func, insert, literal, select
+    from src.models.main import db
+
+    names = _hot_columns(hot_model)
+    id_query = id_query.where(hot_model.id < select(func.max(hot_model.id)).correlate(None).scalar_subquery())
+    moved = 0
+    while True:
+        ids = [row[0] for row in db.session.execute(id_query.order_by(hot_model.id.asc()).limit(batch_size))]
+        if not ids:
+            break
+        if before_copy:
+            before_copy(ids)
+        db.session.execute(
+            insert(archive_model).from_select(
+                names + ["archived_at"],
+                select(
+                    *[hot_model.__table__.c[column] for column in names],
+                    literal(datetime.utcnow(), archive_model.archived_at.type),
+                ).where(hot_model.id.in_(ids)),
+            )
+        )
+        db.session.execute(delete(hot_model).where(hot_model.id.in_(ids)).execution_options(synchronize_session=False))
+        db.session.commit()
+        moved += len(ids)
+    return moved
+
+
+def archive_chore_submissions(before: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    from sqlalchemy import select
+    from src.models.main import ChoreSubmission, ChoreSubmissionArchive
+
+    id_query = select(ChoreSubmission.id).where(
+        ChoreSubmission.status.in_(FINAL_CHORE_STATUSES),
+        ChoreSubmission.claimed_at < before,
+    )
+    return _move(ChoreSubmission, ChoreSubmissionArchive, id_query, batch_size)
+
+
+def archive_coin_transactions(before: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    from sqlalchemy import func, select
+    from src.models.main import CoinBalanceCheckpoint, CoinTransaction, CoinTransactionArchive, db
+
+    checkpointed_through = (
+        select(func.max(CoinBalanceCheckpoint.as_of_tx_id))
+        .where(CoinBalanceCheckpoint.kid_id == CoinTransaction.kid_id)
+        .correlate(CoinTransaction)
+        .scalar_subquery()
+    )
+    id_query = select(CoinTransaction.id).where(
+        CoinTransaction.created_at < before,
+        CoinTransaction.id <= checkpointed_through,
+    )
+
+    def create_partitions(ids):
+        oldest, newest = db.session.execute(
+            select(func.min(CoinTransaction.created_at), func.max(CoinTransaction.created_at))
+            .where(CoinTransaction.id.in_(ids))
+        ).one()
+        ensure_archive_partitions(oldest, newest)
+
+    return _move(CoinTransaction, CoinTransactionArchive, id_query, batch_size, before_copy=create_partitions)
+
+
+def run_archival(retention_days: int | None = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> tuple[int, int]:
+    """Archive everything older than the retention horizon.  Returns (submissions, transactions) moved."""
+    before = datetime.utcnow() - timedelta(days=retention_days or archive_after_days())
+    return (
+        archive_chore_submissions(before, batch_size=batch_size),
+        archive_coin_transactions(before, batch_size=batch_size),
+    )
@@ -8,65 +8,360 @@ Usage:
         subject="Your subject",
         html_content="<p>Hello</p>",
     )
+
+send_email() does not talk to Brevo: it writes the message to the
+email_outbox table, so a slow or failing provider never holds up a request
+and no email is lost.  dispatch_outbox() (run by the scheduler, or
+``manage.py dispatch-email``) delivers due rows, retrying transient failures
+with exponential backoff and dead-lettering a row after EMAIL_MAX_ATTEMPTS
+tries or a permanent 4xx rejection.  A 401/403 means the API key itself is
+bad (e.g. mid-rotation), not the message, so the run stops and leaves its
+rows pending without using up an attempt.
+
+Bodies can carry live password-reset and verification links, so a row keeps
+only its envelope once it is sent or dead-lettered, and purge_sent_email()
+(run daily by the scheduler) deletes sent rows after SENT_RETENTION.
+
+Due rows go out together through Brevo's messageVersions batch API, up to
+BREVO_BATCH_SIZE per request, over one keep-alive requests.Session, so a
+reminder run to thousands of parents is a handful of HTTP requests.
+
+BREVO_API_URL overrides the endpoint, e.g. to point tests at a local fake.
 """
 
 from __future__ import annotations
 
 import os
+import sys
+import threading
+from datetime import datetime, timedelta
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
-def send_email(
-    to_email: str,
-    to_name: str,
-    subject: str,
-    html_content: str,
-) -> bool:
-    """Send a transactional email via Brevo.
+BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
+# Brevo accepts at most 1000 messageVersions per request.
+BREVO_BATCH_SIZE = 1000
+EMAIL_MAX_ATTEMPTS = 8
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=6)
+# A claimed row is pushed this far out; if the worker dies mid-send the row
+# simply comes due again.
+DISPATCH_LEASE = timedelta(minutes=5)
+SENT_RETENTION = timedelta(days=14)
+# Brevo rejects the credentials, not the message, with these.
+AUTH_FAILURE_STATUSES = (401, 403)
 
-    Returns True on success, False on failure.
-    Logs to stderr on failure so the app never hard-crashes on email errors.
-    """
+
+class EmailAuthError(Exception):
+    """Brevo refused the API key; nothing can be sent until it is fixed."""
+
+
+def _brevo_config() -> dict | None:
     api_key = os.environ.get("BREVO_API_KEY", "")
-    sender_name = os.environ.get("BREVO_SENDER_NAME", "Stewardwell")
     sender_email = os.environ.get("BREVO_SENDER_EMAIL", "")
-    reply_to_email = os.environ.get("BREVO_REPLY_TO_EMAIL", "")
-
     if not api_key or not sender_email:
-        import sys
-        print(
-            "[email] BREVO_API_KEY or BREVO_SENDER_EMAIL not configured — email not sent.",
-            file=sys.stderr,
-        )
-        return False
-
-    payload = {
-        "sender": {"name": sender_name, "email": sender_email},
-        "to": [{"email": to_email, "name": to_name}],
-        "subject": subject,
-        "htmlContent": html_content,
+        return None
+    return {
+        "url": os.environ.get("BREVO_API_URL", BREVO_API_URL),
+        "api_key": api_key,
+        "sender_name": os.environ.get("BREVO_SENDER_NAME", "Stewardwell"),
+        "sender_email": sender_email,
+        "reply_to_email": os.environ.get("BREVO_REPLY_TO_EMAIL", ""),
     }
-    if reply_to_email:
-        payload["replyTo"] = {"email": reply_to_email}
 
+
+_http_session: requests.Session | None = None
+_http_session_lock = threading.Lock()
+
+
+def _session() -> requests.Session:
+    """Process-wide keep-alive session, so sends reuse pooled TLS connections."""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+                session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+                _http_session = session
+    return _http_session
+
+
+def _post(config: dict, payload: dict) -> tuple[bool, bool, str | None]:
     try:
-        resp = requests.post(
-            "https://api.brevo.com/v3/smtp/email",
+        resp = _session().post(
+            config["url"],
             json=payload,
             headers={
-                "api-key": api_key,
+                "api-key": config["api_key"],
                 "Content-Type": "application/json",
                 "Accept": "application/json",
             },
             timeout=10,
         )
-        if resp.status_code in (200, 201):
-            return True
-        import sys
-        print(f"[email] Brevo error {resp.status_code}: {resp.text}", file=sys.stderr)
-        return False
     except Exception as exc:
-        import sys
-        print(f"[email] Request failed: {exc}", file=sys.stderr)
-        return False
+        return False, True, f"Request failed: {exc}"
+    if resp.status_code in (200, 201):
+        return True, False, None
+    if resp.status_code in AUTH_FAILURE_STATUSES:
+        raise EmailAuthError(f"Brevo error {resp.status_code}: {resp.text[:400]}")
+    retryable = resp.status_code == 429 or resp.status_code >= 500
+    return False, retryable, f"Brevo error {resp.status_code}: {resp.text[:400]}"
+
+
+def _base_payload(config: dict) -> dict:
+    payload = {"sender": {"name": config["sender_name"], "email": config["sender_email"]}}
+    if config["reply_to_email"]:
+        payload["replyTo"] = {"email": config["reply_to_email"]}
+    return payload
+
+
+def deliver_email(to_email: str, to_name: str, subject: str, html_content: str) -> tuple[bool, bool, str | None]:
+    """POST one message to Brevo right now.
+
+    Returns (sent, retryable, error).  Network errors, 429 and 5xx responses
+    are retryable; any other 4xx is a permanent rejection.  Raises
+    EmailAuthError when Brevo refuses the API key (401/403).
+    """
+    config = _brevo_config()
+    if config is None:
+        return False, True, "BREVO_API_KEY or BREVO_SENDER_EMAIL not configured"
+
+    payload = _base_payload(config)
+    payload.update({
+        "to": [{"email": to_email, "name": to_name}],
+        "subject": subject,
+        "htmlContent": html_content,
+    })
+    return _post(config, payload)
+
+
+def deliver_batch(messages: list) -> tuple[bool, bool, str | None]:
+    """POST up to BREVO_BATCH_SIZE messages in one messageVersions request.
+
+    *messages* are objects with to_email, to_name, subject and html_content
+    (e.g. EmailOutbox rows).  The batch succeeds or fails as a whole; the
+    result and EmailAuthError are as for deliver_email().
+    """
+    config = _brevo_config()
+    if config is None:
+        return False, True, "BREVO_API_KEY or BREVO_SENDER_EMAIL not configured"
+    if len(messages) == 1:
+        message = messages[0]
+        return deliver_email(message.to_email, message.to_name, message.subject, message.html_content)
+
+    payload = _base_payload(config)
+    # The top-level subject/body are required defaults; every version overrides both.
+    payload.update({
+        "subject": messages[0].subject,
+        "htmlContent": messages[0].html_content,
+        "messageVersions": [
+            {
+                "to": [{"email": message.to_email, "name": message.to_name}],
+                "subject": message.subject,
+                "htmlContent": message.html_content,
+            }
+            for message in messages
+        ],
+    })
+    return _post(config, payload)
+
+
+def queue_email(to_email: str, to_name: str, subject: str, html_content: str):
+    """Add a message to the outbox in the caller's transaction; returns the EmailOutbox row."""
+    from src.models.main import EmailOutbox, db
+
+    message = EmailOutbox(
+        to_email=to_email,
+        to_name=to_name or "",
+        subject=subject,
+        html_content=html_content,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(message)
+    return message
+
+
+def send_email(
+    to_email: str,
+    to_name: str,
+    subject: str,
+    html_content: str,
+) -> bool:
+    """Queue a transactional email for background delivery and commit.
+
+    Returns True once the message is safely in the outbox.  Use queue_email()
+    instead to enqueue inside a transaction the caller commits.
+    """
+    from src.models.main import db
+
+    queue_email(to_email, to_name, subject, html_content)
+    db.session.commit()
+    return True
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next try after *attempts* failed deliveries."""
+    return min(RETRY_BASE_DELAY * (2 ** max(0, attempts - 1)), RETRY_MAX_DELAY)
+
+
+def _claim(message_ids: list[int], now: datetime) -> tuple[list[int], datetime]:
+    """Lease due rows to this worker.
+
+    Returns the ids it got (others may have been taken) and the lease expiry,
+    which doubles as the token _renew_lease() checks ownership against.
+    """
+    from sqlalchemy import update
+    from src.models.main import EmailOutbox, db
+
+    leased_until = datetime.utcnow() + DISPATCH_LEASE
+    claimed = db.session.execute(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.id.in_(message_ids),
+            EmailOutbox.status == "pending",
+            EmailOutbox.next_attempt_at <= now,
+        )
+        .values(next_attempt_at=leased_until, attempts=EmailOutbox.attempts + 1)
+        .returning(EmailOutbox.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return claimed, leased_until
+
+
+def _renew_lease(message_ids: list[int], leased_until: datetime) -> tuple[set[int], datetime]:
+    """Extend this worker's lease on rows it still holds.
+
+    Returns the ids still held (a row whose lease lapsed and was re-claimed
+    by another worker drops out) and the new lease expiry.
+    """
+    from sqlalchemy import update
+    from src.models.main import EmailOutbox, db
+
+    renewed_until = datetime.utcnow() + DISPATCH_LEASE
+    renewed = db.session.execute(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.id.in_(message_ids),
+            EmailOutbox.status == "pending",
+            EmailOutbox.next_attempt_at == leased_until,
+        )
+        .values(next_attempt_at=renewed_until)
+        .returning(EmailOutbox.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return set(renewed), renewed_until
+
+
+def _release(message_ids: list[int], error: str) -> None:
+    """Hand claimed rows back as due, undoing the attempt their claim counted."""
+    from sqlalchemy import update
+    from src.models.main import EmailOutbox, db
+
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(message_ids), EmailOutbox.status == "pending")
+        .values(next_attempt_at=datetime.utcnow(), attempts=EmailOutbox.attempts - 1, last_error=error[:500])
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def _record_result(message, ok: bool, retryable: bool, error: str | None) -> str:
+    """Apply one delivery outcome to an outbox row; returns "sent", "retried" or "dead"."""
+    if ok:
+        message.status = "sent"
+        message.sent_at = datetime.utcnow()
+        message.last_error = None
+        message.html_content = ""
+        return "sent"
+    if retryable and message.attempts < EMAIL_MAX_ATTEMPTS:
+        message.next_attempt_at = datetime.utcnow() + retry_delay(message.attempts)
+        message.last_error = error[:500]
+        return "retried"
+    message.status = "dead"
+    message.last_error = error[:500]
+    message.html_content = ""
+    print(f"[email] Giving up on outbox message {message.id} to {message.to_email}: {error}", file=sys.stderr)
+    return "dead"
+
+
+def dispatch_outbox(batch_size: int = BREVO_BATCH_SIZE) -> tuple[int, int, int]:
+    """Deliver every due outbox row, *batch_size* per Brevo request.  Returns (sent, retried, dead_lettered).
+
+    Stops early, leaving the remaining rows pending, if Brevo refuses the API key.
+    """
+    from src.models.main import EmailOutbox, db
+
+    if _brevo_config() is None:
+        # Nothing can be delivered; leave attempts untouched until it is configured.
+        return 0, 0, 0
+
+    now = datetime.utcnow()
+    outcomes = {"sent": 0, "retried": 0, "dead": 0}
+    while True:
+        due_ids = [
+            row.id
+            for row in EmailOutbox.query.with_entities(EmailOutbox.id)
+            .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at.asc(), EmailOutbox.id.asc())
+            .limit(batch_size)
+        ]
+        if not due_ids:
+            break
+        claimed_ids, leased_until = _claim(due_ids, now)
+        if not claimed_ids:
+            continue
+        messages = EmailOutbox.query.filter(EmailOutbox.id.in_(claimed_ids)).order_by(EmailOutbox.id.asc()).all()
+
+        try:
+            ok, retryable, error = deliver_batch(messages)
+        except EmailAuthError as exc:
+            _release(claimed_ids, str(exc))
+            print(f"[email] Dispatch stopped, {len(claimed_ids)} message(s) left pending: {exc}", file=sys.stderr)
+            break
+        if not ok and not retryable and len(messages) > 1:
+            # A permanent rejection of the batch may come from one bad
+            # address; resend one by one so only that message is dead-lettered.
+            # That can outlast DISPATCH_LEASE, so the unsent rows' lease is
+            # renewed at half-life and each outcome is committed as it
+            # lands; a row another worker has re-claimed is left to it.
+            unsent_ids = [message.id for message in messages]
+            while unsent_ids:
+                if datetime.utcnow() >= leased_until - DISPATCH_LEASE / 2:
+                    still_held, leased_until = _renew_lease(unsent_ids, leased_until)
+                    unsent_ids = [message_id for message_id in unsent_ids if message_id in still_held]
+                    if not unsent_ids:
+                        break
+                message = db.session.get(EmailOutbox, unsent_ids[0])
+                try:
+                    result = deliver_email(message.to_email, message.to_name, message.subject, message.html_content)
+                except EmailAuthError as exc:
+                    _release(unsent_ids, str(exc))
+                    print(f"[email] Dispatch stopped, {len(unsent_ids)} message(s) left pending: {exc}", file=sys.stderr)
+                    return outcomes["sent"], outcomes["retried"], outcomes["dead"]
+                unsent_ids.pop(0)
+                outcomes[_record_result(message, *result)] += 1
+                db.session.commit()
+        else:
+            for message in messages:
+                outcomes[_record_result(message, ok, retryable, error)] += 1
+        db.session.commit()
+
+    return outcomes["sent"], outcomes["retried"], outcomes["dead"]
+
+
+def purge_sent_email(retention: timedelta = SENT_RETENTION) -> int:
+    """Delete sent outbox rows older than *retention*; returns rows deleted."""
+    from src.models.main import EmailOutbox, db
+
+    deleted = EmailOutbox.query.filter(
+        EmailOutbox.status == "sent",
+        EmailOutbox.sent_at < datetime.utcnow() - retention,
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
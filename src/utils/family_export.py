@@ -0,0 +1,152 @@
+"""
+Streaming export of a family's coin ledger, chore history and purchases.
+
+Rows are read with ``yield_per`` / ``stream_results`` (a server-side cursor on
+Postgres) and selected as plain columns, so neither the ORM identity map nor
+the output grows with the size of the history.  Transactions and chores
+include archived rows (src/utils/archive.py).  Both the download endpoint
+and ``manage.py export-family`` consume the same generators, so a multi-year
+export runs in constant memory.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_DATASETS = ("transactions", "chores", "purchases")
+FETCH_BATCH_SIZE = 1000
+
+# Spreadsheets evaluate a cell starting with one of these as a formula, so
+# free-text CSV cells (reasons, names, notes) that do are prefixed with "'".
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _dataset_query(dataset: str, family_id: int):
+    from sqlalchemy import select
+    from src.models.main import Chore, Kid, StoreItem, StoreRedemption
+    from src.utils.archive import chore_submissions_union, coin_transactions_union
+
+    if dataset == "transactions":
+        CoinTransaction = coin_transactions_union()
+        return (
+            select(
+                CoinTransaction.id,
+                CoinTransaction.created_at,
+                CoinTransaction.kid_id,
+                Kid.display_name.label("kid_name"),
+                CoinTransaction.kind,
+                CoinTransaction.amount,
+                CoinTransaction.reason,
+                CoinTransaction.ref_type,
+                CoinTransaction.ref_id,
+                CoinTransaction.created_by_parent_id,
+                CoinTransaction.approved_at,
+            )
+            .outerjoin(Kid, Kid.id == CoinTransaction.kid_id)
+            .where(CoinTransaction.family_id == family_id)
+            .order_by(CoinTransaction.created_at.asc(), CoinTransaction.id.asc())
+        )
+    if dataset == "chores":
+        ChoreSubmission = chore_submissions_union()
+        return (
+            select(
+                ChoreSubmission.id,
+                ChoreSubmission.claimed_at,
+                ChoreSubmission.submitted_at,
+                ChoreSubmission.resolved_at,
+                ChoreSubmission.status,
+                ChoreSubmission.chore_id,
+                Chore.name.label("chore_name"),
+                ChoreSubmission.kid_id,
+                Kid.display_name.label("kid_name"),
+                ChoreSubmission.awarded_coin_amount,
+                ChoreSubmission.awarded_point_amount,
+                ChoreSubmission.resolution_note,
+            )
+            .outerjoin(Chore, Chore.id == ChoreSubmission.chore_id)
+            .outerjoin(Kid, Kid.id == ChoreSubmission.kid_id)
+            .where(ChoreSubmission.family_id == family_id)
+            .order_by(ChoreSubmission.claimed_at.asc(), ChoreSubmission.id.asc())
+        )
+    if dataset == "purchases":
+        return (
+            select(
+                StoreRedemption.id,
+                StoreRedemption.requested_at,
+                StoreRedemption.resolved_at,
+                StoreRedemption.status,
+                StoreRedemption.store_item_id,
+                StoreItem.name.label("item_name"),
+                StoreItem.item_scope,
+                StoreRedemption.requested_by_kid_id.label("kid_id"),
+                Kid.display_name.label("kid_name"),
+                StoreRedemption.notes,
+            )
+            .outerjoin(StoreItem, StoreItem.id == StoreRedemption.store_item_id)
+            .outerjoin(Kid, Kid.id == StoreRedemption.requested_by_kid_id)
+            .where(StoreRedemption.family_id == family_id)
+            .order_by(StoreRedemption.requested_at.asc(), StoreRedemption.id.asc())
+        )
+    raise ValueError(f"Unknown export dataset: {dataset}")
+
+
+def dataset_columns(dataset: str) -> list[str]:
+    return [column.name for column in _dataset_query(dataset, 0).selected_columns]
+
+
+def iter_dataset_rows(dataset: str, family_id: int):
+    """Yield one dict per row, fetched FETCH_BATCH_SIZE rows at a time."""
+    from src.models.main import db
+
+    statement = _dataset_query(dataset, family_id).execution_options(yield_per=FETCH_BATCH_SIZE)
+    result = db.session.execute(statement)
+    try:
+        for row in result.mappings():
+            yield dict(row)
+    finally:
+        result.close()
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    value = _json_value(value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(dataset: str, family_id: int):
+    """Yield CSV text for one dataset: a header line, then batches of rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=dataset_columns(dataset))
+    writer.writeheader()
+    for count, row in enumerate(iter_dataset_rows(dataset, family_id), start=1):
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        if count % FETCH_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(datasets, family_id: int):
+    """Yield one JSON object per line, each tagged with its dataset."""
+    lines = []
+    for dataset in datasets:
+        for row in iter_dataset_rows(dataset, family_id):
+            row = {key: _json_value(value) for key, value in row.items()}
+            lines.append(json.dumps({"dataset": dataset, **row}, separators=(",", ":")))
+            if len(lines) >= FETCH_BATCH_SIZE:
+                yield "\n".join(lines) + "\n"
+                lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,234 @@
+"""
+Per-kid daily activity rollups (kid_daily_stats).
+
+Ledger postings, chore approvals and closed timed-session turns add their
+deltas to the kid's row for that day with an atomic upsert, in the same
+transaction as the change itself.  Charts then read a date range of rollup
+rows instead of scanning ChoreSubmission, CoinTransaction and session history.
+
+rebuild_kid_daily_stats() recomputes rows from raw history one day at a time;
+it backs ``manage.py backfill-kid-stats``.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+
+STAT_COLUMNS = ("coins_earned", "coins_spent", "chores_approved", "session_seconds")
+
+# Ledger kinds that count towards coins_earned / coins_spent.  Reversals of the
+# same kind net out (a timed-session refund lowers coins_spent); fines, cash-outs
+# and other adjustments are neither earning nor spending.
+EARNING_KINDS = ("chore_reward", "task_reward", "challenge_reward", "manual_add")
+SPENDING_KINDS = ("store_purchase", "timed_session")
+
+
+def ledger_deltas(kind: str, amount: int) -> dict:
+    """Rollup deltas for one ledger posting of *amount* coins."""
+    if kind in EARNING_KINDS:
+        return {"coins_earned": amount}
+    if kind in SPENDING_KINDS:
+        return {"coins_spent": -amount}
+    return {}
+
+
+def _upsert(rows: list[dict]):
+    """Return an INSERT ... ON CONFLICT (kid_id, day) DO UPDATE that adds to existing counts."""
+    from src.models.main import KidDailyStat, db
+
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(KidDailyStat).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[KidDailyStat.kid_id, KidDailyStat.day],
+        set_={column: getattr(KidDailyStat, column) + getattr(statement.excluded, column) for column in STAT_COLUMNS},
+    )
+
+
+def record_activity(entries) -> None:
+    """Add activity to the rollup.
+
+    *entries* is an iterable of (kid_id, family_id, day, {column: delta}).
+    Entries for the same kid and day are merged, then applied in one upsert.
+    """
+    from src.models.main import db
+
+    merged: dict[tuple[int, date], dict] = {}
+    for kid_id, family_id, day, deltas in entries:
+        if not kid_id:
+            continue
+        if isinstance(day, datetime):
+            day = day.date()
+        row = merged.setdefault((kid_id, day), {
+            "kid_id": kid_id,
+            "family_id": family_id,
+            "day": day,
+            **{column: 0 for column in STAT_COLUMNS},
+        })
+        for column, delta in deltas.items():
+            row[column] += delta
+
+    rows = [row for row in merged.values() if any(row[column] for column in STAT_COLUMNS)]
+    if rows:
+        db.session.execute(_upsert(rows))
+
+
+def rebuild_kid_daily_stats(start: date | None = None, end: date | None = None) -> int:
+    """Recompute rollup rows from raw (hot and archived) history.  Returns rows written.
+
+    Days are rebuilt one per transaction with kid_daily_stats write-locked, so a
+    live upsert for that day waits and then adds on top of the rebuilt row
+    instead of being lost.  *start* and *end* (inclusive) limit the days rebuilt;
+    by default every day with history or an existing rollup row is.
+    """
+    from src.models.main import db
+
+    days = sorted(day for day in _history_days() if (start is None or day >= start) and (end is None or day <= end))
+    written = 0
+    for day in days:
+        try:
+            written += _rebuild_day(day)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return written
+
+
+def _to_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _history_days() -> set[date]:
+    from sqlalchemy import func
+    from src.models.main import KidDailyStat, StoreSessionTurn, db
+    from src.utils.archive import chore_submissions_union, coin_transactions_union
+
+    CoinTransaction = coin_transactions_union()
+    ChoreSubmission = chore_submissions_union()
+    queries = (
+        db.session.query(func.date(CoinTransaction.created_at)),
+        db.session.query(func.date(func.coalesce(ChoreSubmission.resolved_at, ChoreSubmission.claimed_at)))
+        .filter(ChoreSubmission.status.in_(["approved", "archived"])),
+        db.session.query(func.date(StoreSessionTurn.ended_at)).filter(StoreSessionTurn.ended_at.isnot(None)),
+        db.session.query(KidDailyStat.day),
+    )
+    return {_to_date(day) for query in queries for (day,) in query.distinct() if day is not None}
+
+
+def _rebuild_day(day: date) -> int:
+    """Replace one day's rollup rows with totals from raw history (caller commits)."""
+    from sqlalchemy import case, func, text
+    from src.models.main import KidDailyStat, StoreSessionParticipant, StoreSessionTurn, db
+    from src.utils.archive import chore_submissions_union, coin_transactions_union
+
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("LOCK TABLE kid_daily_stats IN EXCLUSIVE MODE"))
+    # On SQLite this DELETE takes the database write lock for the rest of the transaction.
+    KidDailyStat.query.filter(KidDailyStat.day == day).delete(synchronize_session=False)
+
+    day_start = datetime.combine(day, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+    CoinTransaction = coin_transactions_union()
+    ChoreSubmission = chore_submissions_union()
+    totals: dict[int, dict] = {}
+
+    def add(kid_id, family_id, column, value):
+        if not kid_id or not value:
+            return
+        row = totals.setdefault(kid_id, {
+            "kid_id": kid_id,
+            "family_id": family_id,
+            "day": day,
+            **{name: 0 for name in STAT_COLUMNS},
+        })
+        row[column] += int(value)
+
+    for kid_id, family_id, earned, spent in (
+        db.session.query(
+            CoinTransaction.kid_id,
+            CoinTransaction.family_id,
+            func.sum(case((CoinTransaction.kind.in_(EARNING_KINDS), CoinTransaction.amount), else_=0)),
+            func.sum(case((CoinTransaction.kind.in_(SPENDING_KINDS), -CoinTransaction.amount), else_=0)),
+        )
+        .filter(CoinTransaction.created_at >= day_start, CoinTransaction.created_at < day_end)
+        .group_by(CoinTransaction.kid_id, CoinTransaction.family_id)
+    ):
+        add(kid_id, family_id, "coins_earned", earned)
+        add(kid_id, family_id, "coins_spent", spent)
+
+    chore_at = func.coalesce(ChoreSubmission.resolved_at, ChoreSubmission.claimed_at)
+    for kid_id, family_id, approved in (
+        db.session.query(ChoreSubmission.kid_id, ChoreSubmission.family_id, func.count(ChoreSubmission.id))
+        .filter(ChoreSubmission.status.in_(["approved", "archived"]), chore_at >= day_start, chore_at < day_end)
+        .group_by(ChoreSubmission.kid_id, ChoreSubmission.family_id)
+    ):
+        add(kid_id, family_id, "chores_approved", approved)
+
+    for kid_id, family_id, seconds in (
+        db.session.query(
+            StoreSessionParticipant.kid_id,
+            StoreSessionTurn.family_id,
+            func.sum(StoreSessionTurn.elapsed_seconds),
+        )
+        .join(StoreSessionParticipant, StoreSessionParticipant.id == StoreSessionTurn.participant_id)
+        .filter(
+            StoreSessionTurn.ended_at >= day_start,
+            StoreSessionTurn.ended_at < day_end,
+            StoreSessionParticipant.kid_id.isnot(None),
+        )
+        .group_by(StoreSessionParticipant.kid_id, StoreSessionTurn.family_id)
+    ):
+        add(kid_id, family_id, "session_seconds", seconds)
+
+    rows = list(totals.values())
+    if rows:
+        db.session.execute(KidDailyStat.__table__.insert(), rows)
+    return len(rows)
+
+
+def chart_series(family_id: int, period: str, buckets: int, kid_id: int | None = None) -> list[dict]:
+    """Weekly or monthly totals for the last *buckets* periods, from one range read."""
+    from src.models.main import KidDailyStat
+
+    today = datetime.utcnow().date()
+    if period == "month":
+        starts = []
+        year, month = today.year, today.month
+        for _ in range(buckets):
+            starts.append(date(year, month, 1))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        starts.reverse()
+    else:
+        this_week = today - timedelta(days=today.weekday())
+        starts = [this_week - timedelta(weeks=offset) for offset in range(buckets - 1, -1, -1)]
+
+    query = KidDailyStat.query.filter(
+        KidDailyStat.family_id == family_id,
+        KidDailyStat.day >= starts[0],
+        KidDailyStat.day <= today,
+    )
+    if kid_id:
+        query = query.filter(KidDailyStat.kid_id == kid_id)
+
+    series = [
+        {"start": start.isoformat(), **{column: 0 for column in STAT_COLUMNS}}
+        for start in starts
+    ]
+    for stat in query.all():
+        index = _bucket_index(starts, stat.day)
+        for column in STAT_COLUMNS:
+            series[index][column] += getattr(stat, column) or 0
+    for bucket in series:
+        bucket["session_minutes"] = bucket.pop("session_seconds") // 60
+    return series
+
+
+def _bucket_index(starts: list[date], day: date) -> int:
+    for index in range(len(starts) - 1, -1, -1):
+        if day >= starts[index]:
+            return index
+    return 0
@@ -0,0 +1,280 @@
+"""
+Coin ledger: the only place that changes Kid.coin_balance.
+
+Every posting appends a CoinTransaction and applies
+``coin_balance = coin_balance + :delta`` in the database, in one UPDATE for all
+kids touched by the posting.  Debits are guarded by a balance floor in the
+same statement's WHERE clause, so two concurrent requests can never both
+spend the same coins, and no update is lost to a stale in-memory balance.
+Each posting is also added to the kids' kid_daily_stats rollup rows, and
+manual rewards and fines drop an item in the kid's notification inbox.
+
+The caller still owns the transaction: nothing here commits.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+@dataclass
+class LedgerLeg:
+    """One line of a posting: move *amount* coins (negative = debit) for *kid*."""
+
+    kid: object
+    amount: int
+    kind: str
+    reason: str | None = None
+    ref_type: str | None = None
+    ref_id: int | None = None
+    parent_id: int | None = None
+    family_id: int | None = None
+    created_at: datetime | None = None
+    approved_at: datetime | None = None
+
+
+class InsufficientCoinsError(ValueError):
+    """A debit would take one or more kids below the balance floor."""
+
+    def __init__(self, kid_ids: list[int]):
+        self.kid_ids = kid_ids
+        super().__init__(f"Insufficient coins for kid(s) {', '.join(str(kid_id) for kid_id in kid_ids)}")
+
+
+def post(
+    kid,
+    amount: int,
+    kind: str,
+    *,
+    reason: str | None = None,
+    ref_type: str | None = None,
+    ref_id: int | None = None,
+    parent_id: int | None = None,
+    family_id: int | None = None,
+    floor: int | None = 0,
+):
+    """Post a single leg; returns the new CoinTransaction.  See post_many()."""
+    leg = LedgerLeg(
+        kid=kid,
+        amount=amount,
+        kind=kind,
+        reason=reason,
+        ref_type=ref_type,
+        ref_id=ref_id,
+        parent_id=parent_id,
+        family_id=family_id,
+    )
+    return post_many([leg], floor=floor)[0]
+
+
+def post_many(legs: list[LedgerLeg], floor: int | None = 0) -> list:
+    """Apply every leg in one balance UPDATE and append one CoinTransaction per leg.
+
+    Kids whose net delta is negative must end at or above *floor* (pass
+    ``floor=None`` for postings such as fines that may go negative); if any
+    kid would not, nothing is applied and InsufficientCoinsError is raised.
+    Loaded Kid instances get their new balance without an extra SELECT.
+    """
+    from sqlalchemy import and_, case, or_, update
+    from sqlalchemy.orm.attributes import set_committed_value
+    from src.models.main import CoinTransaction, Kid, db
+    from src.utils.kid_stats import ledger_deltas, record_activity
+    from src.utils.notifications import notify_ledger_posting
+
+    deltas: dict[int, int] = {}
+    kids_by_id: dict[int, object] = {}
+    for leg in legs:
+        if leg.amount:
+            deltas[leg.kid.id] = deltas.get(leg.kid.id, 0) + leg.amount
+            kids_by_id[leg.kid.id] = leg.kid
+
+    rows = []
+    if deltas:
+        conditions = []
+        for kid_id, delta in deltas.items():
+            if floor is not None and delta < 0:
+                conditions.append(and_(Kid.id == kid_id, Kid.coin_balance + delta >= floor))
+            else:
+                conditions.append(Kid.id == kid_id)
+
+        delta_expr = case(deltas, value=Kid.id, else_=0) if len(deltas) > 1 else next(iter(deltas.values()))
+        statement = (
+            update(Kid)
+            .where(or_(*conditions))
+            .values(coin_balance=Kid.coin_balance + delta_expr)
+            .returning(Kid.id, Kid.coin_balance)
+            .execution_options(synchronize_session=False)
+        )
+
+        if len(deltas) == 1:
+            # A single-row conditional UPDATE either applies fully or not at all.
+            rows = db.session.execute(statement).all()
+            if not rows:
+                raise InsufficientCoinsError(list(deltas))
+        else:
+            # Several kids: roll the partial update back if any floor check failed.
+            with db.session.begin_nested():
+                rows = db.session.execute(statement).all()
+                if len(rows) != len(deltas):
+                    raise InsufficientCoinsError(sorted(set(deltas) - {row[0] for row in rows}))
+
+    for kid_id, balance in rows:
+        set_committed_value(kids_by_id[kid_id], "coin_balance", balance)
+
+    transactions = [
+        CoinTransaction(
+            kid_id=leg.kid.id,
+            family_id=leg.family_id or leg.kid.family_id,
+            amount=leg.amount,
+            kind=leg.kind,
+            reason=leg.reason,
+            ref_type=leg.ref_type,
+            ref_id=leg.ref_id,
+            created_by_parent_id=leg.parent_id,
+            created_at=leg.created_at or datetime.utcnow(),
+            approved_at=leg.approved_at,
+        )
+        for leg in legs
+    ]
+    db.session.add_all(transactions)
+    record_activity(
+        (tx.kid_id, tx.family_id, tx.created_at, ledger_deltas(tx.kind, tx.amount))
+        for tx in transactions
+    )
+    for tx in transactions:
+        notify_ledger_posting(tx)
+    return transactions
+
+
+# A reconciliation run only folds in transactions that already existed when an
+# earlier run (at least this long ago) began: a posting whose DB transaction is
+# still open may hold a lower id than one already committed, and must never
+# end up behind a checkpoint it was not counted in.
+CHECKPOINT_SETTLE_WINDOW = timedelta(minutes=5)
+
+
+def reconcile_balances(batch_size: int = 500) -> tuple[int, int]:
+    """Verify every kid's coin_balance against checkpoint + newer ledger rows.
+
+    Kids without a checkpoint are seeded from their current balance.  For the
+    rest, expected = last checkpoint + transactions since; any difference is
+    logged and stored as drift on a new checkpoint.  A checkpoint is also
+    written whenever settled transactions exist past the last one, so work
+    per kid stays proportional to recent activity.  Every run is recorded in
+    ledger_reconcile_runs, whose watermarks later runs settle up to.
+    Returns (kids_checked, kids_drifted).
+    """
+    from flask import current_app
+    from sqlalchemy import func, select
+    from src.models.main import CoinBalanceCheckpoint, CoinTransaction, Kid, LedgerReconcileRun, db
+
+    settled_before = datetime.utcnow() - CHECKPOINT_SETTLE_WINDOW
+    observed_max_id = db.session.execute(select(func.max(CoinTransaction.id))).scalar() or 0
+    cutoff_id = max(
+        db.session.execute(
+            select(func.max(LedgerReconcileRun.observed_max_tx_id))
+            .where(LedgerReconcileRun.started_at < settled_before)
+        ).scalar() or 0,
+        # Databases reconciled before runs were recorded carry the watermark on checkpoints.
+        db.session.execute(
+            select(func.max(CoinBalanceCheckpoint.observed_max_tx_id))
+            .where(CoinBalanceCheckpoint.created_at < settled_before)
+        ).scalar() or 0,
+    )
+    run = LedgerReconcileRun(observed_max_tx_id=observed_max_id, started_at=datetime.utcnow())
+    db.session.add(run)
+    db.session.commit()
+
+    latest_ids = (
+        select(func.max(CoinBalanceCheckpoint.id).label("id"))
+        .group_by(CoinBalanceCheckpoint.kid_id)
+        .subquery()
+    )
+    checkpoint = (
+        select(
+            CoinBalanceCheckpoint.kid_id,
+            CoinBalanceCheckpoint.as_of_tx_id,
+            CoinBalanceCheckpoint.balance,
+            CoinBalanceCheckpoint.drift,
+        )
+        .join(latest_ids, latest_ids.c.id == CoinBalanceCheckpoint.id)
+        .subquery()
+    )
+    as_of = func.coalesce(checkpoint.c.as_of_tx_id, cutoff_id)
+
+    def ledger_aggregate(aggregate, *conditions):
+        return (
+            select(aggregate)
+            .where(CoinTransaction.kid_id == Kid.id, *conditions)
+            .correlate(Kid, checkpoint)
+            .scalar_subquery()
+        )
+
+    # Balance and the sums come from one statement, i.e. one consistent snapshot.
+    settled = (CoinTransaction.id > as_of, CoinTransaction.id <= cutoff_id)
+    settled_delta = ledger_aggregate(func.coalesce(func.sum(CoinTransaction.amount), 0), *settled)
+    settled_count = ledger_aggregate(func.count(CoinTransaction.id), *settled)
+    recent_delta = ledger_aggregate(
+        func.coalesce(func.sum(CoinTransaction.amount), 0),
+        CoinTransaction.id > as_of,
+        CoinTransaction.id > cutoff_id,
+    )
+
+    checked = 0
+    drifted = 0
+    last_kid_id = 0
+    while True:
+        rows = db.session.execute(
+            select(
+                Kid.id,
+                Kid.coin_balance,
+                checkpoint.c.as_of_tx_id,
+                checkpoint.c.balance,
+                checkpoint.c.drift,
+                settled_delta.label("settled_delta"),
+                settled_count.label("settled_count"),
+                recent_delta.label("recent_delta"),
+            )
+            .outerjoin(checkpoint, checkpoint.c.kid_id == Kid.id)
+            .where(Kid.id > last_kid_id)
+            .order_by(Kid.id.asc())
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_kid_id = rows[-1].id
+
+        for kid_id, coin_balance, as_of_tx_id, checkpoint_balance, last_drift, settled, settled_rows, recent in rows:
+            checked += 1
+            if as_of_tx_id is None:
+                db.session.add(CoinBalanceCheckpoint(
+                    kid_id=kid_id,
+                    as_of_tx_id=cutoff_id,
+                    balance=coin_balance - recent,
+                    observed_max_tx_id=observed_max_id,
+                ))
+                continue
+
+            drift = coin_balance - (checkpoint_balance + settled + recent)
+            if drift:
+                drifted += 1
+                current_app.logger.warning(
+                    "Coin balance drift for kid %s: balance %s, ledger %s (drift %+d).",
+                    kid_id, coin_balance, coin_balance - drift, drift,
+                )
+            # Advance past settled rows even when they net to zero, so the
+            # next run (and archival, which stops at as_of_tx_id) moves on.
+            if settled_rows or drift != last_drift:
+                db.session.add(CoinBalanceCheckpoint(
+                    kid_id=kid_id,
+                    as_of_tx_id=max(as_of_tx_id, cutoff_id),
+                    balance=checkpoint_balance + settled,
+                    drift=drift,
+                    observed_max_tx_id=observed_max_id,
+                ))
+        db.session.commit()
+
+    run.kids_checked = checked
+    run.kids_drifted = drifted
+    db.session.commit()
+    return checked, drifted
@@ -0,0 +1,96 @@
+"""
+Per-kid notification inbox (kid_notifications).
+
+Producers call notify() inside their own transaction; nothing here commits
+except mark_read().  Unread rows are covered by a partial index, so the
+badge count and the bulk mark-read stay cheap however long the inbox gets.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+
+INBOX_PAGE_SIZE = 50
+
+# Ledger kinds that always reach the kid's inbox, with (notification kind, level).
+LEDGER_NOTIFY_KINDS = {
+    "manual_add": ("coins_added", "success"),
+    "fine": ("fine", "error"),
+}
+
+
+def notify(
+    kid_id: int,
+    family_id: int,
+    kind: str,
+    message: str,
+    *,
+    level: str = "info",
+    ref_type: str | None = None,
+    ref_id: int | None = None,
+) -> None:
+    from src.models.main import KidNotification, db
+
+    if not kid_id:
+        return
+    db.session.add(KidNotification(
+        kid_id=kid_id,
+        family_id=family_id,
+        kind=kind,
+        message=message[:255],
+        level=level,
+        ref_type=ref_type,
+        ref_id=ref_id,
+    ))
+
+
+def notify_ledger_posting(tx) -> None:
+    """Inbox item for a coin transaction of one of LEDGER_NOTIFY_KINDS."""
+    if tx.kind not in LEDGER_NOTIFY_KINDS or not tx.amount:
+        return
+    kind, level = LEDGER_NOTIFY_KINDS[tx.kind]
+    if tx.amount > 0:
+        message = f"🏆 You earned {tx.amount} coins! {tx.reason or ''}"
+    else:
+        message = f"⚠️ You lost {abs(tx.amount)} coins. {tx.reason or ''}"
+    notify(tx.kid_id, tx.family_id, kind, message.strip(), level=level)
+
+
+def unread_count(kid_id: int) -> int:
+    from src.models.main import KidNotification
+
+    return KidNotification.query.filter(KidNotification.kid_id == kid_id, KidNotification.read_at.is_(None)).count()
+
+
+def unread(kid_id: int, limit: int = INBOX_PAGE_SIZE) -> list:
+    from src.models.main import KidNotification
+
+    return (
+        KidNotification.query.filter(KidNotification.kid_id == kid_id, KidNotification.read_at.is_(None))
+        .order_by(KidNotification.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def recent(kid_id: int, limit: int = INBOX_PAGE_SIZE) -> list:
+    from src.models.main import KidNotification
+
+    return (
+        KidNotification.query.filter(KidNotification.kid_id == kid_id)
+        .order_by(KidNotification.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def mark_read(kid_id: int, up_to_id: int | None = None) -> int:
+    """Mark the kid's unread items (optionally only those <= up_to_id) read in one UPDATE and commit."""
+    from src.models.main import KidNotification, db
+
+    query = KidNotification.query.filter(KidNotification.kid_id == kid_id, KidNotification.read_at.is_(None))
+    if up_to_id is not None:
+        query = query.filter(KidNotification.id <= up_to_id)
+    updated = query.update({KidNotification.read_at: datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return updated
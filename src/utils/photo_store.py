@@ -0,0 +1,278 @@
+"""
+Content-addressed storage for uploaded proof photos.
+
+Every upload is hashed (SHA-256) and written once to
+instance/uploads/blobs/<aa>/<sha256><ext>; identical re-uploads resolve to the
+same PhotoBlob row and file.  Rows that display a photo (chore submissions,
+task claims, challenge submissions) keep storing the relative path in their
+own column and register a PhotoBlobRef so gc_orphan_photos() can reclaim
+blobs nothing points at any more.
+
+Photos saved before the blob store existed (uploads/chore_photos etc.) are
+left alone and still served from their legacy folders.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import secrets
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+
+BLOB_PREFIX = "blobs/"
+# blobs/<aa>/<sha256><ext>, where <aa> is the first two hex digits of the hash.
+_BLOB_PATH_RE = re.compile(r"blobs/(?P<shard>[0-9a-f]{2})/(?P<filename>(?P=shard)[0-9a-f]{62}(?:\.[a-z0-9]+)?)")
+_CHUNK_SIZE = 64 * 1024
+
+# Blobs touched more recently than this are never collected, so an upload whose
+# owning row has not been committed yet cannot be swept out from under it.
+GC_GRACE_PERIOD = timedelta(hours=1)
+
+
+def _uploads_root() -> str:
+    return os.path.join(current_app.instance_path, "uploads")
+
+
+def is_blob_path(path: str | None) -> bool:
+    return bool(path) and path.startswith(BLOB_PREFIX)
+
+
+def store_photo(file_storage, extension: str) -> str:
+    """Hash and persist an upload, returning its blob-relative path.
+
+    The caller is responsible for committing the session and for linking the
+    returned path to its owner with link_photo().
+    """
+    from sqlalchemy.exc import IntegrityError
+    from src.models.main import PhotoBlob, db
+
+    blob_root = os.path.join(_uploads_root(), "blobs")
+    os.makedirs(blob_root, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(blob_root, f".upload-{secrets.token_hex(8)}")
+    try:
+        with open(tmp_path, "wb") as out:
+            stream = file_storage.stream
+            while True:
+                chunk = stream.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        sha = digest.hexdigest()
+
+        now = datetime.utcnow()
+        # Touch the row with an UPDATE rather than read-then-write: it waits
+        # for (and then sees) a concurrent gc_orphan_photos() delete, so a
+        # collected blob is re-created below instead of being left half gone.
+        touched = PhotoBlob.query.filter_by(sha256=sha).update(
+            {PhotoBlob.last_uploaded_at: now}, synchronize_session=False
+        )
+        blob = PhotoBlob.query.filter_by(sha256=sha).populate_existing().first() if touched else None
+        if blob is None:
+            try:
+                with db.session.begin_nested():
+                    blob = PhotoBlob(sha256=sha, extension=extension, size_bytes=size, created_at=now, last_uploaded_at=now)
+                    db.session.add(blob)
+            except IntegrityError:
+                # A concurrent upload of the same bytes won the insert.
+                blob = PhotoBlob.query.filter_by(sha256=sha).first()
+                blob.last_uploaded_at = now
+
+        # The first upload's extension names the file; later duplicates reuse it.
+        final_path = os.path.join(_uploads_root(), blob.relative_path)
+        if os.path.exists(final_path):
+            # Fresh mtime: sweep_untracked_blob_files() must not take a file
+            # whose row this upload is about to commit.
+            os.utime(final_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return blob.relative_path
+
+
+def link_photo(path: str | None, ref_type: str, ref_id: int, slot: str = "photo") -> None:
+    """Point (ref_type, ref_id, slot) at the blob behind *path*, replacing any previous ref."""
+    from src.models.main import PhotoBlob, PhotoBlobRef, db
+
+    existing = PhotoBlobRef.query.filter_by(ref_type=ref_type, ref_id=ref_id, slot=slot).first()
+    if not is_blob_path(path):
+        if existing is not None:
+            db.session.delete(existing)
+        return
+
+    sha = os.path.splitext(os.path.basename(path))[0]
+    blob = PhotoBlob.query.filter_by(sha256=sha).first()
+    if blob is None:
+        return
+    if existing is None:
+        db.session.add(PhotoBlobRef(blob_id=blob.id, ref_type=ref_type, ref_id=ref_id, slot=slot))
+    else:
+        existing.blob_id = blob.id
+
+
+def release_photo_refs(ref_type: str, ref_ids) -> int:
+    """Drop every ref held by the given owners; blobs become eligible for GC."""
+    from src.models.main import PhotoBlobRef
+
+    ref_ids = [int(ref_id) for ref_id in ref_ids]
+    if not ref_ids:
+        return 0
+    return PhotoBlobRef.query.filter(
+        PhotoBlobRef.ref_type == ref_type,
+        PhotoBlobRef.ref_id.in_(ref_ids),
+    ).delete(synchronize_session=False)
+
+
+def resolve_photo(path: str, legacy_folder: str) -> tuple[str, str] | None:
+    """Return (directory, filename) suitable for send_from_directory().
+
+    Blob paths must have the exact blobs/<aa>/<sha256><ext> shape and resolve
+    inside their shard directory; anything else returns None.
+    """
+    if is_blob_path(path):
+        match = _BLOB_PATH_RE.fullmatch(path)
+        if match is None:
+            return None
+        return os.path.join(_uploads_root(), "blobs", match["shard"]), match["filename"]
+    return os.path.join(_uploads_root(), legacy_folder), os.path.basename(path)
+
+
+def _owner_models() -> dict:
+    from src.models.main import ChallengeSubmission, ChoreSubmission, ChoreSubmissionArchive, TaskClaim
+
+    return {
+        "chore_submission": (ChoreSubmission, ChoreSubmissionArchive),
+        "task_claim": (TaskClaim,),
+        "challenge_submission": (ChallengeSubmission,),
+    }
+
+
+def prune_dangling_refs() -> int:
+    """Delete refs whose owning row no longer exists (e.g. removed by a cascade)."""
+    from sqlalchemy import or_
+    from src.models.main import PhotoBlobRef, db
+
+    removed = 0
+    for ref_type, models in _owner_models().items():
+        owner_exists = or_(*[
+            db.session.query(model.id).filter(model.id == PhotoBlobRef.ref_id).exists()
+            for model in models
+        ])
+        removed += PhotoBlobRef.query.filter(
+            PhotoBlobRef.ref_type == ref_type,
+            ~owner_exists,
+        ).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+def sweep_untracked_blob_files() -> tuple[int, int]:
+    """Remove blob files with no PhotoBlob row.  Returns (files_deleted, bytes_freed).
+
+    store_photo() writes the file before its row commits, so a request that
+    fails or rolls back afterwards leaves a file nothing tracks.  Only files
+    untouched for GC_GRACE_PERIOD are considered, which keeps uploads still
+    in flight safe.
+    """
+    from src.models.main import PhotoBlob, db
+
+    blob_root = os.path.join(_uploads_root(), "blobs")
+    if not os.path.isdir(blob_root):
+        return 0, 0
+
+    cutoff = time.time() - GC_GRACE_PERIOD.total_seconds()
+    deleted = 0
+    freed = 0
+    for shard in sorted(os.listdir(blob_root)):
+        shard_dir = os.path.join(blob_root, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        candidates = {}
+        for filename in os.listdir(shard_dir):
+            if _BLOB_PATH_RE.fullmatch(f"blobs/{shard}/{filename}") is None:
+                continue
+            path = os.path.join(shard_dir, filename)
+            stat = os.stat(path)
+            if stat.st_mtime < cutoff:
+                candidates[os.path.splitext(filename)[0]] = (path, stat.st_size)
+        if not candidates:
+            continue
+        tracked = {
+            sha for (sha,) in db.session.query(PhotoBlob.sha256).filter(PhotoBlob.sha256.in_(list(candidates)))
+        }
+        for sha, (path, size) in candidates.items():
+            if sha in tracked:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            deleted += 1
+            freed += size
+    db.session.commit()
+    return deleted, freed
+
+
+def gc_orphan_photos(batch_size: int = 500) -> tuple[int, int]:
+    """Delete unreferenced blobs in batches.  Returns (blobs_deleted, bytes_freed).
+
+    Each blob is removed with a DELETE that re-checks the grace period and the
+    refs in the same statement, so a blob re-uploaded or linked since the
+    batch was read is kept.  The file goes before the commit, while the row
+    is still locked against a concurrent store_photo().  Files left without
+    a row are then swept by sweep_untracked_blob_files().
+    """
+    from sqlalchemy import delete
+    from src.models.main import PhotoBlob, PhotoBlobRef, db
+
+    prune_dangling_refs()
+
+    cutoff = datetime.utcnow() - GC_GRACE_PERIOD
+    deleted = 0
+    freed = 0
+    last_id = 0
+    has_ref = db.session.query(PhotoBlobRef.id).filter(PhotoBlobRef.blob_id == PhotoBlob.id).exists()
+    while True:
+        batch = (
+            PhotoBlob.query
+            .filter(PhotoBlob.id > last_id, PhotoBlob.last_uploaded_at < cutoff, ~has_ref)
+            .order_by(PhotoBlob.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        for blob in batch:
+            relative_path = blob.relative_path
+            claimed = db.session.execute(
+                delete(PhotoBlob)
+                .where(PhotoBlob.id == blob.id, PhotoBlob.last_uploaded_at < cutoff, ~has_ref)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not claimed:
+                continue
+            absolute_path = os.path.join(_uploads_root(), relative_path)
+            try:
+                freed += os.path.getsize(absolute_path)
+                os.remove(absolute_path)
+            except FileNotFoundError:
+                pass
+            deleted += 1
+        db.session.commit()
+
+    swept, swept_bytes = sweep_untracked_blob_files()
+    return deleted + swept, freed + swept_bytes
@@ -0,0 +1,81 @@
+"""
+In-process event bus for timed store session updates.
+
+Request handlers (and the background scheduler) publish a small JSON payload
+per family whenever a timed session changes — started, turn switched, minute
+charged, out of coins, ended or cancelled.  The kid store page subscribes via
+Server-Sent Events (/kid/store/sessions/stream) for instant updates.
+
+Subscribers live in this process only: an event published by another
+gunicorn worker (or by the scheduler in a different process) never reaches
+them.  The store page therefore keeps polling the status endpoint as a
+heartbeat even while its stream is open, slowly when connected and every few
+seconds when not, so a missed or dropped event only delays an update.  Each
+open stream pins a gthread thread, so at most MAX_STREAMS are served per
+process; further stream requests are refused and those pages simply poll.
+Publish after the database commit so listeners never see state that could
+still be rolled back.
+"""
+from __future__ import annotations
+
+import os
+import json
+import queue
+import threading
+
+
+# A slow or stalled client must never block publishers; once its buffer is
+# full further events are dropped and the client resyncs on its next poll.
+MAX_PENDING_EVENTS = 50
+# Keep well under the worker's thread count (WEB_THREADS in the Procfile) so
+# open streams can never starve ordinary requests.
+MAX_STREAMS = int(os.environ.get("SESSION_STREAM_MAX_CONNECTIONS", "8"))
+
+_subscribers: dict[int, set[queue.Queue]] = {}
+_lock = threading.Lock()
+
+
+def subscribe(family_id: int) -> queue.Queue | None:
+    """Open a listener for the family, or return None when MAX_STREAMS are already open."""
+    q: queue.Queue = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+    with _lock:
+        if sum(len(listeners) for listeners in _subscribers.values()) >= MAX_STREAMS:
+            return None
+        _subscribers.setdefault(family_id, set()).add(q)
+    return q
+
+
+def unsubscribe(family_id: int, q: queue.Queue) -> None:
+    with _lock:
+        listeners = _subscribers.get(family_id)
+        if not listeners:
+            return
+        listeners.discard(q)
+        if not listeners:
+            _subscribers.pop(family_id, None)
+
+
+def publish(family_id: int, event: dict) -> int:
+    """Fan an event out to every open stream for the family.  Returns listeners reached."""
+    with _lock:
+        listeners = list(_subscribers.get(family_id, ()))
+    delivered = 0
+    for q in listeners:
+        try:
+            q.put_nowait(event)
+            delivered += 1
+        except queue.Full:
+            pass
+    return delivered
+
+
+def subscriber_count(family_id: int | None = None) -> int:
+    with _lock:
+        if family_id is not None:
+            return len(_subscribers.get(family_id, ()))
+        return sum(len(listeners) for listeners in _subscribers.values())
+
+
+def format_sse(event: dict) -> str:
+    """Serialise an event as a single SSE frame."""
+    return f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
@@ -0,0 +1,182 @@
+"""
+Per-family store catalog cache.
+
+The store pages render the same active StoreItem rows on every view, yet the
+catalog only changes when a parent creates, edits, toggles, deletes or
+reorders an item (or a purchase sells an item out, or a refund restocks a
+sold-out one).  Each of those paths calls bump_catalog_version(), and cached
+catalogs are keyed by (family_id, Family.store_catalog_version), so a bump
+simply makes the old entry unreachable — nothing has to be invalidated
+explicitly.  Other stock moves do not bump, so a cached "N left" count may lag
+until the next change; purchases always check stock_qty in the database.
+
+Two tiers:
+  * an in-process LRU (STORE_CATALOG_CACHE_SIZE families, default 256);
+  * optionally Redis (STORE_CATALOG_REDIS_URL), shared by every worker.
+
+Cached entries are plain CatalogItem snapshots, never ORM instances, so they
+are safe to share between requests and threads.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from types import SimpleNamespace
+
+from flask import current_app
+
+
+SHARED_TTL_SECONDS = 24 * 60 * 60
+
+_local_lock = threading.Lock()
+_shared_client = None
+_shared_client_url = None
+
+
+class CatalogItem(SimpleNamespace):
+    """Read-only snapshot of one StoreItem row."""
+
+
+def _local_cache() -> OrderedDict:
+    """The LRU lives on the app, so separate apps (and test databases) never share entries."""
+    return current_app.extensions.setdefault("store_catalog_cache", OrderedDict())
+
+
+def _local_capacity() -> int:
+    try:
+        return max(0, int(os.environ.get("STORE_CATALOG_CACHE_SIZE", "256")))
+    except ValueError:
+        return 256
+
+
+def _shared():
+    """Return a Redis client when STORE_CATALOG_REDIS_URL is set, else None."""
+    global _shared_client, _shared_client_url
+
+    url = os.environ.get("STORE_CATALOG_REDIS_URL", "")
+    if not url:
+        return None
+    if _shared_client is not None and _shared_client_url == url:
+        return _shared_client
+    try:
+        import redis
+    except ImportError:
+        current_app.logger.warning("redis not installed; store catalog cache is process-local only.")
+        return None
+    _shared_client = redis.Redis.from_url(url, socket_timeout=0.5)
+    _shared_client_url = url
+    return _shared_client
+
+
+def _shared_key(family_id: int, version: int) -> str:
+    return f"store_catalog:{family_id}:{version}"
+
+
+def _column_names() -> list[str]:
+    from src.models.main import StoreItem
+
+    return [column.key for column in StoreItem.__table__.columns]
+
+
+def _snapshot(item) -> CatalogItem:
+    return CatalogItem(**{name: getattr(item, name) for name in _column_names()})
+
+
+def _dump(items: list[CatalogItem]) -> str:
+    return json.dumps(
+        [
+            {key: value.isoformat() if isinstance(value, datetime) else value for key, value in vars(item).items()}
+            for item in items
+        ],
+        separators=(",", ":"),
+    )
+
+
+def _load(raw) -> list[CatalogItem]:
+    from sqlalchemy import DateTime
+    from src.models.main import StoreItem
+
+    datetime_columns = {column.key for column in StoreItem.__table__.columns if isinstance(column.type, DateTime)}
+    items = []
+    for row in json.loads(raw):
+        for key in datetime_columns:
+            if row.get(key):
+                row[key] = datetime.fromisoformat(row[key])
+        items.append(CatalogItem(**row))
+    return items
+
+
+def _query_catalog(family_id: int) -> list[CatalogItem]:
+    from src.models.main import StoreItem
+
+    rows = (
+        StoreItem.query.filter(
+            StoreItem.family_id == family_id,
+            StoreItem.item_scope.in_(["kid", "family"]),
+            StoreItem.is_active.is_(True),
+        )
+        .order_by(StoreItem.created_at.desc())
+        .all()
+    )
+    return [_snapshot(item) for item in rows]
+
+
+def get_catalog(family) -> list[CatalogItem]:
+    """Active kid and family store items for *family*, newest first.
+
+    The version is read (with the family row) before the items are loaded, so
+    an entry can only ever hold data at least as new as its key.
+    """
+    key = (family.id, family.store_catalog_version or 0)
+    local = _local_cache()
+
+    with _local_lock:
+        items = local.get(key)
+        if items is not None:
+            local.move_to_end(key)
+            return items
+
+    items = None
+    client = _shared()
+    if client is not None:
+        try:
+            raw = client.get(_shared_key(*key))
+            if raw is not None:
+                items = _load(raw)
+        except Exception:
+            current_app.logger.warning("Store catalog shared cache unavailable.", exc_info=True)
+
+    if items is None:
+        items = _query_catalog(family.id)
+        if client is not None:
+            try:
+                client.set(_shared_key(*key), _dump(items), ex=SHARED_TTL_SECONDS)
+            except Exception:
+                current_app.logger.warning("Store catalog shared cache unavailable.", exc_info=True)
+
+    capacity = _local_capacity()
+    if capacity:
+        with _local_lock:
+            local[key] = items
+            local.move_to_end(key)
+            while len(local) > capacity:
+                local.popitem(last=False)
+    return items
+
+
+def bump_catalog_version(family_id: int) -> None:
+    """Invalidate the family's cached catalog; takes effect when the caller commits."""
+    from src.models.main import Family
+
+    Family.query.filter(Family.id == family_id).update(
+        {Family.store_catalog_version: Family.store_catalog_version + 1},
+        synchronize_session=False,
+    )
+
+
+def clear_local_cache() -> None:
+    with _local_lock:
+        _local_cache().clear()
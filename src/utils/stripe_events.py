@@ -0,0 +1,192 @@
+"""
+Queued, idempotent Stripe webhook processing (stripe_events).
+
+The webhook verifies the signature, stores the event under its Stripe event
+id and returns 200 at once; a redelivered event hits the primary key and is
+acknowledged without doing anything.  process_stripe_events(), run by the
+scheduler (or ``manage.py process-stripe-events``), applies pending events in
+Stripe's creation order.  An event's changes and its "processed" mark are
+committed together, so a crash mid-way simply replays it.  Failures are
+retried with backoff and marked failed after STRIPE_EVENT_MAX_ATTEMPTS.
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+
+
+STRIPE_EVENT_MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+PROCESS_LEASE = timedelta(minutes=5)
+# Stripe stops redelivering after three days; processed rows are kept well past that.
+PROCESSED_RETENTION = timedelta(days=30)
+
+
+def record_event(payload: str) -> bool:
+    """Store a signature-verified webhook body; returns False if the event was already received.  Commits."""
+    from sqlalchemy.exc import IntegrityError
+    from src.models.main import StripeEvent, db
+
+    event = json.loads(payload)
+    try:
+        with db.session.begin_nested():
+            db.session.add(StripeEvent(
+                event_id=event["id"],
+                type=event["type"],
+                payload=payload,
+                stripe_created_at=datetime.utcfromtimestamp(event["created"]) if event.get("created") else datetime.utcnow(),
+            ))
+    except IntegrityError:
+        return False
+    db.session.commit()
+    return True
+
+
+def _queue_payment_failed_emails(family) -> None:
+    import os
+    from src.utils.email import queue_email
+
+    base_url = os.environ.get("APP_BASE_URL", "https://app.stewardwell.com")
+    for parent in family.parents:
+        html = f"""
+        <p>Hi {parent.name},</p>
+        <p>We were unable to process your Stewardwell Pro payment. Your account has been
+        flagged as <strong>past due</strong>. Please update your payment method to keep your Pro access.</p>
+        <p style="text-align:center;margin:24px 0;">
+            <a href="{base_url}/billing/portal"
+               style="background:#e53e3e;color:#fff;padding:12px 28px;border-radius:8px;
+                      text-decoration:none;font-weight:700;font-size:15px;">
+                Update Payment Method
+            </a>
+        </p>
+        <p style="color:#888;font-size:12px;">If you have questions, reply to this email.</p>
+        """
+        queue_email(
+            to_email=parent.email,
+            to_name=parent.name,
+            subject="Action required: Stewardwell payment failed",
+            html_content=html,
+        )
+
+
+def apply_event(event: dict) -> None:
+    """Apply one Stripe event to the database without committing."""
+    from flask import current_app
+    from src.models.main import Donation, Family, db
+
+    obj = event["data"]["object"]
+    event_type = event["type"]
+
+    if event_type == "checkout.session.completed":
+        family_id = (obj.get("metadata") or {}).get("family_id")
+        family = Family.query.get(int(family_id)) if family_id else None
+        if family:
+            from src.controllers.routes import _get_stripe
+
+            sub = _get_stripe().Subscription.retrieve(obj["subscription"])
+            family.plan = "pro"
+            family.stripe_subscription_id = sub.id
+            family.subscription_status = sub.status
+
+    elif event_type in ("invoice.payment_succeeded", "invoice.payment_failed"):
+        sub_id = obj.get("subscription")
+        family = Family.query.filter_by(stripe_subscription_id=sub_id).first() if sub_id else None
+        if family and event_type == "invoice.payment_succeeded":
+            family.subscription_status = "active"
+        elif family:
+            family.subscription_status = "past_due"
+            # Dunning email to all parents, committed with the status change.
+            _queue_payment_failed_emails(family)
+
+    elif event_type == "payment_intent.succeeded":
+        # Log one-time donation from Stripe Payment Link
+        pi_id = obj.get("id")
+        if pi_id and not Donation.query.filter_by(stripe_payment_intent_id=pi_id).first():
+            charges = (obj.get("charges") or {}).get("data") or [{}]
+            billing_details = charges[0].get("billing_details") or {}
+            donation = Donation(
+                stripe_payment_intent_id=pi_id,
+                amount_cents=obj.get("amount_received", obj.get("amount", 0)),
+                currency=obj.get("currency", "usd"),
+                donor_email=billing_details.get("email") or obj.get("receipt_email"),
+                donor_name=billing_details.get("name"),
+            )
+            db.session.add(donation)
+            current_app.logger.info("Donation logged: %s %s", pi_id, donation.amount_display)
+
+    elif event_type == "customer.subscription.deleted":
+        sub_id = obj.get("id")
+        family = Family.query.filter_by(stripe_subscription_id=sub_id).first() if sub_id else None
+        if family:
+            family.plan = "free"
+            family.subscription_status = "canceled"
+            family.stripe_subscription_id = None
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_BASE_DELAY * (2 ** max(0, attempts - 1)), RETRY_MAX_DELAY)
+
+
+def process_stripe_events(batch_size: int = 100) -> tuple[int, int]:
+    """Apply due pending events, oldest (by Stripe time) first.  Returns (processed, failed_attempts)."""
+    from flask import current_app
+    from sqlalchemy import update
+    from src.models.main import StripeEvent, db
+
+    now = datetime.utcnow()
+    due_ids = [
+        row.event_id
+        for row in StripeEvent.query.with_entities(StripeEvent.event_id)
+        .filter(StripeEvent.status == "pending", StripeEvent.next_attempt_at <= now)
+        .order_by(StripeEvent.stripe_created_at.asc(), StripeEvent.event_id.asc())
+        .limit(batch_size)
+    ]
+
+    processed = failed = 0
+    for event_id in due_ids:
+        # Lease the row so a concurrent processor skips it.
+        claimed = db.session.execute(
+            update(StripeEvent)
+            .where(StripeEvent.event_id == event_id, StripeEvent.status == "pending", StripeEvent.next_attempt_at <= now)
+            .values(next_attempt_at=now + PROCESS_LEASE, attempts=StripeEvent.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            continue
+
+        record = db.session.get(StripeEvent, event_id)
+        try:
+            apply_event(json.loads(record.payload))
+            record.status = "processed"
+            record.processed_at = datetime.utcnow()
+            record.last_error = None
+            db.session.commit()
+            processed += 1
+        except Exception as exc:
+            db.session.rollback()
+            failed += 1
+            record = db.session.get(StripeEvent, event_id)
+            record.last_error = str(exc)[:500]
+            if record.attempts >= STRIPE_EVENT_MAX_ATTEMPTS:
+                record.status = "failed"
+                current_app.logger.error("Stripe event %s (%s) failed permanently: %s", event_id, record.type, exc)
+            else:
+                record.next_attempt_at = datetime.utcnow() + retry_delay(record.attempts)
+                current_app.logger.warning("Stripe event %s (%s) failed, will retry: %s", event_id, record.type, exc)
+            db.session.commit()
+
+    return processed, failed
+
+
+def purge_processed_events(retention: timedelta = PROCESSED_RETENTION) -> int:
+    """Delete processed events older than *retention*; returns rows deleted."""
+    from src.models.main import StripeEvent, db
+
+    deleted = StripeEvent.query.filter(
+        StripeEvent.status == "processed",
+        StripeEvent.received_at < datetime.utcnow() - retention,
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from src import create_app
+
+
+class AppTestCase(unittest.TestCase):
+    """Runs a test class against its own app and throwaway SQLite database.
+
+    Subclasses name the database file with ``database_name``; ``database_url_env``
+    names an environment variable that, when set, points the class at another
+    database (e.g. Postgres for the stress tests) instead.  Extra environment
+    variables go in ``env``.  Everything set here is restored afterwards.
+    """
+
+    database_name = "app"
+    database_url_env: str | None = None
+    env: dict[str, str] = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls._previous_env = {}
+        tmp_dir = tempfile.mkdtemp()
+        database_url = cls.database_url_env and os.environ.get(cls.database_url_env)
+        cls.set_env("DATABASE_URL", database_url or f"sqlite:///{tmp_dir}/{cls.database_name}.db")
+        for key, value in cls.env.items():
+            cls.set_env(key, value)
+        cls.app = create_app(start_scheduler=False)
+        cls.app.config["WTF_CSRF_ENABLED"] = False
+
+    @classmethod
+    def tearDownClass(cls):
+        for key, value in cls._previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    @classmethod
+    def set_env(cls, key: str, value: str) -> None:
+        cls._previous_env.setdefault(key, os.environ.get(key))
+        os.environ[key] = value
+
+    def kid_client(self, kid_id: int, family_id: int):
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess["role"] = "kid"
+            sess["kid_id"] = kid_id
+            sess["family_id"] = family_id
+        return client
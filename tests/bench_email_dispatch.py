@@ -0,0 +1,65 @@
+"""Benchmark outbox delivery one message per request against batched requests.
+
+Both runs go through dispatch_outbox() and the pooled keep-alive session
+against a local FakeBrevo, on a throwaway SQLite database:
+
+    python -m tests.bench_email_dispatch [messages] [batch_size] [latency_ms]
+
+*latency_ms* makes every fake response that slow, to stand in for the round
+trip to the real API.  Not part of the unit suite (pytest only collects
+test_*.py).
+"""
+import os
+import sys
+import tempfile
+import time
+
+from tests.fake_brevo import FakeBrevo
+
+
+def _queue(count: int, label: str) -> None:
+    from src.models.main import db
+    from src.utils.email import queue_email
+
+    for i in range(count):
+        queue_email(f"{label}{i}@example.com", f"Parent {i}", "Trial ending", f"<p>Hi {i}</p>")
+    db.session.commit()
+
+
+def _timed_dispatch(brevo: FakeBrevo, batch_size: int) -> tuple[float, int, int]:
+    from src.utils.email import dispatch_outbox
+
+    requests_before = brevo.requests
+    started = time.perf_counter()
+    sent, retried, dead = dispatch_outbox(batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    if retried or dead:
+        raise SystemExit(f"ERROR: {retried} retried and {dead} dead-lettered; expected every message to be sent.")
+    return elapsed, sent, brevo.requests - requests_before
+
+
+def main(messages: str = "1000", batch_size: str = "1000", latency_ms: str = "0") -> None:
+    messages, batch_size = max(1, int(messages)), max(1, int(batch_size))
+    with FakeBrevo(delay=float(latency_ms) / 1000) as brevo:
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/bench_email.db",
+            "BREVO_API_KEY": "bench-key",
+            "BREVO_SENDER_EMAIL": "bench@example.com",
+            "BREVO_API_URL": brevo.url,
+        })
+        from src import create_app
+
+        app = create_app(start_scheduler=False)
+        with app.app_context():
+            _queue(messages, "single")
+            single = _timed_dispatch(brevo, 1)
+            _queue(messages, "batched")
+            batched = _timed_dispatch(brevo, batch_size)
+
+    for label, (elapsed, sent, requests_made) in (("one by one", single), (f"batches of {batch_size}", batched)):
+        print(f"{label:>18}: {sent} sent in {requests_made} request(s), {elapsed * 1000:.0f} ms")
+    print(f"{'speed-up':>18}: {single[0] / batched[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:4])
@@ -0,0 +1,68 @@
+"""A local stand-in for Brevo's transactional email API, for tests.
+
+    with FakeBrevo() as brevo:
+        os.environ["BREVO_API_URL"] = brevo.url
+        ...
+        brevo.messages  # JSON payloads received, in order
+
+Queue status codes with fail_next() to simulate outages or rejections;
+*delay* (seconds) makes every response slow.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeBrevo:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.messages = []
+        self.requests = 0
+        self._responses = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v3/smtp/email"
+
+    def fail_next(self, *status_codes: int) -> None:
+        with self._lock:
+            self._responses.extend(status_codes)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if fake.delay:
+                    threading.Event().wait(fake.delay)
+                with fake._lock:
+                    fake.requests += 1
+                    status = fake._responses.pop(0) if fake._responses else 201
+                    if status in (200, 201):
+                        fake.messages.append(json.loads(body))
+                reply = json.dumps({"messageId": f"<fake-{fake.requests}@brevo>"} if status in (200, 201) else {"message": "fake error"}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,80 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from src.models.main import CoinTransaction, CoinTransactionArchive, Family, Kid, LedgerReconcileRun, db
+from src.utils import ledger
+from src.utils.archive import coin_transactions_union, run_archival
+from tests.base import AppTestCase
+
+
+class ArchiveTest(AppTestCase):
+    database_name = "archive"
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        family = Family(name="Archive", family_code_hash="x", family_code_hint="ARCH")
+        db.session.add(family)
+        db.session.flush()
+        self.kid = Kid(family_id=family.id, display_name="Kid", pin_hash="x")
+        db.session.add(self.kid)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def _post_old(self, count: int) -> list[int]:
+        legs = [
+            ledger.LedgerLeg(kid=self.kid, amount=1, kind="manual_add", created_at=datetime.utcnow() - timedelta(days=400))
+            for _ in range(count)
+        ]
+        transactions = ledger.post_many(legs)
+        db.session.commit()
+        return [transaction.id for transaction in transactions]
+
+    def _reconcile_settled(self):
+        """Two reconcile runs a settle window apart, so every posting is checkpointed."""
+        ledger.reconcile_balances()
+        LedgerReconcileRun.query.update(
+            {LedgerReconcileRun.started_at: datetime.utcnow() - ledger.CHECKPOINT_SETTLE_WINDOW - timedelta(minutes=1)}
+        )
+        db.session.commit()
+        ledger.reconcile_balances()
+
+    def test_archival_keeps_the_newest_row_hot_so_ids_are_never_reused(self):
+        ids = self._post_old(4)
+        self._reconcile_settled()
+
+        run_archival()
+        self.assertEqual(
+            [row.id for row in CoinTransaction.query.filter(CoinTransaction.kid_id == self.kid.id)],
+            [ids[-1]],
+        )
+        archived = db.session.execute(
+            select(CoinTransactionArchive.id).where(CoinTransactionArchive.kid_id == self.kid.id)
+        ).scalars().all()
+        self.assertEqual(sorted(archived), ids[:-1])
+
+        new_id = ledger.post(self.kid, 1, "manual_add").id
+        db.session.commit()
+        self.assertGreater(new_id, ids[-1])
+
+        history = coin_transactions_union()
+        self.assertEqual(
+            db.session.query(func.count(history.id)).filter(history.kid_id == self.kid.id).scalar(),
+            5,
+        )
+
+    def test_unsettled_transactions_stay_hot(self):
+        self._post_old(3)
+        # A single run only seeds checkpoints; nothing is settled yet.
+        ledger.reconcile_balances()
+        run_archival()
+        self.assertEqual(CoinTransaction.query.filter_by(kid_id=self.kid.id).count(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import threading
+import unittest
+
+from sqlalchemy import inspect, text
+
+from src import _ensure_indexes
+from src.controllers.routes import _insert_chore_claim
+from src.models.main import Chore, ChoreSubmission, Family, Kid, Parent, Task, TaskClaim, db
+from tests.base import AppTestCase
+
+CLAIMERS = 24
+CHORE_SLOTS = 3
+
+
+class ClaimConcurrencyTest(AppTestCase):
+    # Throwaway SQLite file by default; set CLAIM_STRESS_DATABASE_URL to a
+    # Postgres URL to run the same stress test there.
+    database_name = "claim_stress"
+    database_url_env = "CLAIM_STRESS_DATABASE_URL"
+
+    def setUp(self):
+        with self.app.app_context():
+            family = Family(name="Claims", family_code_hash="x", family_code_hint="CLMS")
+            db.session.add(family)
+            db.session.flush()
+            parent = Parent(family_id=family.id, name="P", email=f"claims{family.id}@example.com", password_hash="x")
+            db.session.add(parent)
+            db.session.flush()
+            kids = [Kid(family_id=family.id, display_name=f"Kid {i}", pin_hash="x") for i in range(CLAIMERS)]
+            db.session.add_all(kids)
+            chore = Chore(
+                family_id=family.id,
+                created_by_parent_id=parent.id,
+                name="Rake leaves",
+                coin_reward=6,
+                max_concurrent_claims=CHORE_SLOTS,
+            )
+            task = Task(family_id=family.id, created_by_parent_id=parent.id, title="Wash the car", coin_reward=5)
+            db.session.add_all([chore, task])
+            db.session.commit()
+            self.family_id = family.id
+            self.chore_id = chore.id
+            self.task_id = task.id
+            self.kid_ids = [kid.id for kid in kids]
+
+    def _claim(self, kid_id, path, barrier, statuses):
+        client = self.kid_client(kid_id, self.family_id)
+        barrier.wait()
+        response = client.post(path)
+        statuses.append(response.status_code)
+
+    def _run_parallel(self, requests):
+        barrier = threading.Barrier(len(requests))
+        statuses = []
+        threads = [
+            threading.Thread(target=self._claim, args=(kid_id, path, barrier, statuses))
+            for kid_id, path in requests
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(statuses), len(requests))
+
+    def test_parallel_chore_claims_respect_slots(self):
+        self._run_parallel([(kid_id, f"/kid/chores/{self.chore_id}/claim") for kid_id in self.kid_ids])
+        with self.app.app_context():
+            held = ChoreSubmission.query.filter(
+                ChoreSubmission.chore_id == self.chore_id,
+                ChoreSubmission.claim_slot.isnot(None),
+            ).all()
+
+        self.assertEqual(len(held), CHORE_SLOTS)
+        self.assertEqual(sorted(submission.claim_slot for submission in held), list(range(1, CHORE_SLOTS + 1)))
+        self.assertEqual(len({submission.kid_id for submission in held}), CHORE_SLOTS)
+
+    def test_same_kid_double_tap_claims_once(self):
+        kid_id = self.kid_ids[0]
+        self._run_parallel([(kid_id, f"/kid/chores/{self.chore_id}/claim")] * 4)
+        with self.app.app_context():
+            held = ChoreSubmission.query.filter_by(chore_id=self.chore_id, kid_id=kid_id).count()
+        self.assertEqual(held, 1)
+
+    def test_parallel_task_claims_single_holder(self):
+        self._run_parallel([(kid_id, f"/kid/tasks/{self.task_id}/claim") for kid_id in self.kid_ids])
+        with self.app.app_context():
+            claims = TaskClaim.query.filter_by(task_id=self.task_id).count()
+
+        self.assertEqual(claims, 1)
+
+    def test_losing_claim_insert_tells_double_tap_from_full_chore(self):
+        with self.app.app_context():
+            chore = db.session.get(Chore, self.chore_id)
+
+            def submission(kid_id):
+                return ChoreSubmission(
+                    chore_id=chore.id,
+                    family_id=self.family_id,
+                    kid_id=kid_id,
+                    reset_version=chore.daily_reset_version,
+                    status="claimed",
+                )
+
+            self.assertEqual(_insert_chore_claim(submission(self.kid_ids[0]), chore), "claimed")
+            self.assertEqual(_insert_chore_claim(submission(self.kid_ids[0]), chore), "duplicate")
+            for kid_id in self.kid_ids[1:CHORE_SLOTS]:
+                self.assertEqual(_insert_chore_claim(submission(kid_id), chore), "claimed")
+            self.assertEqual(_insert_chore_claim(submission(self.kid_ids[-1]), chore), "full")
+            db.session.rollback()
+
+    def test_duplicate_holders_are_resolved_before_the_index_is_built(self):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(text("DROP INDEX uq_task_claims_exclusive_holder"))
+            first, second = (
+                TaskClaim(task_id=self.task_id, family_id=self.family_id, kid_id=kid_id, status="claimed", is_exclusive=True)
+                for kid_id in self.kid_ids[:2]
+            )
+            db.session.add(first)
+            db.session.flush()
+            db.session.add(second)
+            db.session.commit()
+
+            _ensure_indexes()
+
+            self.assertIn(
+                "uq_task_claims_exclusive_holder",
+                {index["name"] for index in inspect(db.engine).get_indexes("task_claims")},
+            )
+            db.session.expire_all()
+            self.assertEqual(db.session.get(TaskClaim, first.id).status, "claimed")
+            self.assertEqual(db.session.get(TaskClaim, second.id).status, "rejected")
+
+
+if __name__ == "__main__":
+    unittest.main()
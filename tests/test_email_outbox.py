@@ -0,0 +1,197 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.models.main import EmailOutbox, db
+from src.utils import email
+from src.utils.email import (
+    EMAIL_MAX_ATTEMPTS,
+    SENT_RETENTION,
+    deliver_email,
+    dispatch_outbox,
+    purge_sent_email,
+    queue_email,
+    send_email,
+)
+from tests.base import AppTestCase
+from tests.fake_brevo import FakeBrevo
+
+BULK_MESSAGES = 300
+BULK_BATCH_SIZE = 100
+
+BREVO_ENV = {
+    "BREVO_API_KEY": "test-key",
+    "BREVO_SENDER_EMAIL": "hello@example.com",
+}
+
+
+class EmailOutboxTest(AppTestCase):
+    database_name = "email_outbox"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.brevo = FakeBrevo().__enter__()
+        for key, value in {**BREVO_ENV, "BREVO_API_URL": cls.brevo.url}.items():
+            cls.set_env(key, value)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.brevo.__exit__(None, None, None)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.brevo.messages.clear()
+        with self.app.app_context():
+            EmailOutbox.query.delete()
+            db.session.commit()
+
+    def _make_due(self):
+        EmailOutbox.query.update({EmailOutbox.next_attempt_at: datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+
+    def test_send_email_queues_and_dispatcher_delivers(self):
+        with self.app.app_context():
+            self.assertTrue(send_email("a@example.com", "A", "Hello", "<p>Hi</p>"))
+            self.assertEqual(self.brevo.messages, [])
+
+            self.assertEqual(dispatch_outbox(), (1, 0, 0))
+            message = EmailOutbox.query.one()
+            self.assertEqual(message.status, "sent")
+            self.assertEqual(message.attempts, 1)
+            # The delivered body (which may hold a live token) is not kept.
+            self.assertEqual(message.html_content, "")
+        self.assertEqual(self.brevo.messages[0]["to"], [{"email": "a@example.com", "name": "A"}])
+        self.assertEqual(self.brevo.messages[0]["htmlContent"], "<p>Hi</p>")
+
+    def test_purge_drops_only_old_sent_rows(self):
+        with self.app.app_context():
+            for address in ("old@example.com", "new@example.com", "queued@example.com"):
+                queue_email(address, "", "Hello", "<p>Hi</p>")
+            db.session.commit()
+            dispatch_outbox()
+            queue_email("pending@example.com", "", "Hello", "<p>Hi</p>")
+            EmailOutbox.query.filter_by(to_email="old@example.com").update(
+                {EmailOutbox.sent_at: datetime.utcnow() - SENT_RETENTION - timedelta(days=1)}
+            )
+            db.session.commit()
+
+            self.assertEqual(purge_sent_email(), 1)
+            remaining = {message.to_email for message in EmailOutbox.query.all()}
+        self.assertEqual(remaining, {"new@example.com", "queued@example.com", "pending@example.com"})
+
+    def test_transient_failures_back_off_then_succeed(self):
+        self.brevo.fail_next(503, 429)
+        with self.app.app_context():
+            send_email("b@example.com", "B", "Hello", "<p>Hi</p>")
+            self.assertEqual(dispatch_outbox(), (0, 1, 0))
+            first_retry = EmailOutbox.query.one().next_attempt_at
+            self.assertGreater(first_retry, datetime.utcnow())
+            # Not due yet: nothing is sent.
+            self.assertEqual(dispatch_outbox(), (0, 0, 0))
+
+            self._make_due()
+            self.assertEqual(dispatch_outbox(), (0, 1, 0))
+            message = EmailOutbox.query.one()
+            self.assertGreater(message.next_attempt_at - datetime.utcnow(), first_retry - datetime.utcnow())
+
+            self._make_due()
+            self.assertEqual(dispatch_outbox(), (1, 0, 0))
+            self.assertEqual(EmailOutbox.query.one().attempts, 3)
+
+    def test_permanent_rejection_and_exhausted_retries_dead_letter(self):
+        with self.app.app_context():
+            self.brevo.fail_next(400)
+            send_email("bad@example.com", "Bad", "Hello", "<p>Hi</p>")
+            self.assertEqual(dispatch_outbox(), (0, 0, 1))
+            self.assertIn("400", EmailOutbox.query.one().last_error)
+            self.assertEqual(EmailOutbox.query.one().html_content, "")
+
+            EmailOutbox.query.delete()
+            send_email("down@example.com", "Down", "Hello", "<p>Hi</p>")
+            self.brevo.fail_next(*[500] * EMAIL_MAX_ATTEMPTS)
+            for _ in range(EMAIL_MAX_ATTEMPTS):
+                self._make_due()
+                dispatch_outbox()
+            message = EmailOutbox.query.one()
+            self.assertEqual((message.status, message.attempts), ("dead", EMAIL_MAX_ATTEMPTS))
+        self.assertEqual(self.brevo.messages, [])
+
+    def test_rejected_api_key_stops_dispatch_and_keeps_rows_pending(self):
+        with self.app.app_context():
+            for i in range(3):
+                queue_email(f"key{i}@example.com", "", "Hello", "<p>Hi</p>")
+            db.session.commit()
+            self.brevo.fail_next(401)
+            self.assertEqual(dispatch_outbox(), (0, 0, 0))
+            messages = EmailOutbox.query.all()
+            self.assertEqual({(message.status, message.attempts) for message in messages}, {("pending", 0)})
+            self.assertIn("401", messages[0].last_error)
+
+            # Once the key works again the same rows go out.
+            self.assertEqual(dispatch_outbox(), (3, 0, 0))
+
+    def test_rejected_api_key_during_one_by_one_fallback_keeps_the_rest_pending(self):
+        with self.app.app_context():
+            for i in range(3):
+                queue_email(f"rotate{i}@example.com", "", "Hello", "<p>Hi</p>")
+            db.session.commit()
+            # Batch rejected, first single send ok, then the key stops working.
+            self.brevo.fail_next(400, 201, 403)
+            self.assertEqual(dispatch_outbox(), (1, 0, 0))
+            statuses = {message.to_email: (message.status, message.attempts) for message in EmailOutbox.query.all()}
+        self.assertEqual(statuses, {
+            "rotate0@example.com": ("sent", 1),
+            "rotate1@example.com": ("pending", 0),
+            "rotate2@example.com": ("pending", 0),
+        })
+
+    def test_bulk_dispatch_uses_batched_requests(self):
+        with self.app.app_context():
+            for i in range(BULK_MESSAGES):
+                queue_email(f"parent{i}@example.com", f"Parent {i}", "Trial ending", f"<p>Hi {i}</p>")
+            db.session.commit()
+
+            requests_before = self.brevo.requests
+            self.assertEqual(dispatch_outbox(batch_size=BULK_BATCH_SIZE), (BULK_MESSAGES, 0, 0))
+        self.assertEqual(self.brevo.requests - requests_before, BULK_MESSAGES // BULK_BATCH_SIZE)
+        versions = self.brevo.messages[0]["messageVersions"]
+        self.assertEqual(versions[1]["to"], [{"email": "parent1@example.com", "name": "Parent 1"}])
+        self.assertEqual(versions[1]["htmlContent"], "<p>Hi 1</p>")
+
+    def test_rejected_batch_is_retried_one_by_one(self):
+        with self.app.app_context():
+            for i in range(3):
+                queue_email(f"mixed{i}@example.com", "", "Hello", "<p>Hi</p>")
+            db.session.commit()
+            # Batch rejected, then: first single send ok, second rejected, third ok.
+            self.brevo.fail_next(400, 201, 400)
+            self.assertEqual(dispatch_outbox(), (2, 0, 1))
+            dead = EmailOutbox.query.filter_by(status="dead").one()
+        self.assertEqual(dead.to_email, "mixed1@example.com")
+
+    def test_one_by_one_fallback_skips_rows_reclaimed_after_the_lease(self):
+        with self.app.app_context():
+            for i in range(3):
+                queue_email(f"slow{i}@example.com", "", "Hello", "<p>Hi</p>")
+            db.session.commit()
+            stolen_id = EmailOutbox.query.filter_by(to_email="slow2@example.com").one().id
+
+            def deliver_then_lose_lease(*args):
+                # While this worker sends, another one re-claims a later row.
+                EmailOutbox.query.filter_by(id=stolen_id).update(
+                    {EmailOutbox.next_attempt_at: datetime.utcnow() + timedelta(hours=1)}
+                )
+                return deliver_email(*args)
+
+            self.brevo.fail_next(400)
+            # A zero lease forces a renewal before every single send.
+            with mock.patch.object(email, "DISPATCH_LEASE", timedelta(0)), \
+                    mock.patch.object(email, "deliver_email", side_effect=deliver_then_lose_lease):
+                self.assertEqual(dispatch_outbox(), (2, 0, 0))
+            statuses = {message.to_email: message.status for message in EmailOutbox.query.all()}
+        self.assertEqual(statuses, {"slow0@example.com": "sent", "slow1@example.com": "sent", "slow2@example.com": "pending"})
+
+
+if __name__ == "__main__":
+    unittest.main()
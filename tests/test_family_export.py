@@ -0,0 +1,35 @@
+import csv
+import io
+import unittest
+
+from src.models.main import Family, Kid, db
+from src.utils import ledger
+from src.utils.family_export import iter_csv
+from tests.base import AppTestCase
+
+
+class FamilyExportTest(AppTestCase):
+    database_name = "family_export"
+
+    def test_csv_cells_that_look_like_formulas_are_escaped(self):
+        with self.app.app_context():
+            family = Family(name="Export", family_code_hash="x", family_code_hint="EXPT")
+            db.session.add(family)
+            db.session.flush()
+            kid = Kid(family_id=family.id, display_name="@kid", pin_hash="x")
+            db.session.add(kid)
+            db.session.flush()
+            ledger.post(kid, -3, "fine", reason='=HYPERLINK("http://example.com")', floor=None)
+            ledger.post(kid, 2, "manual_add", reason="Tidy room")
+            db.session.commit()
+
+            rows = list(csv.DictReader(io.StringIO("".join(iter_csv("transactions", family.id)))))
+
+        self.assertEqual([row["reason"] for row in rows], ['\'=HYPERLINK("http://example.com")', "Tidy room"])
+        self.assertEqual({row["kid_name"] for row in rows}, {"'@kid"})
+        # Numbers stay numbers.
+        self.assertEqual([row["amount"] for row in rows], ["-3", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
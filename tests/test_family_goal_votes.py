@@ -0,0 +1,81 @@
+import threading
+import unittest
+
+from src.models.main import Family, Kid, Parent, StoreItem, StoreRedemption, StoreRedemptionVote, db
+from tests.base import AppTestCase
+
+
+class FamilyGoalVoteTest(AppTestCase):
+    database_name = "family_goal_votes"
+
+    def setUp(self):
+        with self.app.app_context():
+            family = Family(name="Votes", family_code_hash="x", family_code_hint="VOTE")
+            db.session.add(family)
+            db.session.flush()
+            parent = Parent(family_id=family.id, name="P", email=f"votes{family.id}@example.com", password_hash="x")
+            kid = Kid(family_id=family.id, display_name="Kid", pin_hash="x")
+            db.session.add_all([parent, kid])
+            db.session.flush()
+            item = StoreItem(
+                family_id=family.id,
+                created_by_parent_id=parent.id,
+                name="Movie night",
+                item_scope="family",
+                item_type="basic",
+            )
+            db.session.add(item)
+            db.session.flush()
+            redemption = StoreRedemption(store_item_id=item.id, family_id=family.id, requested_by_kid_id=kid.id)
+            db.session.add(redemption)
+            db.session.commit()
+            self.family_id = family.id
+            self.kid_id = kid.id
+            self.redemption_id = redemption.id
+
+    def _vote(self, value: str):
+        response = self.kid_client(self.kid_id, self.family_id).post(
+            f"/kid/store/family/redemptions/{self.redemption_id}/vote", data={"vote": value}
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def _tallies(self):
+        with self.app.app_context():
+            redemption = db.session.get(StoreRedemption, self.redemption_id)
+            votes = StoreRedemptionVote.query.filter_by(redemption_id=self.redemption_id).count()
+            return redemption.yes_vote_count, redemption.no_vote_count, votes
+
+    def test_duplicate_vote_is_counted_once(self):
+        self._vote("yes")
+        self._vote("yes")
+        self.assertEqual(self._tallies(), (1, 0, 1))
+
+    def test_changing_a_vote_moves_the_tally(self):
+        self._vote("yes")
+        self._vote("no")
+        self._vote("no")
+        self.assertEqual(self._tallies(), (0, 1, 1))
+
+    def test_concurrent_double_tap_records_one_vote(self):
+        taps = 8
+        barrier = threading.Barrier(taps)
+        statuses = []
+
+        def tap():
+            client = self.kid_client(self.kid_id, self.family_id)
+            barrier.wait()
+            response = client.post(f"/kid/store/family/redemptions/{self.redemption_id}/vote", data={"vote": "yes"})
+            statuses.append(response.status_code)
+
+        threads = [threading.Thread(target=tap) for _ in range(taps)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [302] * taps)
+        self.assertEqual(self._tallies(), (1, 0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
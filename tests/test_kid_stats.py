@@ -0,0 +1,76 @@
+import unittest
+from datetime import datetime, timedelta
+
+from src.models.main import Family, Kid, KidDailyStat, db
+from src.utils import ledger
+from src.utils.kid_stats import rebuild_kid_daily_stats
+from tests.base import AppTestCase
+
+
+class KidStatsTest(AppTestCase):
+    database_name = "kid_stats"
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        family = Family(name="Stats", family_code_hash="x", family_code_hint="STAT")
+        db.session.add(family)
+        db.session.flush()
+        self.kid = Kid(family_id=family.id, display_name="Kid", pin_hash="x", coin_balance=100)
+        db.session.add(self.kid)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def _post(self, amount: int, kind: str, days_ago: int = 0):
+        created_at = datetime.utcnow() - timedelta(days=days_ago)
+        ledger.post_many([ledger.LedgerLeg(kid=self.kid, amount=amount, kind=kind, created_at=created_at)], floor=None)
+        db.session.commit()
+
+    def _stat(self, days_ago: int = 0):
+        day = (datetime.utcnow() - timedelta(days=days_ago)).date()
+        stat = KidDailyStat.query.filter_by(kid_id=self.kid.id, day=day).one()
+        return stat.coins_earned, stat.coins_spent
+
+    def test_postings_are_classified_by_kind(self):
+        self._post(5, "chore_reward")
+        self._post(2, "manual_add")
+        self._post(-6, "timed_session")
+        self._post(4, "timed_session")  # refund of part of the charge
+        self._post(-3, "fine")
+        self._post(-10, "cash_out")
+
+        self.assertEqual(self._stat(), (7, 2))
+
+    def test_rebuild_matches_live_rollup(self):
+        self._post(5, "chore_reward", days_ago=1)
+        self._post(-4, "store_purchase", days_ago=1)
+        self._post(-3, "fine", days_ago=1)
+        live = self._stat(days_ago=1)
+
+        KidDailyStat.query.filter_by(kid_id=self.kid.id).update({KidDailyStat.coins_earned: 999})
+        db.session.commit()
+        rebuild_kid_daily_stats()
+        self.assertEqual(self._stat(days_ago=1), live)
+        self.assertEqual(live, (5, 4))
+
+    def test_rebuild_of_a_range_leaves_other_days_alone(self):
+        self._post(5, "chore_reward", days_ago=2)
+        self._post(1, "chore_reward")
+        KidDailyStat.query.filter_by(kid_id=self.kid.id).update({KidDailyStat.coins_spent: 42})
+        db.session.commit()
+
+        two_days_ago = (datetime.utcnow() - timedelta(days=2)).date()
+        rebuild_kid_daily_stats(start=two_days_ago, end=two_days_ago)
+        self.assertEqual(self._stat(days_ago=2), (5, 0))
+        self.assertEqual(self._stat(), (1, 42))
+
+        # Live postings after the rebuild add on top of the rebuilt row.
+        self._post(3, "chore_reward", days_ago=2)
+        self.assertEqual(self._stat(days_ago=2), (8, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from datetime import timedelta
+
+from src.models.main import CoinBalanceCheckpoint, Family, Kid, LedgerReconcileRun, db
+from src.utils import ledger
+from tests.base import AppTestCase
+
+
+class LedgerReconcileTest(AppTestCase):
+    database_name = "ledger_reconcile"
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        family = Family(name="Ledger", family_code_hash="x", family_code_hint="LDGR")
+        db.session.add(family)
+        db.session.flush()
+        self.kid = Kid(family_id=family.id, display_name="Kid", pin_hash="x")
+        db.session.add(self.kid)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def _age_runs(self):
+        """Push every recorded run back past the settle window."""
+        for run in LedgerReconcileRun.query.all():
+            run.started_at -= ledger.CHECKPOINT_SETTLE_WINDOW + timedelta(minutes=1)
+        db.session.commit()
+
+    def _latest_checkpoint(self):
+        return (
+            CoinBalanceCheckpoint.query.filter_by(kid_id=self.kid.id)
+            .order_by(CoinBalanceCheckpoint.id.desc())
+            .first()
+        )
+
+    def test_watermark_advances_across_quiet_runs(self):
+        first = ledger.post(self.kid, 10, "manual_add")
+        db.session.commit()
+        ledger.reconcile_balances()
+        self._age_runs()
+
+        # Settles the first posting.
+        ledger.reconcile_balances()
+        self.assertEqual(self._latest_checkpoint().as_of_tx_id, first.id)
+        self._age_runs()
+
+        # A run with nothing new to settle writes no checkpoint...
+        checkpoints = CoinBalanceCheckpoint.query.count()
+        ledger.reconcile_balances()
+        self.assertEqual(CoinBalanceCheckpoint.query.count(), checkpoints)
+        self._age_runs()
+
+        # ...but its run row still carries the watermark forward.
+        second = ledger.post(self.kid, 5, "manual_add")
+        third = ledger.post(self.kid, -5, "store_purchase")
+        db.session.commit()
+        ledger.reconcile_balances()
+        self._age_runs()
+        _, drifted = ledger.reconcile_balances()
+
+        checkpoint = self._latest_checkpoint()
+        self.assertEqual(drifted, 0)
+        # Zero-sum settled postings still move the checkpoint (and archival) past them.
+        self.assertEqual(checkpoint.as_of_tx_id, third.id)
+        self.assertGreater(third.id, second.id)
+        self.assertEqual(checkpoint.balance, 10)
+        self.assertEqual(checkpoint.drift, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
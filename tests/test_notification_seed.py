@@ -0,0 +1,31 @@
+import unittest
+
+from src import _SEED_KID_NOTIFICATIONS_MARKER, _seed_kid_notifications
+from src.models.main import AppSetting, CoinTransaction, Family, Kid, KidNotification, db
+from tests.base import AppTestCase
+
+
+class NotificationSeedTest(AppTestCase):
+    database_name = "notification_seed"
+
+    def test_inbox_is_seeded_only_once(self):
+        with self.app.app_context():
+            # create_app() saw a new inbox table and claimed the seed.
+            self.assertIsNotNone(db.session.get(AppSetting, _SEED_KID_NOTIFICATIONS_MARKER))
+
+            family = Family(name="Seed", family_code_hash="x", family_code_hint="SEED")
+            db.session.add(family)
+            db.session.flush()
+            kid = Kid(family_id=family.id, display_name="Kid", pin_hash="x")
+            db.session.add(kid)
+            db.session.flush()
+            db.session.add(CoinTransaction(kid_id=kid.id, family_id=family.id, amount=5, kind="manual_add", seen_by_kid=False))
+            db.session.commit()
+
+            # A second worker that also saw the table as new skips the seed.
+            self.assertFalse(_seed_kid_notifications())
+            self.assertEqual(KidNotification.query.filter_by(kid_id=kid.id).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
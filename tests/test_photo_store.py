@@ -0,0 +1,173 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from werkzeug.datastructures import FileStorage
+
+from src.models.main import Chore, ChoreSubmission, Family, Kid, Parent, PhotoBlob, PhotoBlobRef, Task, TaskClaim, db
+from src.utils.photo_store import GC_GRACE_PERIOD, gc_orphan_photos, link_photo, release_photo_refs, resolve_photo, store_photo
+from tests.base import AppTestCase
+
+
+def _upload(data: bytes) -> FileStorage:
+    return FileStorage(stream=io.BytesIO(data), filename="proof.jpg")
+
+
+class PhotoStoreTest(AppTestCase):
+    database_name = "photo_store"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.app.instance_path = tempfile.mkdtemp()
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        family = Family(name="Photos", family_code_hash="x", family_code_hint="PHTO")
+        db.session.add(family)
+        db.session.flush()
+        parent = Parent(family_id=family.id, name="P", email=f"photos{family.id}@example.com", password_hash="x")
+        kid = Kid(family_id=family.id, display_name="Kid", pin_hash="x")
+        db.session.add_all([parent, kid])
+        db.session.flush()
+        task = Task(family_id=family.id, created_by_parent_id=parent.id, title="Tidy up", coin_reward=1, allow_multiple_claims=True)
+        db.session.add(task)
+        db.session.flush()
+        self.claims = [TaskClaim(task_id=task.id, family_id=family.id, kid_id=kid.id, status="approved") for _ in range(2)]
+        db.session.add_all(self.claims)
+        chore = Chore(family_id=family.id, created_by_parent_id=parent.id, name="Dishes", requires_photo_proof=True)
+        db.session.add(chore)
+        db.session.flush()
+        self.submission = ChoreSubmission(chore_id=chore.id, family_id=family.id, kid_id=kid.id, status="claimed")
+        db.session.add(self.submission)
+        db.session.commit()
+        self.kid = kid
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def _absolute(self, path: str) -> str:
+        return os.path.join(self.app.instance_path, "uploads", path)
+
+    def _blob_files(self) -> set[str]:
+        blob_root = os.path.join(self.app.instance_path, "uploads", "blobs")
+        return {
+            filename
+            for _, _, filenames in os.walk(blob_root)
+            for filename in filenames
+        }
+
+    def _age(self, path: str) -> None:
+        sha = os.path.splitext(os.path.basename(path))[0]
+        PhotoBlob.query.filter_by(sha256=sha).update(
+            {PhotoBlob.last_uploaded_at: datetime.utcnow() - GC_GRACE_PERIOD - timedelta(minutes=1)}
+        )
+        db.session.commit()
+
+    def test_identical_uploads_share_one_blob(self):
+        first = store_photo(_upload(b"same bytes"), ".jpg")
+        second = store_photo(_upload(b"same bytes"), ".jpg")
+        db.session.commit()
+
+        self.assertEqual(first, second)
+        self.assertEqual(PhotoBlob.query.filter(PhotoBlob.sha256 == os.path.basename(first)[:-4]).count(), 1)
+        with open(self._absolute(first), "rb") as stored:
+            self.assertEqual(stored.read(), b"same bytes")
+
+    def test_gc_keeps_referenced_blobs_and_frees_released_ones(self):
+        path = store_photo(_upload(b"shared proof"), ".jpg")
+        for claim in self.claims:
+            link_photo(path, "task_claim", claim.id)
+        db.session.commit()
+        self._age(path)
+
+        release_photo_refs("task_claim", [self.claims[0].id])
+        db.session.commit()
+        self.assertEqual(gc_orphan_photos(), (0, 0))
+        self.assertTrue(os.path.exists(self._absolute(path)))
+
+        release_photo_refs("task_claim", [self.claims[1].id])
+        db.session.commit()
+        self.assertEqual(gc_orphan_photos(), (1, len(b"shared proof")))
+        self.assertFalse(os.path.exists(self._absolute(path)))
+        self.assertEqual(PhotoBlobRef.query.count(), 0)
+
+    def test_gc_spares_a_blob_re_uploaded_within_the_grace_period(self):
+        path = store_photo(_upload(b"orphan"), ".jpg")
+        db.session.commit()
+        self._age(path)
+
+        self.assertEqual(store_photo(_upload(b"orphan"), ".jpg"), path)
+        db.session.commit()
+        self.assertEqual(gc_orphan_photos(), (0, 0))
+        self.assertTrue(os.path.exists(self._absolute(path)))
+
+    def test_upload_after_gc_recreates_the_blob(self):
+        path = store_photo(_upload(b"collected"), ".jpg")
+        db.session.commit()
+        self._age(path)
+        self.assertEqual(gc_orphan_photos()[0], 1)
+
+        self.assertEqual(store_photo(_upload(b"collected"), ".jpg"), path)
+        db.session.commit()
+        self.assertTrue(os.path.exists(self._absolute(path)))
+        self.assertEqual(PhotoBlob.query.filter(PhotoBlob.sha256 == os.path.basename(path)[:-4]).count(), 1)
+
+    def test_rejected_chore_submission_stores_no_photo(self):
+        files_before = self._blob_files()
+        client = self.kid_client(self.kid.id, self.kid.family_id)
+        response = client.post(
+            f"/kid/chores/submissions/{self.submission.id}/submit",
+            data={
+                "before_photo": (io.BytesIO(b"valid before"), "before.jpg"),
+                "after_photo": (io.BytesIO(b"not an image"), "after.gif"),
+            },
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._blob_files(), files_before)
+        self.assertEqual(db.session.get(ChoreSubmission, self.submission.id).status, "claimed")
+
+    def test_gc_sweeps_files_whose_row_was_rolled_back(self):
+        kept = store_photo(_upload(b"committed"), ".jpg")
+        link_photo(kept, "task_claim", self.claims[0].id)
+        db.session.commit()
+        leaked = store_photo(_upload(b"rolled back"), ".jpg")
+        db.session.rollback()
+
+        old = time.time() - (GC_GRACE_PERIOD + timedelta(minutes=1)).total_seconds()
+        for path in (kept, leaked):
+            os.utime(self._absolute(path), (old, old))
+        self.assertEqual(gc_orphan_photos(), (1, len(b"rolled back")))
+        self.assertFalse(os.path.exists(self._absolute(leaked)))
+        self.assertTrue(os.path.exists(self._absolute(kept)))
+
+    def test_resolve_photo_only_serves_well_formed_blob_paths(self):
+        sha = "ab" + "0" * 62
+        directory, filename = resolve_photo(f"blobs/ab/{sha}.jpg", "task_photos")
+        self.assertEqual(directory, os.path.join(self.app.instance_path, "uploads", "blobs", "ab"))
+        self.assertEqual(filename, f"{sha}.jpg")
+
+        self.assertIsNone(resolve_photo("blobs/../chore_photos/secret.jpg", "task_photos"))
+        self.assertIsNone(resolve_photo(f"blobs/cd/{sha}.jpg", "task_photos"))
+        self.assertIsNone(resolve_photo(f"blobs/ab/{sha}.jpg/../x", "task_photos"))
+        # Legacy paths are confined to their folder by basename().
+        self.assertEqual(resolve_photo("../../etc/passwd", "task_photos")[1], "passwd")
+
+    def test_traversal_through_the_photo_route_is_not_found(self):
+        legacy_dir = os.path.join(self.app.instance_path, "uploads", "chore_photos")
+        os.makedirs(legacy_dir, exist_ok=True)
+        with open(os.path.join(legacy_dir, "private.jpg"), "wb") as private:
+            private.write(b"private")
+
+        response = self.app.test_client().get("/uploads/task_photos/blobs/../chore_photos/private.jpg")
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
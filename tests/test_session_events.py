@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+
+from src.controllers import routes
+from src.models.main import Family, Kid, db
+from src.utils import session_events
+from tests.base import AppTestCase
+
+
+class SessionEventsTest(AppTestCase):
+    database_name = "session_events"
+
+    def setUp(self):
+        with self.app.app_context():
+            family = Family(name="Stream", family_code_hash="x", family_code_hint="STRM")
+            db.session.add(family)
+            db.session.flush()
+            kid = Kid(family_id=family.id, display_name="Kid", pin_hash="x")
+            db.session.add(kid)
+            db.session.commit()
+            self.family_id = family.id
+            self.kid_id = kid.id
+
+    def test_full_listener_drops_events_without_blocking(self):
+        listener = session_events.subscribe(self.family_id)
+        try:
+            for i in range(session_events.MAX_PENDING_EVENTS):
+                self.assertEqual(session_events.publish(self.family_id, {"n": i}), 1)
+            self.assertEqual(session_events.publish(self.family_id, {"n": "dropped"}), 0)
+        finally:
+            session_events.unsubscribe(self.family_id, listener)
+        self.assertEqual(session_events.subscriber_count(self.family_id), 0)
+
+    def test_stream_relays_published_events_and_unsubscribes_on_close(self):
+        response = self.kid_client(self.kid_id, self.family_id).get("/kid/store/sessions/stream", buffered=False)
+        self.addCleanup(response.close)
+        self.assertEqual(response.status_code, 200)
+        chunks = iter(response.response)
+        self.assertEqual(next(chunks), b"retry: 3000\n\n")
+
+        session_events.publish(self.family_id, {"session_id": 1, "status": "active"})
+        self.assertEqual(next(chunks), b'data: {"session_id":1,"status":"active"}\n\n')
+
+        response.close()
+        self.assertEqual(session_events.subscriber_count(self.family_id), 0)
+
+    def test_streams_beyond_the_cap_are_refused(self):
+        with mock.patch.object(session_events, "MAX_STREAMS", 1):
+            client = self.kid_client(self.kid_id, self.family_id)
+            first = client.get("/kid/store/sessions/stream", buffered=False)
+            self.addCleanup(first.close)
+            second = client.get("/kid/store/sessions/stream", buffered=False)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(second.status_code, 503)
+            first.close()
+            self.assertEqual(session_events.subscriber_count(), 0)
+
+    def test_stream_sends_keepalives_while_idle(self):
+        with mock.patch.object(routes, "SESSION_STREAM_KEEPALIVE_SECONDS", 0.01):
+            response = self.kid_client(self.kid_id, self.family_id).get("/kid/store/sessions/stream", buffered=False)
+            self.addCleanup(response.close)
+            chunks = iter(response.response)
+            next(chunks)
+            self.assertEqual(next(chunks), b": keepalive\n\n")
+            response.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
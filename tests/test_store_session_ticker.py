@@ -0,0 +1,198 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import text
+
+from src import _job_settle_store_sessions
+from src.controllers import routes
+from src.models.main import (
+    Family,
+    Kid,
+    KidNotification,
+    Parent,
+    StoreItem,
+    StoreSessionParticipant,
+    StoreSessionTurn,
+    StoreTimedSession,
+    db,
+)
+from tests.base import AppTestCase
+
+RATE = 2
+
+
+class StoreSessionTickerTest(AppTestCase):
+    database_name = "store_session_ticker"
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        family = Family(name="Ticker", family_code_hash="x", family_code_hint="TICK")
+        db.session.add(family)
+        db.session.flush()
+        parent = Parent(family_id=family.id, name="P", email=f"ticker{family.id}@example.com", password_hash="x")
+        self.kid = Kid(family_id=family.id, display_name="Kid", pin_hash="x", coin_balance=100)
+        db.session.add_all([parent, self.kid])
+        db.session.flush()
+        self.item = StoreItem(
+            family_id=family.id,
+            created_by_parent_id=parent.id,
+            name="Tablet time",
+            item_scope="kid",
+            item_type="timed_session",
+            timing_mode="countdown",
+            session_duration_minutes=10,
+            session_rate_type="per_minute",
+            session_coin_per_minute=RATE,
+        )
+        db.session.add(self.item)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.rollback()
+        # Leave no active session behind for the next test's ticker run.
+        StoreTimedSession.query.filter_by(status="active").update({StoreTimedSession.status: "cancelled"})
+        db.session.commit()
+        db.session.remove()
+        self.ctx.pop()
+
+    def _start_session(self, minutes_ago: int, planned_minutes: int, paid_minutes: int):
+        started_at = datetime.utcnow() - timedelta(minutes=minutes_ago)
+        timed_session = StoreTimedSession(
+            store_item_id=self.item.id,
+            family_id=self.kid.family_id,
+            started_by_kid_id=self.kid.id,
+            timing_mode="countdown",
+            planned_duration_minutes=planned_minutes,
+            started_at=started_at,
+        )
+        db.session.add(timed_session)
+        db.session.flush()
+        participant = StoreSessionParticipant(
+            timed_session_id=timed_session.id,
+            family_id=self.kid.family_id,
+            kid_id=self.kid.id,
+            coins_charged=paid_minutes * RATE,
+        )
+        db.session.add(participant)
+        db.session.flush()
+        db.session.add(StoreSessionTurn(
+            timed_session_id=timed_session.id,
+            participant_id=participant.id,
+            family_id=self.kid.family_id,
+            started_at=started_at,
+            coins_charged=paid_minutes * RATE,
+        ))
+        db.session.commit()
+        return timed_session.id
+
+    def test_expired_countdown_is_completed_once(self):
+        session_id = self._start_session(minutes_ago=6, planned_minutes=5, paid_minutes=5)
+
+        self.assertEqual(_job_settle_store_sessions(), 1)
+        timed_session = db.session.get(StoreTimedSession, session_id)
+        self.assertEqual(timed_session.status, "completed")
+        self.assertEqual(timed_session.total_coins_charged, 5 * RATE)
+        self.assertEqual(timed_session.turns[0].elapsed_seconds, 5 * 60)
+        self.assertEqual(db.session.get(Kid, self.kid.id).coin_balance, 100)
+        self.assertEqual(KidNotification.query.filter_by(kid_id=self.kid.id, kind="session_ended").count(), 1)
+
+        # A later tick finds nothing left to settle.
+        self.assertEqual(_job_settle_store_sessions(), 0)
+
+    def test_long_expired_countdown_bills_only_its_unpaid_minutes(self):
+        session_id = self._start_session(minutes_ago=60, planned_minutes=5, paid_minutes=3)
+
+        self.assertEqual(_job_settle_store_sessions(), 1)
+        timed_session = db.session.get(StoreTimedSession, session_id)
+        self.assertEqual(timed_session.status, "completed")
+        self.assertEqual(timed_session.total_coins_charged, 5 * RATE)
+        self.assertEqual(timed_session.turns[0].elapsed_seconds, 5 * 60)
+        self.assertEqual(db.session.get(Kid, self.kid.id).coin_balance, 100 - 2 * RATE)
+
+    def test_ticker_skips_a_session_ended_since_it_was_read(self):
+        session_id = self._start_session(minutes_ago=6, planned_minutes=5, paid_minutes=5)
+        settle_billing = routes._sync_active_store_session_billing
+
+        def end_elsewhere_then_bill(timed_session):
+            # The kid taps "end" between the ticker's read and its claim.
+            with db.engine.begin() as connection:
+                connection.execute(
+                    text("UPDATE store_timed_sessions SET status = 'completed', ended_at = :now WHERE id = :id"),
+                    {"now": datetime.utcnow(), "id": session_id},
+                )
+            return settle_billing(timed_session)
+
+        with mock.patch.object(routes, "_sync_active_store_session_billing", side_effect=end_elsewhere_then_bill):
+            self.assertEqual(_job_settle_store_sessions(), 0)
+
+        db.session.expire_all()
+        timed_session = db.session.get(StoreTimedSession, session_id)
+        self.assertEqual(timed_session.total_coins_charged, 0)
+        self.assertIsNone(timed_session.turns[0].ended_at)
+        self.assertEqual(KidNotification.query.filter_by(kid_id=self.kid.id, kind="session_ended").count(), 0)
+
+    def test_running_countdown_is_billed_but_left_active(self):
+        session_id = self._start_session(minutes_ago=2, planned_minutes=5, paid_minutes=1)
+
+        self.assertEqual(_job_settle_store_sessions(), 1)
+        timed_session = db.session.get(StoreTimedSession, session_id)
+        self.assertEqual(timed_session.status, "active")
+        self.assertEqual(timed_session.turns[0].coins_charged, 3 * RATE)
+        self.assertEqual(db.session.get(Kid, self.kid.id).coin_balance, 100 - 2 * RATE)
+
+    def test_billing_uses_the_current_balance_not_the_loaded_one(self):
+        session_id = self._start_session(minutes_ago=2, planned_minutes=5, paid_minutes=1)
+        Kid.query.filter_by(id=self.kid.id).update({Kid.coin_balance: 0})
+        db.session.commit()
+        timed_session = db.session.get(StoreTimedSession, session_id)
+        turn = timed_session.current_turn
+        self.assertEqual(turn.participant.kid.coin_balance, 0)
+
+        # A parent tops the kid up after the balance was loaded.
+        with db.engine.begin() as connection:
+            connection.execute(text("UPDATE kids SET coin_balance = 100 WHERE id = :id"), {"id": self.kid.id})
+        self.assertTrue(routes._sync_active_store_session_billing(timed_session))
+        db.session.commit()
+
+        self.assertIsNone(db.session.get(StoreSessionTurn, turn.id).ended_at)
+        self.assertEqual(db.session.get(Kid, self.kid.id).coin_balance, 100 - 2 * RATE)
+
+    def test_current_turn_follows_turns_opened_and_closed_in_the_session(self):
+        session_id = self._start_session(minutes_ago=1, planned_minutes=5, paid_minutes=1)
+        timed_session = db.session.get(StoreTimedSession, session_id)
+        first_turn = timed_session.current_turn
+        participant = first_turn.participant
+
+        routes._close_store_session_turn(first_turn)
+        self.assertIsNone(timed_session.current_turn)
+
+        next_turn = StoreSessionTurn(
+            timed_session_id=session_id,
+            participant_id=participant.id,
+            family_id=timed_session.family_id,
+        )
+        db.session.add(next_turn)
+        self.assertIs(timed_session.current_turn, next_turn)
+
+    def test_closing_a_turn_adds_to_the_participant_total_in_sql(self):
+        session_id = self._start_session(minutes_ago=2, planned_minutes=5, paid_minutes=1)
+        timed_session = db.session.get(StoreTimedSession, session_id)
+        turn = timed_session.current_turn
+        participant = turn.participant
+        self.assertEqual(participant.elapsed_seconds, 0)
+
+        # Another process closes an earlier turn of the same participant meanwhile.
+        with db.engine.begin() as connection:
+            connection.execute(
+                text("UPDATE store_session_participants SET elapsed_seconds = elapsed_seconds + 30 WHERE id = :id"),
+                {"id": participant.id},
+            )
+        routes._close_store_session_turn(turn, turn.started_at + timedelta(seconds=90))
+        db.session.commit()
+        self.assertEqual(db.session.get(StoreSessionParticipant, participant.id).elapsed_seconds, 120)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import threading
+import unittest
+
+from src.models.main import Family, Kid, Parent, StoreItem, StoreRedemption, db
+from tests.base import AppTestCase
+
+BUYERS = 24
+INITIAL_STOCK = 5
+ITEM_COST = 3
+
+
+class StoreStockConcurrencyTest(AppTestCase):
+    # Throwaway SQLite file by default; set STOCK_STRESS_DATABASE_URL to a
+    # Postgres URL to run the same stress test there.
+    database_name = "stock_stress"
+    database_url_env = "STOCK_STRESS_DATABASE_URL"
+
+    def setUp(self):
+        with self.app.app_context():
+            family = Family(name="Stress", family_code_hash="x", family_code_hint="STRS")
+            db.session.add(family)
+            db.session.flush()
+            parent = Parent(family_id=family.id, name="P", email=f"stress{family.id}@example.com", password_hash="x")
+            db.session.add(parent)
+            db.session.flush()
+            kids = [
+                Kid(family_id=family.id, display_name=f"Kid {i}", pin_hash="x", coin_balance=100)
+                for i in range(BUYERS)
+            ]
+            db.session.add_all(kids)
+            item = StoreItem(
+                family_id=family.id,
+                created_by_parent_id=parent.id,
+                name="Limited toy",
+                item_scope="kid",
+                item_type="basic",
+                kid_coin_cost=ITEM_COST,
+                stock_qty=INITIAL_STOCK,
+            )
+            db.session.add(item)
+            db.session.commit()
+            self.family_id = family.id
+            self.item_id = item.id
+            self.kid_ids = [kid.id for kid in kids]
+
+    def _buy(self, kid_id, barrier, statuses):
+        client = self.kid_client(kid_id, self.family_id)
+        barrier.wait()
+        response = client.post(f"/kid/store/items/{self.item_id}/purchase")
+        statuses.append(response.status_code)
+
+    def test_parallel_purchases_never_oversell(self):
+        barrier = threading.Barrier(BUYERS)
+        statuses = []
+        threads = [
+            threading.Thread(target=self._buy, args=(kid_id, barrier, statuses))
+            for kid_id in self.kid_ids
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(statuses), BUYERS)
+        with self.app.app_context():
+            item = db.session.get(StoreItem, self.item_id)
+            fulfilled = StoreRedemption.query.filter_by(store_item_id=self.item_id, status="fulfilled").count()
+            spent = sum(100 - db.session.get(Kid, kid_id).coin_balance for kid_id in self.kid_ids)
+
+        self.assertGreaterEqual(item.stock_qty, 0)
+        self.assertLessEqual(fulfilled, INITIAL_STOCK)
+        self.assertEqual(fulfilled, INITIAL_STOCK - item.stock_qty)
+        self.assertEqual(spent, fulfilled * ITEM_COST)
+
+    def test_catalog_version_only_bumps_when_the_item_sells_out(self):
+        def catalog_version():
+            with self.app.app_context():
+                return db.session.get(Family, self.family_id).store_catalog_version or 0
+
+        before = catalog_version()
+        for kid_id in self.kid_ids[:INITIAL_STOCK - 1]:
+            self.kid_client(kid_id, self.family_id).post(f"/kid/store/items/{self.item_id}/purchase")
+        self.assertEqual(catalog_version(), before)
+
+        self.kid_client(self.kid_ids[INITIAL_STOCK - 1], self.family_id).post(f"/kid/store/items/{self.item_id}/purchase")
+        self.assertEqual(catalog_version(), before + 1)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(StoreItem, self.item_id).stock_qty, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import hashlib
+import hmac
+import json
+import time
+import unittest
+
+from src.models.main import EmailOutbox, Family, Parent, StripeEvent, db
+from src.utils.stripe_events import process_stripe_events
+from tests.base import AppTestCase
+
+WEBHOOK_SECRET = "whsec_test"
+DUNNING_SUBJECT = "Action required: Stewardwell payment failed"
+
+
+class StripeWebhookTest(AppTestCase):
+    database_name = "stripe_webhook"
+    env = {"STRIPE_WEBHOOK_SECRET": WEBHOOK_SECRET}
+
+    def setUp(self):
+        with self.app.app_context():
+            family = Family(
+                name="Billing",
+                family_code_hash="x",
+                family_code_hint="BILL",
+                plan="pro",
+                stripe_subscription_id=f"sub_{time.time_ns()}",
+                subscription_status="active",
+            )
+            db.session.add(family)
+            db.session.flush()
+            db.session.add(Parent(family_id=family.id, name="P", email=f"billing{family.id}@example.com", password_hash="x"))
+            db.session.commit()
+            self.family_id = family.id
+            self.subscription_id = family.stripe_subscription_id
+
+    def _deliver(self, event):
+        payload = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(WEBHOOK_SECRET.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        return self.app.test_client().post(
+            "/webhooks/stripe",
+            data=payload,
+            content_type="application/json",
+            headers={"Stripe-Signature": f"t={timestamp},v1={signature}"},
+        )
+
+    def _event(self, event_type, obj, created):
+        return {
+            "id": f"evt_{time.time_ns()}",
+            "object": "event",
+            "type": event_type,
+            "created": created,
+            "data": {"object": obj},
+        }
+
+    def test_redelivered_event_is_applied_once(self):
+        event = self._event("invoice.payment_failed", {"object": "invoice", "subscription": self.subscription_id}, int(time.time()))
+        for _ in range(3):
+            self.assertEqual(self._deliver(event).status_code, 200)
+
+        with self.app.app_context():
+            self.assertEqual(StripeEvent.query.filter_by(event_id=event["id"]).count(), 1)
+            # Acknowledged but not applied until the processor runs.
+            self.assertEqual(db.session.get(Family, self.family_id).subscription_status, "active")
+
+            process_stripe_events()
+            self.assertEqual(db.session.get(Family, self.family_id).subscription_status, "past_due")
+            self.assertEqual(db.session.get(StripeEvent, event["id"]).status, "processed")
+            dunning = EmailOutbox.query.filter_by(subject=DUNNING_SUBJECT).count()
+            self.assertGreater(dunning, 0)
+
+        self.assertEqual(self._deliver(event).status_code, 200)
+        with self.app.app_context():
+            process_stripe_events()
+            self.assertEqual(
+                EmailOutbox.query.filter_by(subject=DUNNING_SUBJECT).count(),
+                dunning,
+            )
+
+    def test_events_apply_in_stripe_order(self):
+        now = int(time.time())
+        cancelled = self._event("customer.subscription.deleted", {"object": "subscription", "id": self.subscription_id}, now)
+        paid = self._event("invoice.payment_succeeded", {"object": "invoice", "subscription": self.subscription_id}, now - 60)
+        # Delivered out of order: the cancellation arrives first.
+        self._deliver(cancelled)
+        self._deliver(paid)
+
+        with self.app.app_context():
+            self.assertEqual(process_stripe_events(), (2, 0))
+            family = db.session.get(Family, self.family_id)
+            self.assertEqual((family.plan, family.subscription_status), ("free", "canceled"))
+
+    def test_bad_signature_is_rejected(self):
+        with self.app.app_context():
+            stored = StripeEvent.query.count()
+        response = self.app.test_client().post(
+            "/webhooks/stripe",
+            data=json.dumps(self._event("invoice.payment_failed", {}, int(time.time()))),
+            content_type="application/json",
+            headers={"Stripe-Signature": "t=1,v1=deadbeef"},
+        )
+        self.assertEqual(response.status_code, 400)
+        with self.app.app_context():
+            self.assertEqual(StripeEvent.query.count(), stored)
+
+
+if __name__ == "__main__":
+    unittest.main()